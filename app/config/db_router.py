@@ -0,0 +1,53 @@
+"""
+Primary/replica routing.
+
+Reads go to a replica only inside replica_reads() – entered by
+home.middleware.ReplicaRoutingMiddleware for anonymous GET/HEAD page renders.
+Everything else (admin, previews, form posts, signals, management commands)
+reads and writes the primary ("default").
+"""
+import random
+import threading
+from contextlib import contextmanager
+
+from django.conf import settings
+
+_state = threading.local()
+
+
+def replica_aliases() -> list:
+    return list(getattr(settings, "DATABASE_REPLICAS", []))
+
+
+def using_replica() -> bool:
+    return getattr(_state, "replica", None) is not None
+
+
+@contextmanager
+def replica_reads():
+    """
+    Route reads in this thread to one replica (the same one for the whole
+    request, so a render never mixes two replicas with different lag)
+    """
+    aliases = replica_aliases()
+    previous = getattr(_state, "replica", None)
+    _state.replica = random.choice(aliases) if aliases else None
+    try:
+        yield _state.replica
+    finally:
+        _state.replica = previous
+
+
+class PrimaryReplicaRouter:
+    def db_for_read(self, model, **hints):
+        return getattr(_state, "replica", None)
+
+    def db_for_write(self, model, **hints):
+        return "default"
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replikerna är kopior av samma databas
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == "default"
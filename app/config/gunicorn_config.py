@@ -1,7 +1,10 @@
 """
 Gunicorn configuration (container/prod)
 """
+import gc
+import glob
 import os
+import tempfile
 import multiprocessing
 
 # ---- Server socket ----
@@ -28,6 +31,20 @@ proxy_protocol = os.getenv("PROXY_PROTOCOL", "false").lower() in ("1", "true", "
 max_requests = int(os.getenv("GUNICORN_MAX_REQUESTS", "1000"))
 max_requests_jitter = int(os.getenv("GUNICORN_MAX_REQUESTS_JITTER", "100"))
 
+# ---- Preload / copy-on-write ----
+# Importera Django/Wagtail en gång i mastern och forka sedan – workers delar minnessidorna
+# så länge GC inte rör dem (gc.freeze före fork, se hooks nedan).
+preload_app = os.getenv("GUNICORN_PRELOAD", "false").lower() in ("1", "true", "yes")
+rss_log_every = int(os.getenv("GUNICORN_RSS_LOG_EVERY", "0"))  # 0 = bara vid start/exit
+
+# ---- Warm-up ----
+# Rendera en sida per sidtyp i varje ny worker innan den tar trafik (se home/warmup.py)
+warmup = os.getenv("GUNICORN_WARMUP", "true").lower() in ("1", "true", "yes")
+
+if preload_app:
+    # Enligt gc-dokumentationen: stäng av GC tidigt i föräldern så inga "hål" skapas i delade sidor
+    gc.disable()
+
 # ---- Logging ----
 accesslog = "-"
 errorlog = "-"
@@ -45,3 +62,112 @@ tmp_upload_dir = None  # OBS: inte använd i nyare versioner
 
 # Notera: worker_connections används inte av 'sync'-workern, därför utelämnat.
 # Sätt CLI-flaggor eller env för att åsidosätta detta vid behov.
+
+
+# ---- Hooks ----
+def _memory_kb(pid="self"):
+    """
+    (RSS, PSS) i kB från /proc – PSS räknar delade sidor proportionerligt.
+    None där /proc saknas (t.ex. macOS).
+    """
+    rss = pss = None
+    try:
+        with open(f"/proc/{pid}/status") as fh:
+            for line in fh:
+                if line.startswith("VmRSS:"):
+                    rss = int(line.split()[1])
+                    break
+        with open(f"/proc/{pid}/smaps_rollup") as fh:
+            for line in fh:
+                if line.startswith("Pss:"):
+                    pss = int(line.split()[1])
+                    break
+    except (OSError, ValueError):
+        pass
+    return rss, pss
+
+
+def _log_memory(log, label, pid="self"):
+    rss, pss = _memory_kb(pid)
+    if rss is not None:
+        log.info("%s rss=%.1fMB pss=%s", label, rss / 1024, f"{pss / 1024:.1f}MB" if pss is not None else "n/a")
+
+
+def _log_db_pool(log, label):
+    from django.conf import settings
+    if settings.DATABASES["default"]["ENGINE"] != "config.postgresql_pool":
+        return
+    from config.postgresql_pool.base import pool_stats
+    log.info("%s db_pool=%s", label, pool_stats())
+
+
+def when_ready(server):
+    _log_memory(server.log, f"master pid={os.getpid()} preload={preload_app}")
+    # /metrics summerar workerfilerna i METRICS_DIR – börja om vid varje (om)start av mastern
+    metrics_dir = os.getenv("METRICS_DIR") or os.path.join(tempfile.gettempdir(), "portfolio-metrics")
+    for path in glob.glob(os.path.join(metrics_dir, "*.json")):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+def pre_fork(server, worker):
+    if not preload_app:
+        return
+    # Inga DB-sockets får ärvas av barnen
+    from django.db import connections
+    connections.close_all()
+    # Flytta allt som finns nu till den permanenta generationen – barnens GC rör det aldrig
+    gc.freeze()
+
+
+def post_fork(server, worker):
+    if not preload_app:
+        return
+    # Om något ändå öppnats mellan pre_fork och fork: släpp referensen utan att
+    # stänga socketen (den delas med mastern)
+    from django.db import connections
+    for conn in connections.all(initialized_only=True):
+        conn.connection = None
+    gc.enable()
+
+
+def post_worker_init(worker):
+    # Körs före workerns accept-loop – den blir "ready" först när uppvärmningen är klar
+    if warmup:
+        from home.warmup import warm_up
+        results = warm_up(worker.wsgi)
+        worker.log.info(
+            "worker pid=%s warmed %s pages in %.0fms",
+            worker.pid, len(results), sum(ms for _, _, ms in results),
+        )
+    _log_memory(worker.log, f"worker pid={worker.pid} booted")
+
+
+def post_request(worker, req, environ, resp):
+    if rss_log_every and worker.nr % rss_log_every == 0:
+        _log_memory(worker.log, f"worker pid={worker.pid} requests={worker.nr}")
+        _log_db_pool(worker.log, f"worker pid={worker.pid}")
+
+
+def worker_exit(server, worker):
+    _log_memory(server.log, f"worker pid={worker.pid} exiting requests={worker.nr}")
+    _log_db_pool(server.log, f"worker pid={worker.pid} exiting")
+    # Sista /metrics-siffrorna till fil innan processen försvinner (child_exit slår ihop dem)
+    try:
+        from home.metrics import registry
+        registry.flush()
+    except Exception:
+        server.log.exception("worker pid=%s could not flush metrics", worker.pid)
+
+
+def child_exit(server, worker):
+    # I mastern: den avslutade workerns metrics-fil läggs i aggregatfilen och tas bort,
+    # annars växer METRICS_DIR med en fil per max_requests-rotation
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings")
+    try:
+        from home.metrics import registry
+        registry.fold(worker.pid)
+    except Exception:
+        server.log.exception("could not fold metrics of worker pid=%s", worker.pid)
@@ -0,0 +1,115 @@
+"""
+PostgreSQL backend with a psycopg_pool.ConnectionPool per worker process.
+
+Django 5.0 has no OPTIONS["pool"] (it arrived in 5.1), so this wraps the stock
+backend the same way: get_new_connection() borrows from the pool and close()
+hands the connection back. Use with CONN_MAX_AGE = 0 – the pool, not Django,
+keeps connections alive. Enabled from settings via DB_POOL=1.
+"""
+import os
+import threading
+import time
+
+from django.core.exceptions import ImproperlyConfigured
+from django.db.backends.postgresql import base as postgresql_base
+from psycopg import IsolationLevel
+from psycopg_pool import ConnectionPool
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+# Väntetid på getconn() per alias (samma process)
+_wait_stats = {}
+_wait_lock = threading.Lock()
+
+
+def _record_wait(alias: str, wait_ms: float, failed: bool) -> None:
+    with _wait_lock:
+        stats = _wait_stats.setdefault(alias, {"count": 0, "total_ms": 0.0, "max_ms": 0.0, "timeouts": 0})
+        stats["count"] += 1
+        stats["total_ms"] += wait_ms
+        stats["max_ms"] = max(stats["max_ms"], wait_ms)
+        if failed:
+            stats["timeouts"] += 1
+
+
+def pool_stats(alias: str = "default") -> dict:
+    """
+    psycopg_pool counters (size, available, requests_waiting, requests_wait_ms, ...)
+    plus our getconn() wait times, for this process
+    """
+    pool = _pools.get((os.getpid(), alias))
+    stats = dict(pool.get_stats()) if pool is not None else {}
+    with _wait_lock:
+        for key, value in _wait_stats.get(alias, {}).items():
+            stats[f"getconn_wait_{key}"] = value
+    return stats
+
+
+class DatabaseWrapper(postgresql_base.DatabaseWrapper):
+    def pool_options(self) -> dict:
+        options = self.settings_dict["OPTIONS"].get("pool") or {}
+        if self.settings_dict["CONN_MAX_AGE"]:
+            raise ImproperlyConfigured("Pooled connections require CONN_MAX_AGE = 0")
+        return options
+
+    @property
+    def pool(self) -> ConnectionPool:
+        # Nyckel med pid: en pool som ärvts via fork (gunicorn preload) har döda trådar
+        key = (os.getpid(), self.alias)
+        pool = _pools.get(key)
+        if pool is not None:
+            return pool
+        with _pools_lock:
+            pool = _pools.get(key)
+            if pool is None:
+                options = self.pool_options()
+                pool = ConnectionPool(
+                    kwargs=self.get_connection_params(),
+                    min_size=options.get("min_size", 1),
+                    max_size=options.get("max_size", 4),
+                    timeout=options.get("timeout", 10),
+                    max_lifetime=options.get("max_lifetime", 30 * 60),
+                    max_idle=options.get("max_idle", 5 * 60),
+                    check=ConnectionPool.check_connection,
+                    name=f"{self.alias}-{os.getpid()}",
+                    open=False,
+                )
+                pool.open(wait=False)
+                _pools[key] = pool
+        return pool
+
+    def get_connection_params(self):
+        params = super().get_connection_params()
+        params.pop("pool", None)
+        return params
+
+    def get_new_connection(self, conn_params):
+        start = time.perf_counter()
+        failed = True
+        try:
+            connection = self.pool.getconn()
+            failed = False
+        finally:
+            _record_wait(self.alias, (time.perf_counter() - start) * 1000, failed)
+
+        # Som i Django-backenden: isolation level efter anslutning, före autocommit
+        isolation_level_value = self.settings_dict["OPTIONS"].get("isolation_level")
+        if isolation_level_value is None:
+            self.isolation_level = IsolationLevel.READ_COMMITTED
+        else:
+            self.isolation_level = IsolationLevel(isolation_level_value)
+            connection.isolation_level = self.isolation_level
+        return connection
+
+    def _close(self):
+        if self.connection is None:
+            return
+        # Tillbaka till poolen (den rullar tillbaka öppna transaktioner) i stället för att stänga
+        with self.wrap_database_errors:
+            self.pool.putconn(self.connection)
+
+    def close_pool(self):
+        pool = _pools.pop((os.getpid(), self.alias), None)
+        if pool is not None:
+            pool.close()
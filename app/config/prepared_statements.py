@@ -0,0 +1,42 @@
+"""
+Server-side prepared statements for the hot listing queries only.
+
+Django's PostgreSQL connections keep client-side binding and psycopg's
+prepare_threshold at None, so nothing is prepared. With
+DB_PREPARED_STATEMENTS=1, prepared_statements() switches the connection to
+server-side binding cursors with prepare_threshold = DB_PREPARE_THRESHOLD for
+the duration of a block and puts both back afterwards. BlogIndexPage/
+ProjectIndexPage render inside one; admin, forms, migrations and management
+commands keep Django's defaults and never fill the per-connection statement
+cache.
+"""
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import connections, router
+
+
+@contextmanager
+def prepared_statements(model):
+    """
+    Let psycopg prepare queries that repeat inside the block, on the connection
+    `model` is read from (the replica inside replica_reads())
+    """
+    connection = connections[router.db_for_read(model) or "default"]
+    if not getattr(settings, "DB_PREPARED_STATEMENTS", False) or connection.vendor != "postgresql":
+        yield
+        return
+
+    from django.db.backends.postgresql.base import ServerBindingCursor
+
+    connection.ensure_connection()
+    raw = connection.connection
+    previous = raw.cursor_factory, raw.prepare_threshold
+    # Bara server-side binding kan förbereda – ClientCursor skickar färdig SQL
+    raw.cursor_factory = ServerBindingCursor
+    raw.prepare_threshold = settings.DB_PREPARE_THRESHOLD
+    try:
+        yield
+    finally:
+        # Även om anslutningen stängts/lämnats tillbaka till poolen under blocket
+        raw.cursor_factory, raw.prepare_threshold = previous
@@ -1,4 +1,4 @@
-import os, dj_database_url
+import os, tempfile, dj_database_url
 from pathlib import Path
 from dotenv import load_dotenv
 
@@ -8,6 +8,13 @@ from dotenv import load_dotenv
 def env_bool(name: str, default: bool = False) -> bool:
     return os.getenv(name, "1" if default else "0").lower() in ("1", "true", "yes")
 
+def env_int(name: str, default: int) -> int:
+    # Ogiltigt värde -> default i stället för krasch vid start
+    try:
+        return int(os.getenv(name, default))
+    except ValueError:
+        return default
+
 # -------------------------------------------------
 # Paths & env
 # -------------------------------------------------
@@ -35,6 +42,7 @@ SECURE_SSL_REDIRECT = env_bool("SECURE_SSL_REDIRECT", not DEBUG)
 SESSION_COOKIE_SECURE = not DEBUG
 CSRF_COOKIE_SECURE = not DEBUG
 X_FRAME_OPTIONS = "DENY"
+
 SECURE_REFERRER_POLICY = "same-origin"
 
 # HSTS endast i prod
@@ -91,12 +99,18 @@ INSTALLED_APPS = [
 
 
 MIDDLEWARE = [
+    "home.logs.RequestIdMiddleware",  # korrelations-id för loggar (X-Request-ID)
+    "home.metrics.PerformanceMiddleware",  # ytterst – mäter hela requesten (Server-Timing, /metrics)
     "django.middleware.security.SecurityMiddleware",
     "whitenoise.middleware.WhiteNoiseMiddleware",  # måste ligga tidigt
+    "home.middleware.Fast404Middleware",  # före session/DB/redirects – billig 404 för scanners
+    "home.middleware.ReplicaRoutingMiddleware",  # anonyma GET läser från replika (om DATABASE_REPLICA_URLS)
+    "home.ratelimit.RateLimitMiddleware",  # före session/CSRF – 429 innan formuläret ens parsas
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
     "django.contrib.auth.middleware.AuthenticationMiddleware",
+    "home.profiler.ProfilerMiddleware",  # opt-in profilering för staff (PROFILER_ENABLED)
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
     "wagtail.contrib.redirects.middleware.RedirectMiddleware",
@@ -107,7 +121,7 @@ ROOT_URLCONF = "config.urls"
 
 TEMPLATES = [
     {
-        "BACKEND": "django.template.backends.django.DjangoTemplates",
+        "BACKEND": "home.metrics.InstrumentedDjangoTemplates",  # DjangoTemplates + renderingstid
         "DIRS": [BASE_DIR / "home" / "templates"],
         "APP_DIRS": True,  # viktigt
         "OPTIONS": {
@@ -144,7 +158,86 @@ DATABASES = {
     )
 }
 
+# Läsrepliker (kommaseparerade URL:er) – anonyma GET-sidvisningar läser härifrån,
+# se config/db_router.py och home.middleware.ReplicaRoutingMiddleware
+DATABASE_REPLICAS = []
+for _i, _url in enumerate(u.strip() for u in os.getenv("DATABASE_REPLICA_URLS", "").split(",") if u.strip()):
+    _alias = f"replica{_i + 1}"
+    DATABASES[_alias] = dj_database_url.parse(_url, conn_max_age=600)
+    DATABASES[_alias]["TEST"] = {"MIRROR": "default"}  # tester: replikan = default
+    DATABASE_REPLICAS.append(_alias)
+
+if DATABASE_REPLICAS:
+    DATABASE_ROUTERS = ["config.db_router.PrimaryReplicaRouter"]
+
+# Read-your-writes: efter publicering/POST läses primären så här länge (replikeringsfördröjning)
+DB_REPLICA_STICKY_SECONDS = int(os.getenv("DB_REPLICA_STICKY_SECONDS", "10"))
+
+# Server-side prepared statements, bara för listningssidornas frågor (config/prepared_statements.py
+# slår på server-side binding för blocket): psycopg förbereder en fråga när samma SQL körts
+# DB_PREPARE_THRESHOLD gånger på en anslutning. Övriga frågor binds som vanligt på klientsidan.
+# Stäng av bakom pgbouncer i transaction-läge.
+DB_PREPARED_STATEMENTS = env_bool("DB_PREPARED_STATEMENTS", False)
+DB_PREPARE_THRESHOLD = int(os.getenv("DB_PREPARE_THRESHOLD", "2"))
+
+for _db in DATABASES.values():
+    if _db["ENGINE"] != "django.db.backends.postgresql":
+        continue
+    _db_options = _db.setdefault("OPTIONS", {})
+
+    # Valfri connection pool (psycopg_pool, config/postgresql_pool) – begränsat antal
+    # anslutningar per worker-process i stället för en persistent anslutning per tråd
+    if env_bool("DB_POOL", False):
+        _db["ENGINE"] = "config.postgresql_pool"
+        _db["CONN_MAX_AGE"] = 0  # poolen håller anslutningarna vid liv
+        _db_options["pool"] = {
+            "min_size": int(os.getenv("DB_POOL_MIN_SIZE", "1")),
+            "max_size": int(os.getenv("DB_POOL_MAX_SIZE", "4")),
+            "timeout": float(os.getenv("DB_POOL_TIMEOUT", "10")),
+            "max_lifetime": float(os.getenv("DB_POOL_MAX_LIFETIME", "1800")),
+            "max_idle": float(os.getenv("DB_POOL_MAX_IDLE", "300")),
+        }
+
+
+
+# -------------------------------------------------
+# Cache (räknar träffar/missar per request, se home/metrics.py)
+# -------------------------------------------------
+CACHES = {
+    "default": {
+        "BACKEND": "home.metrics.InstrumentedCache",
+        "LOCATION": os.getenv("CACHE_LOCATION", ""),
+        "OPTIONS": {
+            "BACKEND": os.getenv("CACHE_BACKEND", "django.core.cache.backends.locmem.LocMemCache"),
+        },
+    },
+    # Admin-sessioner: filer delas av alla workers i containern (locmem gör det inte)
+    "sessions": {
+        "BACKEND": os.getenv("SESSION_CACHE_BACKEND", "django.core.cache.backends.filebased.FileBasedCache"),
+        "LOCATION": os.getenv("SESSION_CACHE_LOCATION", os.path.join(tempfile.gettempdir(), "portfolio-sessions")),
+        "OPTIONS": {"MAX_ENTRIES": 10000},
+    },
+    # Delat mellan workers (filer i containern) – för värden som alla måste se samtidigt,
+    # t.ex. räknarna i home/counters.py. Flera hosts: peka om till Redis/Memcached via env
+    "shared": {
+        "BACKEND": "home.metrics.InstrumentedCache",
+        "LOCATION": os.getenv("SHARED_CACHE_LOCATION", os.path.join(tempfile.gettempdir(), "portfolio-shared")),
+        "OPTIONS": {
+            "BACKEND": os.getenv("SHARED_CACHE_BACKEND", "django.core.cache.backends.filebased.FileBasedCache"),
+            "MAX_ENTRIES": 1000,
+        },
+    },
+}
 
+# -------------------------------------------------
+# Sessions / messages: bara inloggade (admin) har en session – publika sidor rör den aldrig
+# -------------------------------------------------
+# Inga sessionsrader/-queries i databasen. signed_cookies går inte: Wagtails förhandsvisning
+# sparar hela sidformuläret i sessionen (> 4 KB cookie för större sidor)
+SESSION_ENGINE = os.getenv("SESSION_ENGINE", "django.contrib.sessions.backends.cache")
+SESSION_CACHE_ALIAS = "sessions"
+# Flash-meddelanden i en cookie i stället för att falla tillbaka på sessionen
+MESSAGE_STORAGE = "django.contrib.messages.storage.cookie.CookieStorage"
 
 # -------------------------------------------------
 # Auth validators
@@ -172,6 +265,21 @@ STATICFILES_DIRS = [BASE_DIR / "static"]  # ok även om mappen är tom
 MEDIA_URL = "/media/"
 MEDIA_ROOT = BASE_DIR / "media"
 
+# manage.py bootstrap minns förra starten här (statiska filernas fingeravtryck) – utanför
+# STATIC_ROOT och MEDIA_ROOT, som serveras publikt
+BOOTSTRAP_STATE_PATH = Path(os.getenv("BOOTSTRAP_STATE_PATH", BASE_DIR / ".bootstrap-state.json"))
+
+# Leverans av media/dokument (se home/media.py): accel | sendfile | direct | off
+MEDIA_SERVE_MODE = os.getenv("MEDIA_SERVE_MODE", "direct").lower()
+MEDIA_ACCEL_PREFIX = os.getenv("MEDIA_ACCEL_PREFIX", "/protected-media/")  # nginx "internal" location
+MEDIA_CACHE_MAX_AGE_SECONDS = int(os.getenv("MEDIA_CACHE_MAX_AGE_SECONDS", "86400"))
+# Renditions heter <original>.<filter>.<ext> – ett utbytt original med samma namn ger samma URL,
+# så inget är immutable som standard. Bara för sökvägar som garanterat byter namn vid ändring
+MEDIA_IMMUTABLE_PREFIXES = tuple(p.strip() for p in os.getenv("MEDIA_IMMUTABLE_PREFIXES", "").split(",") if p.strip())
+# Dokument går bara via wagtaildocs serve-vy (sekretess per samling, before_serve_document-hooks)
+MEDIA_PRIVATE_PREFIXES = ("documents/",)
+SENDFILE_BACKEND = "home.media"  # wagtail.documents serve-vyn
+
 if not DEBUG:
     # Hashade & komprimerade statiska filer i prod
     STATICFILES_STORAGE = "whitenoise.storage.CompressedManifestStaticFilesStorage"
@@ -190,6 +298,118 @@ _extra_csrf = [
 ]
 CSRF_TRUSTED_ORIGINS = _default_csrf + _extra_csrf
 
+# -------------------------------------------------
+# HTTP-cache för publika sidor (max-age i sekunder, 0 = av; bara anonyma besökare)
+# -------------------------------------------------
+HOME_PAGE_CACHE_SECONDS = env_int("HOME_PAGE_CACHE_SECONDS", 0)
+CONTACT_PAGE_CACHE_SECONDS = env_int("CONTACT_PAGE_CACHE_SECONDS", 0)
+HTB_CARD_MAX_AGE_SECONDS = env_int("HTB_CARD_MAX_AGE_SECONDS", 5 * 60)
+
+# -------------------------------------------------
+# Fast 404 för scanner-/bottrafik (home.middleware.Fast404Middleware)
+# -------------------------------------------------
+FAST_404_ENABLED = env_bool("FAST_404_ENABLED", True)
+FAST_404_PATTERNS = [
+    r"\.(php|asp|aspx|jsp|cgi|env|ini|bak|sql)$",
+    r"^/\.(?!well-known/)",  # /.env, /.git/config ... men inte /.well-known/
+    r"^/(wp-|wordpress/|xmlrpc|phpmyadmin|pma/|cgi-bin/|vendor/|boaform/|actuator/)",
+] + [
+    p.strip()
+    for p in os.getenv("FAST_404_EXTRA_PATTERNS", "").split(",")
+    if p.strip()
+]
+# Minnet av nyss 404:ade sökvägar per worker; generationen som nollställer det ligger i
+# CACHES["shared"]. Utan delad cache (flera hosts) – sätt 0
+FAST_404_CACHE_SIZE = int(os.getenv("FAST_404_CACHE_SIZE", "2048"))
+FAST_404_CACHE_TTL_SECONDS = int(os.getenv("FAST_404_CACHE_TTL_SECONDS", "300"))
+
+# -------------------------------------------------
+# Rate limiting (home/ratelimit.py): delade räknare i databasen, gäller alla workers/värdar
+# -------------------------------------------------
+RATELIMIT_ENABLE = env_bool("RATELIMIT_ENABLE", True)  # stängs bara av i lasttester (manage.py loadtest)
+# Proxies vars X-Forwarded-For vi litar på – samma lista som gunicorns forwarded_allow_ips ("*" = alla)
+TRUSTED_PROXIES = [
+    p.strip()
+    for p in os.getenv("FORWARDED_ALLOW_IPS", "127.0.0.1").split(",")
+    if p.strip()
+]
+CONTACT_RATE_LIMIT = os.getenv("CONTACT_RATE_LIMIT", "3/h")  # alla POST mot kontaktformuläret
+CONTACT_COOLDOWN = os.getenv("CONTACT_COOLDOWN", "1/5m")  # lyckade inskick
+
+# -------------------------------------------------
+# Kontaktformulär: spam/dubbletter sorteras bort före sparning och Discord (home/spam.py)
+# -------------------------------------------------
+CONTACT_DUPLICATE_WINDOW_SECONDS = int(os.getenv("CONTACT_DUPLICATE_WINDOW_SECONDS", "86400"))
+CONTACT_MAX_LINKS = int(os.getenv("CONTACT_MAX_LINKS", "3"))  # -1 = ingen gräns
+CONTACT_BLOCKED_DOMAINS = [
+    d.strip().lower()
+    for d in os.getenv("CONTACT_BLOCKED_DOMAINS", "").split(",")
+    if d.strip()
+]
+# Gallring: manage.py prune_contact_submissions tar bort inskick äldre än så här
+CONTACT_RETENTION_DAYS = int(os.getenv("CONTACT_RETENTION_DAYS", "365"))
+
+# -------------------------------------------------
+# Prestandamätning (home.metrics): Server-Timing för staff + /metrics (Prometheus)
+# -------------------------------------------------
+METRICS_ENABLED = env_bool("METRICS_ENABLED", True)
+METRICS_TOKEN = os.getenv("METRICS_TOKEN", "")  # Bearer-token för scrapern; annars admin-inloggning
+METRICS_DIR = os.getenv("METRICS_DIR", "")  # delad katalog för workers (default: <tmp>/portfolio-metrics)
+METRICS_FLUSH_SECONDS = int(os.getenv("METRICS_FLUSH_SECONDS", "5"))
+
+# Slow-request-logg (home/slowlog.py): andel requests som spelar in sin SQL, och vad som räknas som långsamt
+SLOW_REQUEST_SAMPLE_RATE = float(os.getenv("SLOW_REQUEST_SAMPLE_RATE", "0.2"))
+SLOW_REQUEST_THRESHOLD_MS = int(os.getenv("SLOW_REQUEST_THRESHOLD_MS", "500"))
+SLOW_REQUEST_KEEP = int(os.getenv("SLOW_REQUEST_KEEP", "50"))
+SLOW_REQUEST_WINDOW_HOURS = int(os.getenv("SLOW_REQUEST_WINDOW_HOURS", "24"))
+
+# On-demand profiler (home.profiler): ?_profile=1 som staff eller X-Profile-Token-header
+PROFILER_ENABLED = env_bool("PROFILER_ENABLED", False)
+PROFILER_MAX_CONCURRENT = int(os.getenv("PROFILER_MAX_CONCURRENT", "1"))  # per worker
+PROFILER_TOKEN_MAX_AGE_SECONDS = int(os.getenv("PROFILER_TOKEN_MAX_AGE_SECONDS", "3600"))
+PROFILER_KEEP = int(os.getenv("PROFILER_KEEP", "100"))
+
+# -------------------------------------------------
+# Logging: JSON-rader via kö + bakgrundstråd (home/logs.py)
+# -------------------------------------------------
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+# "logger=andel,..." – sampla brusiga loggers. LOG_SAMPLE_RATES gäller INFO/DEBUG (t.ex. per-request-
+# raden), LOG_WARNING_SAMPLE_RATES varningar (404:or från scanners); långsamma requests (WARNING) och fel
+# loggas alltid
+def _sample_rates(name: str, default: str) -> dict:
+    return {
+        logger.strip(): float(rate)
+        for logger, _, rate in (item.partition("=") for item in os.getenv(name, default).split(",") if "=" in item)
+    }
+
+LOG_SAMPLE_RATES = _sample_rates("LOG_SAMPLE_RATES", "home.requests=0.1")
+LOG_WARNING_SAMPLE_RATES = _sample_rates("LOG_WARNING_SAMPLE_RATES", "django.request=0.2")
+
+LOGGING = {
+    "version": 1,
+    "disable_existing_loggers": False,
+    "filters": {
+        "request_context": {"()": "home.logs.RequestContextFilter"},
+        "sampling": {
+            "()": "home.logs.SamplingFilter",
+            "rates": LOG_SAMPLE_RATES,
+            "warning_rates": LOG_WARNING_SAMPLE_RATES,
+        },
+    },
+    "handlers": {
+        "queue": {
+            "class": "home.logs.QueueingStreamHandler",
+            "stream": "ext://sys.stdout",
+            "filters": ["request_context", "sampling"],
+        },
+    },
+    "root": {"handlers": ["queue"], "level": LOG_LEVEL},
+    "loggers": {
+        # Djangos egna console/mail_admins-handlers ersätts – allt går via root
+        "django": {"handlers": [], "level": LOG_LEVEL, "propagate": True},
+    },
+}
+
 # -------------------------------------------------
 # Misc
 # -------------------------------------------------
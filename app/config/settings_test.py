@@ -0,0 +1,10 @@
+"""
+Settings for `manage.py test` (picked in manage.py).
+
+Adds a "replica" alias that mirrors default, so the read-replica routing can be
+tested with DATABASE_REPLICAS=["replica"] without configuring a real replica.
+"""
+from .settings import *  # noqa: F401,F403
+from .settings import DATABASES
+
+DATABASES["replica"] = {**DATABASES["default"], "TEST": {"MIRROR": "default"}}
@@ -1,5 +1,5 @@
 from django.conf import settings
-from django.urls import path, include
+from django.urls import path, re_path, include
 from django.contrib import admin
 from django.http import HttpResponse
 from django.views.decorators.http import require_safe
@@ -9,7 +9,9 @@ from wagtail import urls as wagtail_urls
 from wagtail.documents import urls as wagtaildocs_urls
 from wagtail.contrib.sitemaps.views import sitemap
 
-from home.views import htb_stats, contact_form_submit
+from home.views import htb_stats, htb_card, contact_form_submit, csrf_cookie
+from home.media import serve_media
+from home.metrics import metrics_view
 
 # Minimal och snabb hälsokontroll (GET/HEAD). Låg overhead, plain text.
 @require_safe
@@ -24,16 +26,23 @@ urlpatterns = [
     # API/verktyg
     path('documents/', include(wagtaildocs_urls)),
     path('api/htb-stats', htb_stats, name='htb_stats'),
+    path('api/htb-card', htb_card, name='htb_card'),
     path('api/contact-submit', contact_form_submit, name='contact_submit'),
+    path('api/csrf', csrf_cookie, name='csrf_cookie'),
     path('sitemap.xml', sitemap, name='sitemap'),
 
     # Hälsa – måste ligga FÖRE wagtail_urls
     path('healthz', healthz, name='healthz'),
+    path('metrics', metrics_view, name='metrics'),
+]
+
+# Media via X-Accel-Redirect/X-Sendfile eller sendfile() i workern (MEDIA_SERVE_MODE)
+if settings.MEDIA_SERVE_MODE != "off":
+    urlpatterns += [
+        re_path(r'^%s(?P<path>.+)$' % settings.MEDIA_URL.lstrip('/'), serve_media, name='media'),
+    ]
 
+urlpatterns += [
     # Wagtail pages sist
     path('', include(wagtail_urls)),
 ]
-
-if settings.DEBUG:
-    from django.conf.urls.static import static
-    urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
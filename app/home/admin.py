@@ -1,5 +1,34 @@
+import json
+import tempfile
+
 from django.contrib import admin
-from .models import ContactSubmission
+from django.contrib.postgres.search import SearchQuery
+from django.core.paginator import Paginator
+from django.db import connections
+from django.http import FileResponse, StreamingHttpResponse
+from django.utils.functional import cached_property
+
+from . import exports
+from .models import CONTACT_SEARCH_VECTOR, ContactSubmission
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Exact COUNT(*) for small results; above EXACT_COUNT_LIMIT rows on PostgreSQL
+    the planner's row estimate instead, so paging a huge table doesn't scan it
+    """
+    EXACT_COUNT_LIMIT = 10000
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        if connections[queryset.db].vendor == "postgresql":
+            plan = queryset.order_by().explain(format="json")
+            plan = json.loads(plan) if isinstance(plan, str) else plan
+            estimate = int(plan[0]["Plan"]["Plan Rows"])
+            if estimate > self.EXACT_COUNT_LIMIT:
+                return estimate
+        return super().count
 
 
 @admin.register(ContactSubmission)
@@ -8,6 +37,36 @@ class ContactSubmissionAdmin(admin.ModelAdmin):
     list_filter = ['read', 'replied', 'submitted_at']
     search_fields = ['name', 'email', 'subject', 'message']
     readonly_fields = ['name', 'email', 'subject', 'message', 'submitted_at', 'ip_address', 'user_agent']
-    
+
+    # Stora tabeller: ingen extra COUNT(*) för totalen, inga räknare per filterval
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    show_facets = admin.ShowFacets.NEVER
+    actions = ['export_csv', 'export_xlsx']
+
+    def get_search_results(self, request, queryset, search_term):
+        # PostgreSQL: fulltext mot GIN-indexet (migration 0011) i stället för fyra icontains
+        if not search_term or connections[queryset.db].vendor != "postgresql":
+            return super().get_search_results(request, queryset, search_term)
+        query = SearchQuery(search_term, config="simple", search_type="websearch")
+        return queryset.annotate(search=CONTACT_SEARCH_VECTOR).filter(search=query), False
+
+    # Exporterna strömmar raderna (home/exports.py) – "välj alla" över filtret fungerar även för stora urval
+    @admin.action(description="Export selected as CSV", permissions=["view"])
+    def export_csv(self, request, queryset):
+        response = StreamingHttpResponse(exports.csv_lines(queryset), content_type=exports.CSV_CONTENT_TYPE)
+        response["Content-Disposition"] = f'attachment; filename="{exports.filename("csv")}"'
+        return response
+
+    @admin.action(description="Export selected as Excel (.xlsx)", permissions=["view"])
+    def export_xlsx(self, request, queryset):
+        # xlsx är en zip – byggs i en temporärfil (inte i minnet) och strömmas sedan
+        spool = tempfile.TemporaryFile()
+        exports.write_xlsx(queryset, spool)
+        spool.seek(0)
+        return FileResponse(
+            spool, as_attachment=True, filename=exports.filename("xlsx"), content_type=exports.XLSX_CONTENT_TYPE,
+        )
+
     def has_add_permission(self, request):
-        return False  # Can't add submissions manually
\ No newline at end of file
+        return False  # Can't add submissions manually
@@ -0,0 +1,162 @@
+"""
+In-process page-render benchmarks.
+
+build_fixtures(pages) creates a site tree with `pages` blog posts + projects
+(home/synthetic.py, plus home, index and contact pages) and returns the URLs to render.
+run_benchmarks() renders each case through the Django test client and records
+  - ms:      median wall time of `repeat` renders (after one warm-up render)
+  - queries: SQL queries for one render
+  - kb:      peak memory allocated during one render (tracemalloc)
+compare() checks a run against the stored baseline (home/benchmark_baseline.json):
+query counts may not grow, ms/kb may grow by `tolerance`.
+
+Used by `manage.py benchmark_pages` (10/1k/10k pages, rolled back afterwards)
+and by home/tests.py (10 pages, query counts only).
+"""
+import json
+import statistics
+import time
+import tracemalloc
+from pathlib import Path
+
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from wagtail.models import Page, Site
+
+from .counters import rebuild_counters
+from .models import BlogIndexPage, BlogPage, ContactPage, HomePage, ProjectIndexPage, ProjectPage
+from .synthetic import ContentGenerator
+
+BASELINE_PATH = Path(__file__).resolve().parent / "benchmark_baseline.json"
+SIZES = (10, 1000, 10000)
+DEFAULT_TOLERANCE = 0.25
+
+# Absolut marginal utöver tolerance – små tal (2ms, 40kB) fladdrar annars
+SLACK = {"queries": 0, "ms": 5.0, "kb": 64.0}
+
+HEAVY_BLOCKS = 60  # block i den "tunga" bloggposten som renderas
+
+
+def build_fixtures(pages: int, seed: int = 0) -> dict:
+    """
+    Fresh site tree under the Wagtail root, made the default Site, filled by the
+    synthetic ContentGenerator. `pages` is split evenly between blog posts and
+    projects. Returns {case name: url}.
+    """
+    root = Page.get_first_root_node()
+    home = root.add_child(instance=HomePage(title="Benchmark", slug="benchmark-home", body="<p>Hello</p>"))
+    site = Site.objects.filter(is_default_site=True).first()
+    if site is None:
+        Site.objects.create(hostname="localhost", root_page=home, is_default_site=True)
+    else:
+        site.root_page = home
+        site.save()
+
+    blog_index = home.add_child(instance=BlogIndexPage(title="Blog", slug="blog"))
+    project_index = home.add_child(instance=ProjectIndexPage(title="Projects", slug="projects"))
+    contact = home.add_child(instance=ContactPage(title="Contact", slug="contact", intro="<p>Say hi</p>"))
+
+    generator = ContentGenerator(seed=seed)
+    snippets = generator.snippets()
+    # Den renderade posten: alltid lika tung oavsett seed/storlek
+    heavy_post = BlogPage(
+        title="Heavy post", slug="heavy-post", intro="Many blocks",
+        categories=snippets["blog_categories"][0], body=generator.body(HEAVY_BLOCKS),
+    )
+    heavy_post.tags.add(snippets["tags"][0].name)
+    blog_index.add_child(instance=heavy_post)
+
+    posts = max(1, pages // 2)
+    generator.blog_posts(blog_index, posts - 1)
+    generator.projects(project_index, max(1, pages - posts))
+
+    project = ProjectPage.objects.child_of(project_index).first()
+
+    rebuild_counters()
+
+    last_page = (posts + 8) // 9  # BlogIndexPage visar 9 per sida
+    tech_a, tech_b = snippets["techs"][0].slug, snippets["techs"][3].slug
+    return {
+        "home": home.url,
+        "blog_index": blog_index.url,
+        "blog_index_category": f"{blog_index.url}?category={snippets['blog_categories'][1].slug}",
+        "blog_index_tag": f"{blog_index.url}?tag={snippets['tags'][0].slug}",
+        "blog_index_last_page": f"{blog_index.url}?page={last_page}",
+        "blog_post": heavy_post.url,
+        "project_index": project_index.url,
+        "project_index_techs": f"{project_index.url}?tech={tech_a}&tech={tech_b}",
+        "project_index_techs_all": f"{project_index.url}?tech={tech_a}&tech={tech_b}&match=all&status=completed",
+        "project": project.url,
+        "contact": contact.url,
+    }
+
+
+def measure(client: Client, url: str, repeat: int = 5) -> dict:
+    response = client.get(url)  # uppvärmning: renditions, template-laddning, cache
+    if response.status_code != 200:
+        raise AssertionError(f"{url} returned {response.status_code}")
+
+    timings = []
+    for _ in range(max(1, repeat)):
+        start = time.perf_counter()
+        client.get(url)
+        timings.append((time.perf_counter() - start) * 1000)
+
+    with CaptureQueriesContext(connection) as captured:
+        client.get(url)
+    queries = len(captured)  # läses direkt – nästa request nollställer connection.queries
+
+    tracemalloc.start()
+    try:
+        client.get(url)
+        _current, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return {
+        "ms": round(statistics.median(timings), 2),
+        "queries": queries,
+        "kb": round(peak / 1024, 1),
+    }
+
+
+def run_benchmarks(urls: dict, repeat: int = 5) -> dict:
+    client = Client()
+    return {name: measure(client, url, repeat) for name, url in urls.items()}
+
+
+def load_baseline(pages: int, path: Path = BASELINE_PATH) -> dict:
+    try:
+        data = json.loads(Path(path).read_text())
+    except FileNotFoundError:
+        return {}
+    return data.get(str(pages), {})
+
+
+def save_baseline(pages: int, results: dict, path: Path = BASELINE_PATH) -> None:
+    path = Path(path)
+    data = json.loads(path.read_text()) if path.exists() else {}
+    data[str(pages)] = results
+    path.write_text(json.dumps(data, indent=2, sort_keys=True) + "\n")
+
+
+def compare(results: dict, baseline: dict, tolerance: float = DEFAULT_TOLERANCE,
+            metrics=("queries", "ms", "kb")) -> list:
+    """
+    Regressions as human readable lines, e.g. "blog_post queries 14 > 12".
+    Cases missing from the baseline are skipped.
+    """
+    regressions = []
+    for name, values in results.items():
+        expected = baseline.get(name)
+        if not expected:
+            continue
+        for metric in metrics:
+            if metric not in expected:
+                continue
+            allowed = expected[metric] if metric == "queries" else expected[metric] * (1 + tolerance)
+            allowed += SLACK[metric]
+            if values[metric] > allowed:
+                regressions.append(f"{name} {metric} {values[metric]} > {expected[metric]} (allowed {allowed:g})")
+    return regressions
@@ -0,0 +1,125 @@
+import logging
+import os
+from collections import Counter
+from typing import Dict
+
+from django.core.cache import caches
+from django.db import transaction
+from django.db.models import Count
+
+from .models import BlogPage, ProjectPage, ProjectPageTechStack, SiteCounter
+
+logger = logging.getLogger(__name__)
+
+CACHE_KEY = "site:counters:v1"
+CACHE_ALIAS = "shared"  # alla workers ska se samma räknare direkt efter en rebuild
+DEFAULT_CACHE_TTL_SECONDS = 5 * 60
+
+# Nyckelformat:
+#   projects, posts
+#   projects:status:<status>, projects:category:<slug>, projects:tech:<slug>
+#   posts:category:<slug>, posts:tag:<slug>
+
+
+def _cache_ttl() -> int:
+    try:
+        return int(os.getenv("SITE_COUNTERS_CACHE_TTL_SECONDS", DEFAULT_CACHE_TTL_SECONDS))
+    except ValueError:
+        return DEFAULT_CACHE_TTL_SECONDS
+
+
+def compute_counters() -> Dict[str, int]:
+    """
+    Count live/public content straight from the page tables
+    """
+    projects = ProjectPage.objects.live().public()
+    posts = BlogPage.objects.live().public()
+
+    counts: Dict[str, int] = {
+        "projects": projects.count(),
+        "posts": posts.count(),
+    }
+
+    for row in projects.order_by().values("status").annotate(n=Count("pk")):
+        counts[f"projects:status:{row['status']}"] = row["n"]
+
+    for row in (
+        projects.exclude(category__isnull=True)
+        .order_by().values("category__slug").annotate(n=Count("pk"))
+    ):
+        counts[f"projects:category:{row['category__slug']}"] = row["n"]
+
+    # En rad per (sida, tech) – samma tech två gånger på en sida räknas en gång
+    tech_pairs = (
+        ProjectPageTechStack.objects.filter(page__in=projects.values("pk"))
+        .values_list("page_id", "tech__slug")
+        .distinct()
+    )
+    for slug, n in Counter(slug for _, slug in tech_pairs).items():
+        counts[f"projects:tech:{slug}"] = n
+
+    for row in (
+        posts.exclude(categories__isnull=True)
+        .order_by().values("categories__slug").annotate(n=Count("pk"))
+    ):
+        counts[f"posts:category:{row['categories__slug']}"] = row["n"]
+
+    for row in posts.order_by().values("tags__slug").annotate(n=Count("pk")):
+        if row["tags__slug"]:
+            counts[f"posts:tag:{row['tags__slug']}"] = row["n"]
+
+    return counts
+
+
+def rebuild_counters() -> Dict[str, int]:
+    """
+    Recompute every counter and upsert the stored rows, then refresh the shared cache.
+    Concurrent rebuilds (two publishes committing at once) queue on the row locks
+    instead of racing a delete + insert into IntegrityError.
+    """
+    with transaction.atomic():
+        # Lås befintliga rader först – nästa rebuild väntar här och räknar sedan på commitat data
+        list(SiteCounter.objects.select_for_update().values_list("pk", flat=True))
+        counts = compute_counters()
+        SiteCounter.objects.bulk_create(
+            [SiteCounter(key=key, value=value) for key, value in counts.items()],
+            update_conflicts=True,
+            unique_fields=["key"],
+            update_fields=["value", "updated_at"],
+        )
+        SiteCounter.objects.exclude(key__in=list(counts)).delete()
+    caches[CACHE_ALIAS].set(CACHE_KEY, counts, _cache_ttl())
+    return counts
+
+
+def get_counters() -> Dict[str, int]:
+    """
+    All counters as a dict – one cache lookup, one query on a cold cache.
+    Never writes to the database: rebuilds happen on publish/delete or via
+    `manage.py rebuild_counters`.
+    """
+    cache = caches[CACHE_ALIAS]
+    counts = cache.get(CACHE_KEY)
+    if isinstance(counts, dict):
+        return counts
+
+    counts = dict(SiteCounter.objects.values_list("key", "value"))
+    if not counts:
+        # Tabellen har aldrig byggts (ny databas) – räkna direkt ur sidtabellerna, utan att spara
+        counts = compute_counters()
+
+    cache.set(CACHE_KEY, counts, _cache_ttl())
+    return counts
+
+
+def schedule_rebuild() -> None:
+    """
+    Rebuild once the surrounding transaction commits (publish/delete run inside one)
+    """
+    def _rebuild():
+        try:
+            rebuild_counters()
+        except Exception:
+            logger.exception("Site counter rebuild failed")
+
+    transaction.on_commit(_rebuild)
@@ -1,11 +1,15 @@
 from django import forms
 from .models import ContactSubmission
+from .spam import HONEYPOT_FIELD
 
 
 class ContactForm(forms.ModelForm):
     """
     Contact form with validation
     """
+    # Honeypot – dolt i mallen, bara botar fyller i det (home/spam.py)
+    website = forms.CharField(required=False)
+
     class Meta:
         model = ContactSubmission
         fields = ['name', 'email', 'subject', 'message']
@@ -33,4 +37,8 @@ class ContactForm(forms.ModelForm):
         message = self.cleaned_data.get('message')
         if len(message) < 10:
             raise forms.ValidationError('Message must be at least 10 characters long.')
-        return message
\ No newline at end of file
+        return message
+
+    @property
+    def honeypot(self) -> str:
+        return self.cleaned_data.get(HONEYPOT_FIELD, "")
\ No newline at end of file
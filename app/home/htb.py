@@ -7,11 +7,13 @@ from typing import Any, Dict, Optional
 import requests
 from django.core.cache import cache
 
+from .metrics import timed
 from .models import SocialMediaSettings
 
 logger = logging.getLogger(__name__)
 
-HTB_API_BASE = "https://labs.hackthebox.com/api/v4"
+# Overridable so load tests can point at a local stand-in (home/loadtest.py)
+HTB_API_BASE = os.getenv("HTB_API_BASE", "https://labs.hackthebox.com/api/v4").rstrip("/")
 DEFAULT_CACHE_TTL_SECONDS = 6 * 60 * 60
 FAILURE_CACHE_TTL_SECONDS = 10 * 60
 
@@ -143,6 +145,10 @@ def _get_manual_xp_profile() -> Dict[str, Any]:
     }
 
 
+def _failure_ttl() -> int:
+    return _safe_int(os.getenv("HTB_FAILURE_CACHE_TTL_SECONDS")) or FAILURE_CACHE_TTL_SECONDS
+
+
 def get_htb_profile(request) -> Dict[str, Any]:
     settings_obj = SocialMediaSettings.for_request(request)
 
@@ -172,26 +178,27 @@ def get_htb_profile(request) -> Dict[str, Any]:
     }
 
     try:
-        response = requests.get(
-            url,
-            headers=headers,
-            timeout=20,
-            proxies={"http": None, "https": None},
-        )
+        with timed("http"):
+            response = requests.get(
+                url,
+                headers=headers,
+                timeout=20,
+                proxies={"http": None, "https": None},
+            )
         response.raise_for_status()
         payload = response.json()
     except requests.RequestException as exc:
         logger.warning("HTB profile fetch failed: %s", exc.__class__.__name__)
-        cache.set(cache_key, fallback, FAILURE_CACHE_TTL_SECONDS)
+        cache.set(cache_key, fallback, _failure_ttl())
         return fallback
     except ValueError:
         logger.warning("HTB profile fetch returned invalid JSON")
-        cache.set(cache_key, fallback, FAILURE_CACHE_TTL_SECONDS)
+        cache.set(cache_key, fallback, _failure_ttl())
         return fallback
 
     extracted = _extract_profile_stats(payload)
     if not extracted:
-        cache.set(cache_key, fallback, FAILURE_CACHE_TTL_SECONDS)
+        cache.set(cache_key, fallback, _failure_ttl())
         return fallback
 
     merged = {**fallback, **{k: v for k, v in extracted.items() if v is not None}}
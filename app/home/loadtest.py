@@ -0,0 +1,369 @@
+"""
+End-to-end load test: real gunicorn (config/gunicorn_config.py), local stand-ins
+for the external APIs, an open-loop traffic mix at a target RPS.
+
+  StubServer    - HTB API / Discord webhook stand-in with latency + failure rate
+  discover()    - request variants per route, from the content in the database
+  run()         - fires the planned requests at `rps` (request i is due at
+                  start + i/rps whether or not earlier ones finished) and
+                  records latency from the *scheduled* time, so a stalled
+                  server shows up as latency instead of as fewer requests
+  Stats         - throughput, p50/p90/p99 and error rates per route
+
+Driven by `manage.py loadtest`.
+"""
+import json
+import os
+import random
+import signal
+import socket
+import subprocess
+import sys
+import threading
+import time
+from collections import defaultdict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+import requests
+from django.conf import settings
+
+DEFAULT_MIX = {
+    "home": 10,
+    "blog_index": 6,
+    "blog_filter": 8,
+    "blog_post": 15,
+    "project_index": 4,
+    "project_filter": 10,
+    "project": 12,
+    "htb_stats": 10,
+    "htb_card": 10,
+    "contact_post": 2,
+}
+
+HTB_PROFILE = {
+    "profile": {
+        "id": 1, "name": "loadtest", "rank": "Hacker", "ranking": 4242, "points": 120,
+        "user_owns": 60, "system_owns": 55, "rank_ownership": 12.5,
+        "user_bloods": 1, "system_bloods": 2, "challenge_bloods": 0,
+    }
+}
+
+
+# ============= STUBS =============
+
+class StubServer:
+    """
+    Threaded HTTP stand-in. Every request sleeps latency_ms (±50% jitter), then
+    fails with a 503 at `failure_rate`, otherwise answers like the real API.
+    """
+
+    def __init__(self, name: str, latency_ms: float = 0, failure_rate: float = 0, seed: int = 0):
+        self.name = name
+        self.latency_ms = latency_ms
+        self.failure_rate = failure_rate
+        self.calls = 0
+        self.failures = 0
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, name=f"stub-{name}", daemon=True)
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "StubServer":
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def _outcome(self):
+        with self._lock:
+            self.calls += 1
+            delay = self.latency_ms * self._rng.uniform(0.5, 1.5) / 1000
+            failed = self._rng.random() < self.failure_rate
+            self.failures += failed
+        return delay, failed
+
+    def _handler(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def _reply(self, status: int, body: bytes = b"", content_type: str = "application/json"):
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def _serve(self, ok_status: int, ok_body: bytes = b""):
+                length = int(self.headers.get("Content-Length") or 0)
+                if length:
+                    self.rfile.read(length)
+                delay, failed = stub._outcome()
+                time.sleep(delay)
+                if failed:
+                    self._reply(503, b'{"message": "stub failure"}')
+                else:
+                    self._reply(ok_status, ok_body)
+
+            def do_GET(self):
+                self._serve(200, json.dumps(HTB_PROFILE).encode())
+
+            def do_POST(self):
+                self._serve(204)  # Discord svarar 204 No Content på webhooks
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+
+# ============= APP SERVER =============
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_gunicorn(port: int, env: dict, log_path: Path) -> subprocess.Popen:
+    """
+    The app under config/gunicorn_config.py (same hooks, warm-up, worker settings
+    as the container), bound to localhost
+    """
+    log = open(log_path, "ab")
+    return subprocess.Popen(
+        [
+            sys.executable, "-m", "gunicorn", "config.wsgi:application",
+            "--config", "config/gunicorn_config.py",
+            "--bind", f"127.0.0.1:{port}",
+        ],
+        cwd=settings.BASE_DIR,
+        env={**os.environ, **env},
+        stdout=log,
+        stderr=subprocess.STDOUT,
+    )
+
+
+def wait_until_healthy(base_url: str, process: subprocess.Popen = None, timeout: float = 60) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process is not None and process.poll() is not None:
+            raise RuntimeError(f"gunicorn exited with code {process.returncode}")
+        try:
+            if requests.get(f"{base_url}/healthz", timeout=2).status_code == 200:
+                return
+        except requests.RequestException:
+            pass
+        time.sleep(0.25)
+    raise RuntimeError(f"{base_url} not healthy after {timeout:.0f}s")
+
+
+def stop_gunicorn(process: subprocess.Popen) -> None:
+    if process.poll() is None:
+        process.send_signal(signal.SIGTERM)
+        try:
+            process.wait(timeout=30)
+        except subprocess.TimeoutExpired:
+            process.kill()
+
+
+# ============= TRAFFIC =============
+
+def discover(limit: int = 200) -> dict:
+    """
+    {route: [(method, path, form data)]} from the live content. Routes without
+    content (e.g. no ContactPage) are left out.
+    """
+    from .models import (
+        BlogCategory, BlogIndexPage, BlogPage, ContactPage, ProjectCategory, ProjectIndexPage, ProjectPage,
+        TechStack,
+    )
+    from taggit.models import Tag
+
+    def urls(queryset):
+        return [page.url for page in queryset.live().public().specific(defer=True)[:limit] if page.url]
+
+    routes = defaultdict(list)
+    for url in urls(BlogIndexPage.objects.all())[:1]:
+        routes["blog_index"].append(("GET", url, None))
+        routes["blog_index"].append(("GET", f"{url}?page=2", None))
+        for slug in BlogCategory.objects.values_list("slug", flat=True)[:20]:
+            routes["blog_filter"].append(("GET", f"{url}?category={slug}", None))
+        for slug in Tag.objects.filter(home_blogpagetag_items__isnull=False).distinct().values_list("slug", flat=True)[:20]:
+            routes["blog_filter"].append(("GET", f"{url}?tag={slug}", None))
+
+    for url in urls(ProjectIndexPage.objects.all())[:1]:
+        routes["project_index"].append(("GET", url, None))
+        techs = list(TechStack.objects.values_list("slug", flat=True)[:20])
+        categories = list(ProjectCategory.objects.values_list("slug", flat=True)[:10])
+        rng = random.Random(0)
+        for _ in range(30):
+            params = [("tech", slug) for slug in rng.sample(techs, min(len(techs), rng.randint(1, 3)))]
+            if categories and rng.random() < 0.3:
+                params.append(("category", rng.choice(categories)))
+            if rng.random() < 0.3:
+                params.append(("status", rng.choice(["completed", "in_progress", "ongoing", "archived"])))
+            if rng.random() < 0.3:
+                params.append(("match", "all"))
+            routes["project_filter"].append(("GET", url + "?" + "&".join(f"{k}={v}" for k, v in params), None))
+
+    routes["home"].append(("GET", "/", None))
+    routes["blog_post"] = [("GET", url, None) for url in urls(BlogPage.objects.order_by("-first_published_at"))]
+    routes["project"] = [("GET", url, None) for url in urls(ProjectPage.objects.order_by("-date"))]
+    routes["htb_stats"].append(("GET", "/api/htb-stats", None))
+    routes["htb_card"].append(("GET", "/api/htb-card", None))
+
+    contact = urls(ContactPage.objects.all())[:1]
+    if contact:
+        routes["contact_page"] = [("GET", contact[0], None)]
+        routes["contact_post"].append(("POST", "/api/contact-submit", {
+            "name": "Load Test",
+            "email": "loadtest@example.com",
+            "subject": "Load test",
+            "message": "Synthetic submission from manage.py loadtest.",
+        }))
+    return {route: variants for route, variants in routes.items() if variants}
+
+
+def plan(routes: dict, mix: dict, total: int, seed: int = 0) -> list:
+    rng = random.Random(seed)
+    names = [name for name in mix if mix[name] > 0 and name in routes]
+    if not names:
+        raise ValueError("No route in the mix has any targets")
+    chosen = rng.choices(names, weights=[mix[name] for name in names], k=total)
+    return [(name, rng.choice(routes[name])) for name in chosen]
+
+
+class Stats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.latencies = defaultdict(list)
+        self.statuses = defaultdict(lambda: defaultdict(int))
+        self.max_lag_ms = 0.0
+        self.started = self.finished = None
+
+    def record(self, route: str, status, latency_ms: float, lag_ms: float) -> None:
+        with self._lock:
+            self.latencies[route].append(latency_ms)
+            self.statuses[route][status] += 1
+            self.max_lag_ms = max(self.max_lag_ms, lag_ms)
+
+    @staticmethod
+    def _percentile(values: list, pct: float) -> float:
+        if not values:
+            return 0.0
+        ordered = sorted(values)
+        index = min(len(ordered) - 1, max(0, int(round(pct / 100 * len(ordered) + 0.5)) - 1))
+        return ordered[index]
+
+    def summary(self) -> dict:
+        elapsed = max(1e-9, (self.finished or time.monotonic()) - (self.started or 0))
+        rows = {}
+        for route in sorted(self.latencies):
+            values = self.latencies[route]
+            statuses = self.statuses[route]
+            errors = sum(n for status, n in statuses.items() if status == "error" or status >= 500)
+            client_errors = sum(n for status, n in statuses.items() if status != "error" and 400 <= status < 500)
+            rows[route] = {
+                "requests": len(values),
+                "rps": round(len(values) / elapsed, 2),
+                "p50_ms": round(self._percentile(values, 50), 1),
+                "p90_ms": round(self._percentile(values, 90), 1),
+                "p99_ms": round(self._percentile(values, 99), 1),
+                "max_ms": round(max(values), 1),
+                "4xx": client_errors,
+                "errors": errors,
+                "error_pct": round(100 * errors / len(values), 2),
+                "statuses": {str(status): n for status, n in sorted(statuses.items(), key=lambda item: str(item[0]))},
+            }
+        total = sum(row["requests"] for row in rows.values())
+        return {
+            "duration_s": round(elapsed, 1),
+            "requests": total,
+            "throughput_rps": round(total / elapsed, 2),
+            "errors": sum(row["errors"] for row in rows.values()),
+            "max_client_lag_ms": round(self.max_lag_ms, 1),
+            "routes": rows,
+        }
+
+
+def csrf_token(base_url: str, routes: dict, headers: dict):
+    """
+    The contact POST needs a CSRF cookie + header pair – fetched once from
+    /api/csrf, like the contact form does. Each POST sends it without a session
+    cookie, like a new visitor.
+    """
+    if not routes.get("contact_post"):
+        return None
+    response = requests.get(base_url + "/api/csrf", headers=headers, timeout=30)
+    return response.cookies.get("csrftoken")
+
+
+def run(base_url: str, routes: dict, mix: dict, rps: float, duration: float,
+        concurrency: int = 32, seed: int = 0, timeout: float = 30) -> dict:
+    # Appen står bakom en TLS-terminerande proxy i prod – utan headern blir allt redirects
+    headers = {"X-Forwarded-Proto": "https", "User-Agent": "portfolio-loadtest"}
+    token = csrf_token(base_url, routes, headers) if mix.get("contact_post") else None
+    if not token:
+        mix = {**mix, "contact_post": 0}
+
+    total = max(1, int(rps * duration))
+    requests_plan = plan(routes, mix, total, seed)
+    run_id = int(time.time())
+
+    stats = Stats()
+    lock = threading.Lock()
+    position = {"next": 0}
+    start = time.monotonic() + 0.5
+    stats.started = start
+
+    def worker():
+        session = requests.Session()
+        while True:
+            with lock:
+                index = position["next"]
+                position["next"] += 1
+            if index >= total:
+                return
+            route, (method, path, data) = requests_plan[index]
+            scheduled = start + index / rps
+            delay = scheduled - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            lag_ms = max(0.0, -delay * 1000)
+
+            request_headers = dict(headers)
+            cookies = None
+            if method == "POST":
+                request_headers.update({"X-CSRFToken": token, "Referer": f"https://{base_url.split('://', 1)[1]}/"})
+                cookies = {"csrftoken": token}
+                # En avsändare per request – samma avsändare + text två gånger är en dubblett (home/spam.py)
+                data = {**data, "email": f"loadtest+{run_id}-{index}@example.com"}
+            try:
+                response = session.request(
+                    method, base_url + path, data=data, headers=request_headers, cookies=cookies,
+                    timeout=timeout, allow_redirects=False,
+                )
+                status = response.status_code
+            except requests.RequestException:
+                status = "error"
+            session.cookies.clear()  # varje request är en ny anonym besökare
+            stats.record(route, status, (time.monotonic() - scheduled) * 1000, lag_ms)
+
+    threads = [threading.Thread(target=worker, name=f"loadtest-{i}", daemon=True) for i in range(max(1, concurrency))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    stats.finished = time.monotonic()
+    return stats.summary()
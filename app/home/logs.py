@@ -0,0 +1,186 @@
+"""
+Non-blocking structured logging.
+
+Request threads only copy the record onto an in-memory queue (QueueingStreamHandler);
+a background QueueListener thread per process formats it as one JSON line and
+writes it. Records carry the request's correlation id (RequestIdMiddleware ->
+X-Request-ID) and any extra= fields, e.g. the per-request timings logged by
+home.metrics on the "home.requests" logger. SamplingFilter keeps only a share of
+INFO/DEBUG records from noisy loggers (warnings only where asked for, e.g. scanner
+404s on django.request); errors are never sampled.
+
+Imported from LOGGING in settings, so no Django imports at module level.
+"""
+import atexit
+import copy
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import threading
+import uuid
+from datetime import datetime, timezone
+
+_request = threading.local()
+
+REQUEST_ID_HEADER = "X-Request-ID"
+
+# Attribut som alla LogRecord har – allt annat kom via extra= och hamnar i JSON:en
+_RECORD_ATTRS = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime", "request_id"}
+
+
+def current_request_id() -> str:
+    return getattr(_request, "id", None) or "-"
+
+
+def _clear_request_id(**kwargs):
+    _request.id = None
+
+
+class RequestIdMiddleware:
+    """
+    Outermost: reuse the proxy's X-Request-ID (or make one) for every log record
+    of the request and echo it on the response
+    """
+
+    def __init__(self, get_response):
+        from django.core.signals import request_finished
+
+        self.get_response = get_response
+        # Id:t lever tills svaret stängts, så django.request (4xx/5xx-loggen efter
+        # middleware-kedjan) får samma id
+        request_finished.connect(_clear_request_id, dispatch_uid="home_logs_clear_request_id")
+
+    def __call__(self, request):
+        incoming = request.headers.get(REQUEST_ID_HEADER, "")
+        request_id = incoming[:64] if incoming.isprintable() and incoming else uuid.uuid4().hex
+        request.request_id = request_id
+        _request.id = request_id
+        response = self.get_response(request)
+        response[REQUEST_ID_HEADER] = request_id
+        return response
+
+
+class RequestContextFilter(logging.Filter):
+    """
+    Stamps the correlation id – handler filters run on the request thread, before the queue
+    """
+
+    def filter(self, record):
+        record.request_id = current_request_id()
+        return True
+
+
+class SamplingFilter(logging.Filter):
+    """
+    rates: {"logger.name": 0.1} – keep that share of the INFO/DEBUG records from
+    the logger and its children. warning_rates does the same for WARNING (e.g.
+    django.request 404 warnings from scanners); a logger not listed there keeps
+    all its warnings, such as the slow-request lines on home.requests.
+    ERROR and above always pass.
+    """
+
+    def __init__(self, rates=None, warning_rates=None):
+        super().__init__()
+        self.rates = dict(rates or {})
+        self.warning_rates = dict(warning_rates or {})
+
+    @staticmethod
+    def _rate(rates: dict, name: str):
+        while name:
+            if name in rates:
+                return rates[name]
+            name = name.rpartition(".")[0]
+        return None
+
+    def filter(self, record):
+        if record.levelno >= logging.ERROR:
+            return True
+        rates = self.warning_rates if record.levelno >= logging.WARNING else self.rates
+        if not rates:
+            return True
+        rate = self._rate(rates, record.name)
+        return rate is None or random.random() < rate
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record):
+        payload = {
+            "ts": datetime.fromtimestamp(record.created, tz=timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+            "request_id": getattr(record, "request_id", "-"),
+            "pid": record.process,
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRS and not key.startswith("_"):
+                payload[key] = value
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            payload["exc"] = record.exc_text
+        return json.dumps(payload, default=str, ensure_ascii=False)
+
+
+class QueueingStreamHandler(logging.handlers.QueueHandler):
+    """
+    QueueHandler with its own StreamHandler + QueueListener. The listener thread
+    is started lazily per process, so gunicorn workers forked from a preloaded
+    master get their own. A full queue drops the record instead of blocking.
+    """
+
+    def __init__(self, stream=None, maxsize: int = 10000):
+        super().__init__(queue.Queue(maxsize=maxsize))
+        self.target = logging.StreamHandler(stream)
+        self.target.setFormatter(JsonFormatter())
+        self.dropped = 0
+        self._listener = None
+        self._listener_pid = None
+        self._start_lock = threading.Lock()
+
+    def _ensure_listener(self):
+        if self._listener_pid == os.getpid():
+            return
+        with self._start_lock:
+            if self._listener_pid == os.getpid():
+                return
+            # Efter fork: ny kö (den ärvda kan ha en låst mutex) och ny lyssnartråd
+            self.queue = queue.Queue(maxsize=self.queue.maxsize)
+            self._listener = logging.handlers.QueueListener(self.queue, self.target, respect_handler_level=True)
+            self._listener.start()
+            self._listener_pid = os.getpid()
+            atexit.register(self._stop_listener)
+
+    def _stop_listener(self):
+        # Tömmer kön innan processen avslutas; idempotent (atexit + close)
+        if self._listener is not None and self._listener_pid == os.getpid():
+            self._listener.stop()
+            self._listener_pid = None
+
+    def prepare(self, record):
+        # Billigt på request-tråden: bara message + ev. traceback som text, JSON görs i lyssnaren
+        record = copy.copy(record)
+        record.message = record.getMessage()
+        if record.exc_info and not record.exc_text:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+        record.msg = record.message
+        record.args = None
+        record.exc_info = None
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+    def emit(self, record):
+        self._ensure_listener()
+        super().emit(record)
+
+    def close(self):
+        self._stop_listener()
+        super().close()
@@ -0,0 +1,88 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from home.models import BlogPage, ProjectPage
+
+
+def _row_bytes(queryset) -> int:
+    """
+    Approximate bytes on the wire: sum of all column values the query returns
+    """
+    sql, params = queryset.query.sql_with_params()
+    total = 0
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        for row in cursor.fetchall():
+            for value in row:
+                if value is None:
+                    continue
+                if isinstance(value, (bytes, memoryview)):
+                    total += len(value)
+                elif isinstance(value, str):
+                    total += len(value.encode("utf-8"))
+                else:
+                    total += 8
+    return total
+
+
+def _load_ms(queryset, repeat: int) -> float:
+    """
+    Best-of-N time to evaluate the queryset (fetch + model/StreamField decode).
+    Prefetches are dropped so both sides time the same single row query.
+    """
+    queryset = queryset.prefetch_related(None)
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        list(queryset.all())
+        elapsed = (time.perf_counter() - start) * 1000
+        best = elapsed if best is None else min(best, elapsed)
+    return best or 0.0
+
+
+class Command(BaseCommand):
+    help = "Compare full vs listing() querysets for blog/project index pages (bytes + load time)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--limit", type=int, default=9, help="Rows per listing (default: one blog page = 9)")
+        parser.add_argument("--repeat", type=int, default=5, help="Timing repetitions, best-of (default 5)")
+
+    def handle(self, *args, **options):
+        limit = options["limit"]
+        repeat = options["repeat"]
+
+        cases = [
+            (
+                "blog",
+                BlogPage.objects.live().public().order_by("-first_published_at"),
+                BlogPage.objects.live().public().listing().order_by("-first_published_at"),
+            ),
+            (
+                "projects",
+                ProjectPage.objects.live().public().order_by("-date"),
+                ProjectPage.objects.live().public().listing().order_by("-date"),
+            ),
+        ]
+
+        for label, full_qs, listing_qs in cases:
+            full_qs = full_qs[:limit]
+            listing_qs = listing_qs[:limit]
+
+            rows = full_qs.count()
+            if not rows:
+                self.stdout.write(f"{label}: no live pages, skipping")
+                continue
+
+            full_bytes = _row_bytes(full_qs)
+            listing_bytes = _row_bytes(listing_qs)
+            full_ms = _load_ms(full_qs, repeat)
+            listing_ms = _load_ms(listing_qs, repeat)
+
+            saved_pct = 100 * (1 - listing_bytes / full_bytes) if full_bytes else 0
+            self.stdout.write(
+                f"{label} ({rows} rows): "
+                f"bytes {full_bytes} -> {listing_bytes} ({saved_pct:.1f}% saved), "
+                f"load {full_ms:.2f}ms -> {listing_ms:.2f}ms"
+            )
@@ -0,0 +1,89 @@
+import logging
+import tempfile
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.test.utils import override_settings
+
+from home.benchmarks import (
+    BASELINE_PATH, DEFAULT_TOLERANCE, SIZES, build_fixtures, compare, load_baseline, run_benchmarks,
+    save_baseline,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Render every page type through the test client against generated content "
+        "(10/1k/10k pages) and compare wall time, queries and memory with the stored baseline. "
+        "The content is created in a transaction that is rolled back."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--pages", type=int, choices=SIZES, default=SIZES[0])
+        parser.add_argument("--repeat", type=int, default=5, help="Timed renders per case, median (default 5)")
+        parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE,
+                            help="Allowed growth in ms/kb vs baseline (default 0.25 = 25%%)")
+        parser.add_argument("--baseline", default=str(BASELINE_PATH))
+        parser.add_argument("--update-baseline", action="store_true", help="Store this run as the new baseline")
+
+    def handle(self, *args, **options):
+        pages = options["pages"]
+
+        # Egen cache, media-katalog och inga metrics/slow-request-rader – inget läcker ut
+        # ur benchmarken (och inget slumpmässigt sampel ändrar query-antalet)
+        with tempfile.TemporaryDirectory() as media_root, override_settings(
+            MEDIA_ROOT=media_root,
+            ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, "testserver"],
+            SECURE_SSL_REDIRECT=False,
+            METRICS_ENABLED=False,
+            SLOW_REQUEST_SAMPLE_RATE=0,
+            PROFILER_ENABLED=False,
+            CACHES={
+                "default": {
+                    "BACKEND": "home.metrics.InstrumentedCache",
+                    "LOCATION": "benchmark-pages",
+                    "OPTIONS": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"},
+                },
+                "shared": {
+                    "BACKEND": "home.metrics.InstrumentedCache",
+                    "LOCATION": "benchmark-pages-shared",
+                    "OPTIONS": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"},
+                },
+            },
+        ):
+            with transaction.atomic():
+                self.stdout.write(f"🏗️ Generating {pages} pages...")
+                logging.disable(logging.INFO)  # wagtail loggar varje skapad sida
+                try:
+                    urls = build_fixtures(pages)
+                finally:
+                    logging.disable(logging.NOTSET)
+                self.stdout.write(f"⏱️ Rendering {len(urls)} cases x {options['repeat']}...")
+                results = run_benchmarks(urls, repeat=options["repeat"])
+                transaction.set_rollback(True)
+
+        baseline = load_baseline(pages, options["baseline"])
+        self.stdout.write(f"{'case':<26}{'ms':>10}{'queries':>10}{'kb':>10}   baseline ms/queries/kb")
+        for name, values in results.items():
+            expected = baseline.get(name)
+            reference = f"{expected['ms']}/{expected['queries']}/{expected['kb']}" if expected else "-"
+            self.stdout.write(
+                f"{name:<26}{values['ms']:>10}{values['queries']:>10}{values['kb']:>10}   {reference}"
+            )
+
+        if options["update_baseline"]:
+            save_baseline(pages, results, options["baseline"])
+            self.stdout.write(self.style.SUCCESS(f"✅ Baseline for {pages} pages saved to {options['baseline']}"))
+            return
+
+        if not baseline:
+            self.stdout.write(self.style.WARNING(f"⚠️ No baseline for {pages} pages, run with --update-baseline"))
+            return
+
+        regressions = compare(results, baseline, options["tolerance"])
+        if regressions:
+            for line in regressions:
+                self.stdout.write(self.style.ERROR(f"❌ {line}"))
+            raise CommandError(f"{len(regressions)} regression(s) vs baseline")
+        self.stdout.write(self.style.SUCCESS("✅ Within baseline"))
@@ -0,0 +1,188 @@
+import hashlib
+import json
+import os
+import time
+from pathlib import Path
+
+from django.conf import settings
+from django.contrib.staticfiles import finders
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, OperationalError, connections, transaction
+from django.db.migrations.executor import MigrationExecutor
+
+LEGACY_STATE_FILENAME = ".bootstrap-state.json"  # låg tidigare i STATIC_ROOT, dvs publikt under /static/
+STATIC_IGNORE_PATTERNS = ["CVS", ".*", "*~"]
+
+
+def static_fingerprint() -> str:
+    """
+    Hash of every file collectstatic would copy (path + size + mtime) plus the
+    storage class – thousands of stat() calls instead of copying thousands of files
+    """
+    digest = hashlib.sha256(getattr(settings, "STATICFILES_STORAGE", "").encode())
+    entries = []
+    for finder in finders.get_finders():
+        for path, storage in finder.list(STATIC_IGNORE_PATTERNS):
+            try:
+                stat = os.stat(storage.path(path))
+            except (NotImplementedError, OSError):
+                continue
+            entries.append(f"{path}:{stat.st_size}:{int(stat.st_mtime)}")
+    for entry in sorted(entries):
+        digest.update(entry.encode())
+    return digest.hexdigest()
+
+
+class Command(BaseCommand):
+    help = (
+        "Container bootstrap: wait for the DB in-process, then migrate / collectstatic / "
+        "ensure the Wagtail Site only when something changed since the last start"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--db-timeout", type=int, default=int(os.getenv("DB_TIMEOUT_SEC", "60")))
+        parser.add_argument("--skip-migrate", action="store_true")
+        parser.add_argument("--skip-collectstatic", action="store_true")
+        parser.add_argument("--skip-site", action="store_true")
+        parser.add_argument("--force", action="store_true", help="Run every step regardless of fingerprints")
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        self.force = options["force"]
+        self.state_path = Path(settings.BOOTSTRAP_STATE_PATH)
+        state = self._load_state()
+
+        self._wait_for_db(options["db_timeout"])
+
+        if options["skip_migrate"]:
+            self.stdout.write("⏭️ Skipping migrations")
+        else:
+            self._migrate()
+
+        if options["skip_collectstatic"]:
+            self.stdout.write("⏭️ Skipping collectstatic")
+        else:
+            state["static"] = self._collectstatic(state.get("static"))
+
+        if options["skip_site"]:
+            self.stdout.write("⏭️ Skipping Wagtail Site/HomePage")
+        else:
+            self._ensure_site()
+
+        self._save_state(state)
+        self.stdout.write(self.style.SUCCESS(f"✅ Bootstrap done in {time.monotonic() - started:.1f}s"))
+
+    # ---- DB ----
+    def _wait_for_db(self, timeout: int):
+        self.stdout.write("⏳ Waiting for database ...")
+        connection = connections[DEFAULT_DB_ALIAS]
+        deadline = time.monotonic() + timeout
+        delay = 0.25
+        while True:
+            try:
+                connection.ensure_connection()
+                break
+            except OperationalError:
+                connection.close()
+                if time.monotonic() >= deadline:
+                    raise CommandError(f"❌ Database not ready after {timeout}s")
+                time.sleep(delay)
+                delay = min(delay * 2, 2)
+        self.stdout.write("✅ Database is ready!")
+
+    # ---- Migrations ----
+    def _migrate(self):
+        connection = connections[DEFAULT_DB_ALIAS]
+        executor = MigrationExecutor(connection)
+        plan = executor.migration_plan(executor.loader.graph.leaf_nodes())
+        if not plan and not self.force:
+            self.stdout.write("⏭️ Migrations up to date")
+            return
+        self.stdout.write(f"🔄 Applying {len(plan)} migration(s)...")
+        call_command("migrate", interactive=False, verbosity=1)
+
+    # ---- Static ----
+    def _collectstatic(self, previous: str) -> str:
+        fingerprint = static_fingerprint()
+        manifest = Path(settings.STATIC_ROOT) / "staticfiles.json"
+        needs_manifest = "Manifest" in getattr(settings, "STATICFILES_STORAGE", "")
+        if (
+            fingerprint == previous
+            and (manifest.exists() or not needs_manifest)
+            and not self.force
+        ):
+            self.stdout.write("⏭️ Static files unchanged")
+            return fingerprint
+        self.stdout.write("📦 Collecting static files...")
+        call_command("collectstatic", interactive=False, clear=True, verbosity=0)
+        return fingerprint
+
+    # ---- Wagtail Site ----
+    def _ensure_site(self):
+        from wagtail.models import Page, Site
+        from home.models import HomePage
+
+        host = os.environ.get("SITE_HOSTNAME", "localhost")
+        port = int(os.environ.get("SITE_PORT", "8000"))
+        site_name = os.environ.get("SITE_NAME", "Site")
+        is_default = os.environ.get("SITE_DEFAULT", "true").lower() in ("1", "true", "yes")
+
+        def find_home(root):
+            # 1) försök hitta en HomePage
+            home = Page.objects.type(HomePage).first()
+            # 2) annars återanvänd valfri sida med slug 'home'
+            if not home:
+                home = Page.objects.filter(slug="home", path__startswith=root.path).specific().first()
+            return home
+
+        # Snabb väg: Site finns redan och pekar på rätt sida -> inget att göra
+        site = Site.objects.filter(hostname=host, port=port).first()
+        if site and not self.force:
+            home = find_home(Page.get_first_root_node())
+            if home and site.root_page_id == home.id:
+                self.stdout.write("⏭️ Wagtail Site ok")
+                return
+
+        self.stdout.write("🏠 Ensuring Wagtail Site/HomePage...")
+        with transaction.atomic():
+            root = Page.get_first_root_node()
+            home = find_home(root)
+            # 3) annars skapa en ny HomePage
+            if not home:
+                home = HomePage(title="Home", slug="home")
+                root.add_child(instance=home)
+                home.save_revision().publish()
+
+            site, created = Site.objects.get_or_create(
+                hostname=host, port=port,
+                defaults={"site_name": site_name, "root_page": home, "is_default_site": is_default},
+            )
+            if not created and site.root_page_id != home.id:
+                site.root_page = home
+                site.save()
+        self.stdout.write("✅ Wagtail Site ok")
+
+    # ---- State ----
+    def _load_state(self) -> dict:
+        legacy = Path(settings.STATIC_ROOT) / LEGACY_STATE_FILENAME
+        state = {}
+        for path in (self.state_path, legacy):
+            try:
+                state = json.loads(path.read_text())
+                break
+            except (OSError, ValueError):
+                continue
+        # Gammal tillståndsfil i STATIC_ROOT: flytta ut den, WhiteNoise serverar allt där
+        try:
+            legacy.unlink(missing_ok=True)
+        except OSError as exc:
+            self.stderr.write(f"⚠️ Could not remove {legacy}: {exc}")
+        return state
+
+    def _save_state(self, state: dict):
+        try:
+            self.state_path.parent.mkdir(parents=True, exist_ok=True)
+            self.state_path.write_text(json.dumps(state))
+        except OSError as exc:
+            self.stderr.write(f"⚠️ Could not record bootstrap state: {exc}")
@@ -0,0 +1,56 @@
+import sys
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from home import exports
+
+
+def _date(value: str) -> date:
+    try:
+        return date.fromisoformat(value)
+    except ValueError:
+        raise CommandError(f"❌ Bad date '{value}' (expected YYYY-MM-DD)")
+
+
+class Command(BaseCommand):
+    help = (
+        "Export contact submissions as CSV or XLSX, streamed from the database in chunks "
+        "(constant memory, any table size)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--format", choices=("csv", "xlsx"), default="csv")
+        parser.add_argument("--output", "-o", help="File to write (default: dated file name; '-' = stdout, CSV only)")
+        parser.add_argument("--since", help="From this date, YYYY-MM-DD")
+        parser.add_argument("--until", help="Up to and including this date, YYYY-MM-DD")
+        read = parser.add_mutually_exclusive_group()
+        read.add_argument("--read", dest="read", action="store_true", default=None)
+        read.add_argument("--unread", dest="read", action="store_false")
+        replied = parser.add_mutually_exclusive_group()
+        replied.add_argument("--replied", dest="replied", action="store_true", default=None)
+        replied.add_argument("--not-replied", dest="replied", action="store_false")
+        parser.add_argument("--chunk-size", type=int, default=exports.CHUNK_SIZE)
+
+    def handle(self, *args, **options):
+        queryset = exports.filter_submissions(
+            since=_date(options["since"]) if options["since"] else None,
+            until=_date(options["until"]) if options["until"] else None,
+            read=options["read"],
+            replied=options["replied"],
+        )
+        output = options["output"] or exports.filename(options["format"])
+
+        if output == "-":
+            if options["format"] != "csv":
+                raise CommandError("❌ Only CSV can be written to stdout")
+            exports.write_csv(queryset, sys.stdout, options["chunk_size"])
+            return
+
+        if options["format"] == "csv":
+            with open(output, "w", encoding="utf-8", newline="") as fh:
+                count = exports.write_csv(queryset, fh, options["chunk_size"])
+        else:
+            with open(output, "wb") as fh:
+                count = exports.write_xlsx(queryset, fh, options["chunk_size"])
+        self.stdout.write(self.style.SUCCESS(f"✅ Exported {count} submissions to {output}"))
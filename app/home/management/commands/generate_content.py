@@ -0,0 +1,68 @@
+import logging
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from wagtail.models import Site
+
+from home.counters import rebuild_counters
+from home.middleware import invalidate_negative_cache
+from home.models import BlogIndexPage, ProjectIndexPage
+from home.synthetic import DEFAULT_BATCH_SIZE, ContentGenerator
+
+
+class Command(BaseCommand):
+    help = (
+        "Generate synthetic BlogPages/ProjectPages (StreamField bodies, tags, categories, tech stack, "
+        "revisions) in bulk for benchmarks and load tests. Same --seed = same content."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--posts", type=int, default=1000)
+        parser.add_argument("--projects", type=int, default=1000)
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+        parser.add_argument("--images", type=int, default=6, help="Generated placeholder images to reuse")
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        generator = ContentGenerator(seed=options["seed"], batch_size=options["batch_size"], images=options["images"])
+
+        site = Site.objects.filter(is_default_site=True).select_related("root_page").first()
+        if site is None:
+            raise CommandError("No default Wagtail Site – run `manage.py bootstrap` first")
+        root = site.root_page
+
+        with transaction.atomic():
+            blog_index = self._index(root, BlogIndexPage, "Blog", "blog") if options["posts"] else None
+            project_index = self._index(root, ProjectIndexPage, "Projects", "projects") if options["projects"] else None
+            generator.snippets()
+
+        # wagtail loggar inget här (ingen add_child), men sök-indexeringen per sida är pratig på DEBUG
+        logging.disable(logging.INFO)
+        try:
+            if blog_index:
+                self.stdout.write(f"📝 Generating {options['posts']} blog posts under {blog_index.url_path}...")
+                generator.blog_posts(blog_index, options["posts"])
+            if project_index:
+                self.stdout.write(f"🧪 Generating {options['projects']} projects under {project_index.url_path}...")
+                generator.projects(project_index, options["projects"])
+        finally:
+            logging.disable(logging.NOTSET)
+
+        rebuild_counters()
+        invalidate_negative_cache()
+
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ Generated {options['posts']} posts + {options['projects']} projects in {elapsed:.1f}s "
+            f"(seed {options['seed']})"
+        ))
+        self.stdout.write("ℹ️ Run `manage.py rebuild_references_index` if you need usage counts in the admin")
+
+    def _index(self, root, model, title, slug):
+        index = model.objects.child_of(root).first()
+        if index is None:
+            index = root.add_child(instance=model(title=title, slug=slug))
+            self.stdout.write(f"➕ Created {model._meta.verbose_name} {index.url_path}")
+        return index
@@ -0,0 +1,134 @@
+import json
+import tempfile
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+
+from home.loadtest import (
+    DEFAULT_MIX, StubServer, discover, free_port, run, start_gunicorn, stop_gunicorn, wait_until_healthy,
+)
+
+
+def parse_mix(value: str) -> dict:
+    """
+    "home=10,htb_stats=30" -> overrides on top of DEFAULT_MIX (0 disables a route)
+    """
+    mix = dict(DEFAULT_MIX)
+    for part in filter(None, (p.strip() for p in value.split(","))):
+        name, _, weight = part.partition("=")
+        if name not in DEFAULT_MIX:
+            raise CommandError(f"Unknown route '{name}' (known: {', '.join(DEFAULT_MIX)})")
+        try:
+            mix[name] = float(weight)
+        except ValueError:
+            raise CommandError(f"Bad weight in '{part}'")
+    return mix
+
+
+class Command(BaseCommand):
+    help = (
+        "Boot the app under config/gunicorn_config.py with local HTB/Discord stand-ins "
+        "(configurable latency/failures) and drive a traffic mix at a target RPS. "
+        "Creates ContactSubmissions – run it against a scratch database."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rps", type=float, default=20)
+        parser.add_argument("--duration", type=float, default=30, help="Seconds (default 30)")
+        parser.add_argument("--concurrency", type=int, default=32, help="Client threads (default 32)")
+        parser.add_argument("--mix", default="", help=f"Route weights, e.g. 'htb_stats=30,contact_post=0' ({', '.join(DEFAULT_MIX)})")
+        parser.add_argument("--seed", type=int, default=0)
+
+        parser.add_argument("--workers", type=int, default=2, help="GUNICORN_WORKERS (default 2)")
+        parser.add_argument("--threads", type=int, default=4, help="GUNICORN_THREADS (default 4)")
+        parser.add_argument("--base-url", default="", help="Use an already running server instead (no stubs wired in)")
+
+        parser.add_argument("--htb-latency-ms", type=float, default=200)
+        parser.add_argument("--htb-failure-rate", type=float, default=0)
+        parser.add_argument("--htb-cache-ttl", type=int, default=5,
+                            help="HTB_CACHE_TTL_SECONDS/HTB_FAILURE_CACHE_TTL_SECONDS for the server (default 5)")
+        parser.add_argument("--discord-latency-ms", type=float, default=300)
+        parser.add_argument("--discord-failure-rate", type=float, default=0)
+        parser.add_argument("--keep-ratelimit", action="store_true", help="Leave the contact form rate limit on")
+
+        parser.add_argument("--json", help="Write the report as JSON to this path")
+
+    def handle(self, *args, **options):
+        mix = parse_mix(options["mix"])
+        routes = discover()
+        missing = [name for name, weight in mix.items() if weight > 0 and name not in routes]
+        if missing:
+            self.stdout.write(self.style.WARNING(f"⚠️ No targets for {', '.join(missing)} – skipped"))
+
+        htb = StubServer("htb", options["htb_latency_ms"], options["htb_failure_rate"], options["seed"]).start()
+        discord = StubServer("discord", options["discord_latency_ms"], options["discord_failure_rate"], options["seed"] + 1).start()
+        process = None
+        try:
+            base_url = options["base_url"].rstrip("/")
+            if not base_url:
+                port = free_port()
+                base_url = f"http://127.0.0.1:{port}"
+                log_path = Path(tempfile.gettempdir()) / f"loadtest-gunicorn-{port}.log"
+                env = {
+                    "GUNICORN_WORKERS": str(options["workers"]),
+                    "GUNICORN_THREADS": str(options["threads"]),
+                    "HTB_API_BASE": htb.url,
+                    "HTB_TOKEN": "loadtest",
+                    "HTB_USER_ID": "1",
+                    "HTB_CACHE_TTL_SECONDS": str(options["htb_cache_ttl"]),
+                    "HTB_FAILURE_CACHE_TTL_SECONDS": str(options["htb_cache_ttl"]),
+                    "DISCORD_WEBHOOK_URL": f"{discord.url}/api/webhooks/loadtest",
+                    "DJANGO_ALLOWED_HOSTS": "127.0.0.1,localhost",
+                }
+                if not options["keep_ratelimit"]:
+                    env["RATELIMIT_ENABLE"] = "0"
+                self.stdout.write(f"🌐 Starting gunicorn on {base_url} (log: {log_path})...")
+                process = start_gunicorn(port, env, log_path)
+                wait_until_healthy(base_url, process)
+            else:
+                wait_until_healthy(base_url)
+
+            self.stdout.write(
+                f"🔥 {options['rps']:g} rps for {options['duration']:g}s "
+                f"(HTB {options['htb_latency_ms']:g}ms/{options['htb_failure_rate']:.0%} fail, "
+                f"Discord {options['discord_latency_ms']:g}ms/{options['discord_failure_rate']:.0%} fail)..."
+            )
+            report = run(
+                base_url, routes, mix, options["rps"], options["duration"],
+                concurrency=options["concurrency"], seed=options["seed"],
+            )
+        except RuntimeError as exc:
+            raise CommandError(str(exc))
+        finally:
+            if process is not None:
+                stop_gunicorn(process)
+            htb.stop()
+            discord.stop()
+
+        report["stubs"] = {
+            stub.name: {"calls": stub.calls, "failures": stub.failures} for stub in (htb, discord)
+        }
+        self._print(report)
+        if options["json"]:
+            Path(options["json"]).write_text(json.dumps(report, indent=2))
+            self.stdout.write(f"💾 Report written to {options['json']}")
+
+    def _print(self, report: dict) -> None:
+        self.stdout.write(
+            f"\n{'route':<16}{'reqs':>7}{'rps':>8}{'p50':>9}{'p90':>9}{'p99':>9}{'max':>9}{'4xx':>6}{'err%':>7}"
+        )
+        for route, row in report["routes"].items():
+            self.stdout.write(
+                f"{route:<16}{row['requests']:>7}{row['rps']:>8}{row['p50_ms']:>9}{row['p90_ms']:>9}"
+                f"{row['p99_ms']:>9}{row['max_ms']:>9}{row['4xx']:>6}{row['error_pct']:>7}"
+            )
+        self.stdout.write(
+            f"\n📊 {report['requests']} requests in {report['duration_s']}s = {report['throughput_rps']} rps, "
+            f"{report['errors']} errors (latency in ms from scheduled send time)"
+        )
+        for name, counts in report["stubs"].items():
+            self.stdout.write(f"🔌 {name} stub: {counts['calls']} calls, {counts['failures']} failed")
+        if report["max_client_lag_ms"] > 100:
+            self.stdout.write(self.style.WARNING(
+                f"⚠️ Client fell {report['max_client_lag_ms']}ms behind schedule – raise --concurrency"
+            ))
@@ -0,0 +1,27 @@
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from home.profiler import PROFILE_TOKEN_HEADER, make_token
+
+
+class Command(BaseCommand):
+    help = "Print a signed X-Profile-Token header for profiling a single request as a staff user"
+
+    def add_arguments(self, parser):
+        parser.add_argument("username")
+
+    def handle(self, *args, **options):
+        User = get_user_model()
+        try:
+            user = User.objects.get(**{User.USERNAME_FIELD: options["username"]})
+        except User.DoesNotExist:
+            raise CommandError(f"❌ No user {options['username']!r}")
+        if not (user.is_active and user.is_staff):
+            raise CommandError("❌ Only active staff users can profile requests")
+        if not settings.PROFILER_ENABLED:
+            self.stderr.write("⚠️ PROFILER_ENABLED is off – the token won't do anything until it's on")
+
+        minutes = settings.PROFILER_TOKEN_MAX_AGE_SECONDS // 60
+        self.stdout.write(f"{PROFILE_TOKEN_HEADER}: {make_token(user)}")
+        self.stdout.write(self.style.SUCCESS(f"✅ Valid for {minutes} minutes, e.g. curl -H '<header>' <url>"))
@@ -0,0 +1,63 @@
+import gzip
+import json
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.utils import timezone
+
+from home.models import ContactSubmission
+
+
+class Command(BaseCommand):
+    help = (
+        "Delete contact submissions older than CONTACT_RETENTION_DAYS in small batches "
+        "(optionally archived to a gzipped JSON Lines file first). Safe to run from cron."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--days", type=int, default=settings.CONTACT_RETENTION_DAYS,
+                            help=f"Keep this many days (default CONTACT_RETENTION_DAYS = {settings.CONTACT_RETENTION_DAYS})")
+        parser.add_argument("--batch-size", type=int, default=1000)
+        parser.add_argument("--archive", help="Append the rows to this .jsonl.gz file before deleting them")
+        parser.add_argument("--dry-run", action="store_true", help="Only count what would be removed")
+
+    def handle(self, *args, **options):
+        if options["days"] < 1 or options["batch_size"] < 1:
+            raise CommandError("❌ --days and --batch-size must be at least 1")
+
+        cutoff = timezone.now() - timedelta(days=options["days"])
+        # Indexet på (-submitted_at, -id) ger de äldsta först utan sortering
+        old = ContactSubmission.objects.filter(submitted_at__lt=cutoff).order_by("submitted_at", "id")
+
+        if options["dry_run"]:
+            self.stdout.write(f"🔎 {old.count()} submissions older than {cutoff:%Y-%m-%d} would be removed")
+            return
+
+        archive = gzip.open(options["archive"], "at", encoding="utf-8") if options["archive"] else None
+        removed = 0
+        try:
+            while True:
+                # En kort transaktion per batch – inga långa lås, avbrott lämnar inget halvgjort
+                with transaction.atomic():
+                    rows = list(old.values()[:options["batch_size"]])
+                    if not rows:
+                        break
+                    if archive is not None:
+                        for row in rows:
+                            archive.write(json.dumps(row, cls=DjangoJSONEncoder) + "\n")
+                        archive.flush()
+                    ContactSubmission.objects.filter(pk__in=[row["id"] for row in rows]).delete()
+                removed += len(rows)
+                if options["verbosity"] > 1:
+                    self.stdout.write(f"🧹 {removed} removed...")
+        finally:
+            if archive is not None:
+                archive.close()
+
+        where = f", archived to {options['archive']}" if archive is not None else ""
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ Removed {removed} submissions older than {cutoff:%Y-%m-%d}{where}"
+        ))
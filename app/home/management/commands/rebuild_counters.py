@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from home.counters import rebuild_counters
+
+
+class Command(BaseCommand):
+    help = "Recompute the denormalized site counters (projects/posts per category, tag, tech, status)"
+
+    def handle(self, *args, **options):
+        counts = rebuild_counters()
+        if options["verbosity"] > 1:
+            for key in sorted(counts):
+                self.stdout.write(f"{key} = {counts[key]}")
+        self.stdout.write(self.style.SUCCESS(f"✅ Rebuilt {len(counts)} counters"))
@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+from django.core.wsgi import get_wsgi_application
+
+from home.warmup import warm_up
+
+
+class Command(BaseCommand):
+    help = "Render one page of each type through the WSGI app to prime templates, URL resolver and caches"
+
+    def handle(self, *args, **options):
+        results = warm_up(get_wsgi_application())
+        for label, status, elapsed_ms in results:
+            style = self.style.SUCCESS if status < 400 else self.style.WARNING
+            self.stdout.write(style(f"{label:<18} {status} {elapsed_ms:8.1f}ms"))
+        if not results:
+            self.stdout.write(self.style.WARNING("Nothing warmed up (no live pages?)"))
@@ -0,0 +1,200 @@
+"""
+Media/document delivery without streaming bytes through Python.
+
+MEDIA_SERVE_MODE:
+  accel     – X-Accel-Redirect to MEDIA_ACCEL_PREFIX (nginx internal location)
+  sendfile  – X-Sendfile with the absolute path (Apache mod_xsendfile, lighttpd)
+  direct    – served by the worker; gunicorn hands FileResponse to os.sendfile,
+              with byte ranges and conditional GET handled here
+  off       – no /media/ route (proxy serves MEDIA_ROOT itself)
+"""
+import mimetypes
+import os
+import re
+import stat
+from urllib.parse import quote
+
+from django.conf import settings
+from django.http import FileResponse, Http404, HttpResponse, HttpResponseNotModified
+from django.utils._os import safe_join
+from django.utils.cache import patch_cache_control
+from django.utils.http import http_date, parse_http_date_safe
+from django.views.decorators.http import require_safe
+
+RANGE_RE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+
+class _FileRange:
+    """
+    File wrapper that stops after `length` bytes. Keeps fileno() so gunicorn's
+    wsgi.file_wrapper can still sendfile() the slice (offset = current position,
+    count = Content-Length).
+    """
+
+    def __init__(self, fileobj, start: int, length: int):
+        fileobj.seek(start)
+        self._file = fileobj
+        self._remaining = length
+        self.name = fileobj.name
+
+    def read(self, size=-1):
+        if self._remaining <= 0:
+            return b""
+        if size is None or size < 0 or size > self._remaining:
+            size = self._remaining
+        data = self._file.read(size)
+        self._remaining -= len(data)
+        return data
+
+    def fileno(self):
+        return self._file.fileno()
+
+    def tell(self):
+        return self._file.tell()
+
+    def seek(self, *args):
+        return self._file.seek(*args)
+
+    def close(self):
+        self._file.close()
+
+
+def _etag(statobj) -> str:
+    return f'"{statobj.st_mtime_ns:x}-{statobj.st_size:x}"'
+
+
+def _not_modified(request, etag: str, mtime: int) -> bool:
+    if_none_match = request.headers.get("If-None-Match")
+    if if_none_match is not None:
+        return if_none_match.strip() == "*" or etag in [t.strip() for t in if_none_match.split(",")]
+    since = parse_http_date_safe(request.headers.get("If-Modified-Since") or "")
+    return since is not None and int(mtime) <= since
+
+
+def _parse_range(header: str, size: int):
+    """
+    Single byte range -> (start, end) inclusive, None if absent/unsupported,
+    "unsatisfiable" if it can't be served
+    """
+    match = RANGE_RE.match(header.strip()) if header else None
+    if not match:
+        return None
+    first, last = match.groups()
+    if not first and not last:
+        return None
+    if not first:
+        suffix = int(last)
+        if suffix == 0:
+            return "unsatisfiable"
+        return max(size - suffix, 0), size - 1
+    start = int(first)
+    end = int(last) if last else size - 1
+    if start >= size or end < start:
+        return "unsatisfiable"
+    return start, min(end, size - 1)
+
+
+def _range_allowed(request, etag: str, mtime: int) -> bool:
+    if_range = request.headers.get("If-Range")
+    if not if_range:
+        return True
+    if if_range.startswith('"') or if_range.startswith("W/"):
+        return if_range == etag
+    since = parse_http_date_safe(if_range)
+    return since is not None and int(mtime) <= since
+
+
+def _offloaded(path: str, mode: str, content_type: str) -> HttpResponse:
+    response = HttpResponse(content_type=content_type)
+    if mode == "accel":
+        relative = os.path.relpath(path, settings.MEDIA_ROOT)
+        prefix = settings.MEDIA_ACCEL_PREFIX.rstrip("/")
+        response["X-Accel-Redirect"] = quote(f"{prefix}/{relative}")
+    else:
+        response["X-Sendfile"] = path
+    return response
+
+
+def file_response(request, path: str, *, content_type: str = None, ranges: bool = True) -> HttpResponse:
+    """
+    Build a response for a file under MEDIA_ROOT according to MEDIA_SERVE_MODE
+    """
+    try:
+        statobj = os.stat(path)
+    except OSError:
+        raise Http404("File does not exist")
+    if not stat.S_ISREG(statobj.st_mode):
+        raise Http404("File does not exist")
+
+    if content_type is None:
+        content_type = mimetypes.guess_type(path)[0] or "application/octet-stream"
+
+    mode = settings.MEDIA_SERVE_MODE
+    if mode in ("accel", "sendfile"):
+        # Proxyn sköter ranges, conditional GET och själva överföringen
+        return _offloaded(path, mode, content_type)
+
+    etag = _etag(statobj)
+    if _not_modified(request, etag, statobj.st_mtime):
+        response = HttpResponseNotModified()
+        response["ETag"] = etag
+        return response
+
+    size = statobj.st_size
+    byte_range = None
+    if ranges and _range_allowed(request, etag, statobj.st_mtime):
+        byte_range = _parse_range(request.headers.get("Range"), size)
+
+    if byte_range == "unsatisfiable":
+        response = HttpResponse(status=416)
+        response["Content-Range"] = f"bytes */{size}"
+        return response
+
+    fileobj = open(path, "rb")
+    if byte_range:
+        start, end = byte_range
+        length = end - start + 1
+        response = FileResponse(_FileRange(fileobj, start, length), content_type=content_type, status=206)
+        response["Content-Range"] = f"bytes {start}-{end}/{size}"
+    else:
+        length = size
+        response = FileResponse(fileobj, content_type=content_type)
+
+    response["Content-Length"] = str(length)
+    response["Accept-Ranges"] = "bytes" if ranges else "none"
+    response["ETag"] = etag
+    response["Last-Modified"] = http_date(statobj.st_mtime)
+    return response
+
+
+@require_safe
+def serve_media(request, path):
+    """
+    /media/<path> – public max-age plus ETag/Last-Modified revalidation;
+    far-future immutable only under MEDIA_IMMUTABLE_PREFIXES. Documents
+    (MEDIA_PRIVATE_PREFIXES) are refused: they are served by wagtaildocs,
+    which checks collection privacy and runs before_serve_document hooks.
+    """
+    try:
+        full_path = safe_join(settings.MEDIA_ROOT, path)
+    except Exception:
+        raise Http404("Invalid path")
+    relative = os.path.relpath(full_path, settings.MEDIA_ROOT).replace(os.sep, "/") + "/"
+    if relative.startswith(settings.MEDIA_PRIVATE_PREFIXES):
+        raise Http404("File does not exist")
+
+    response = file_response(request, full_path)
+    if settings.MEDIA_IMMUTABLE_PREFIXES and path.startswith(settings.MEDIA_IMMUTABLE_PREFIXES):
+        patch_cache_control(response, public=True, max_age=365 * 24 * 60 * 60, immutable=True)
+    else:
+        patch_cache_control(response, public=True, max_age=settings.MEDIA_CACHE_MAX_AGE_SECONDS)
+    return response
+
+
+def sendfile(request, filename, mimetype=None, **kwargs):
+    """
+    SENDFILE_BACKEND for wagtail.documents. Wagtail overwrites Content-Length
+    with the full file size afterwards, so documents never get partial responses
+    in direct mode (accel/sendfile let the proxy do ranges).
+    """
+    return file_response(request, filename, content_type=mimetype, ranges=False)
@@ -0,0 +1,511 @@
+"""
+Per-request performance metrics.
+
+PerformanceMiddleware collects, for every request: total time, DB queries/time
+(execute_wrapper), cache hits/misses (InstrumentedCache), template render time
+(InstrumentedDjangoTemplates) and outbound HTTP time (timed("http") around the
+HTB/Discord calls). Staff get them in a Server-Timing header; everyone's requests
+are aggregated per view / page type and served as Prometheus text on /metrics.
+A SLOW_REQUEST_SAMPLE_RATE share of requests also records its SQL, and the slow
+ones end up in the slow-request log (home/slowlog.py).
+
+Every gunicorn worker keeps its own aggregates and flushes them to
+METRICS_DIR/<pid>-<start>.json; /metrics sums all files so a scrape sees the
+whole server no matter which worker answers. When a worker exits (max_requests
+recycling) the master folds its file into METRICS_DIR/exited.json
+(gunicorn child_exit), so the directory holds one file per live worker plus one.
+"""
+import glob
+import json
+import logging
+import os
+import random
+import secrets
+import tempfile
+import threading
+import time
+from contextlib import ExitStack, contextmanager
+
+from django.conf import settings
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+from django.db import connections
+from django.http import HttpResponse, HttpResponseForbidden
+from django.template.backends.django import DjangoTemplates
+from django.utils.module_loading import import_string
+
+logger = logging.getLogger(__name__)
+request_logger = logging.getLogger("home.requests")
+
+AGGREGATE_FILE = "exited.json"  # summan av alla avslutade workers
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Händelseräknare utanför request-mätningen: namn -> (metric, label, hjälptext)
+EVENTS = {
+    "contact_dropped": (
+        "portfolio_contact_dropped_total", "reason", "Contact submissions dropped before saving (home/spam.py)",
+    ),
+}
+
+_current = threading.local()
+
+
+# ============= PER REQUEST =============
+
+class RequestMetrics:
+    __slots__ = ("started", "db_count", "db_ms", "cache_hits", "cache_misses",
+                 "template_ms", "http_ms", "http_count", "queries", "_depth")
+
+    def __init__(self, sample_queries: bool = False):
+        self.started = time.perf_counter()
+        self.db_count = 0
+        self.db_ms = 0.0
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.template_ms = 0.0
+        self.http_ms = 0.0
+        self.http_count = 0
+        # Samplade requests: {sql: [antal, ms]} för slow-request-loggen (home/slowlog.py)
+        self.queries = {} if sample_queries else None
+        self._depth = {}
+
+    def total_ms(self) -> float:
+        return (time.perf_counter() - self.started) * 1000
+
+
+def current() -> "RequestMetrics | None":
+    return getattr(_current, "metrics", None)
+
+
+@contextmanager
+def timed(part: str):
+    """
+    Add the block's duration to the current request ("template", "http").
+    Nested blocks of the same part count once (include/render_to_string in a render).
+    """
+    metrics = current()
+    if metrics is None or metrics._depth.get(part):
+        yield
+        return
+    metrics._depth[part] = 1
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        metrics._depth[part] = 0
+        elapsed = (time.perf_counter() - start) * 1000
+        if part == "http":
+            metrics.http_ms += elapsed
+            metrics.http_count += 1
+        else:
+            metrics.template_ms += elapsed
+
+
+def _db_wrapper(execute, sql, params, many, context):
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        metrics = current()
+        if metrics is not None:
+            elapsed = (time.perf_counter() - start) * 1000
+            metrics.db_count += 1
+            metrics.db_ms += elapsed
+            if metrics.queries is not None:
+                entry = metrics.queries.get(sql)
+                if entry is None:
+                    metrics.queries[sql] = [1, elapsed]
+                else:
+                    entry[0] += 1
+                    entry[1] += elapsed
+
+
+# ============= CACHE / TEMPLATES =============
+
+_MISSING = object()
+
+
+class InstrumentedCache:
+    """
+    Cache backend proxy counting hits/misses for the current request.
+    CACHES OPTIONS["BACKEND"] is the real backend (default LocMemCache); every
+    other option is passed through to it.
+    """
+
+    def __init__(self, location, params):
+        params = dict(params)
+        options = dict(params.get("OPTIONS", {}))
+        backend = options.pop("BACKEND", "django.core.cache.backends.locmem.LocMemCache")
+        params["OPTIONS"] = options
+        self._backend: BaseCache = import_string(backend)(location, params)
+
+    def __getattr__(self, name):
+        return getattr(self._backend, name)
+
+    def __contains__(self, key):
+        return self.has_key(key)
+
+    def _count(self, hits: int, misses: int):
+        metrics = current()
+        if metrics is not None:
+            metrics.cache_hits += hits
+            metrics.cache_misses += misses
+
+    def get(self, key, default=None, version=None):
+        value = self._backend.get(key, _MISSING, version=version)
+        if value is _MISSING:
+            self._count(0, 1)
+            return default
+        self._count(1, 0)
+        return value
+
+    def get_many(self, keys, version=None):
+        keys = list(keys)
+        values = self._backend.get_many(keys, version=version)
+        self._count(len(values), len(keys) - len(values))
+        return values
+
+    def get_or_set(self, key, default, timeout=DEFAULT_TIMEOUT, version=None):
+        value = self.get(key, _MISSING, version=version)
+        if value is _MISSING:
+            return self._backend.get_or_set(key, default, timeout=timeout, version=version)
+        return value
+
+    def has_key(self, key, version=None):
+        found = self._backend.has_key(key, version=version)
+        self._count(int(found), int(not found))
+        return found
+
+
+class _TimedTemplate:
+    def __init__(self, template):
+        self._template = template
+
+    def __getattr__(self, name):
+        return getattr(self._template, name)
+
+    def render(self, context=None, request=None):
+        with timed("template"):
+            return self._template.render(context, request)
+
+
+class InstrumentedDjangoTemplates(DjangoTemplates):
+    """
+    DjangoTemplates backend whose templates add their render time to the request
+    """
+
+    def from_string(self, template_code):
+        return _TimedTemplate(super().from_string(template_code))
+
+    def get_template(self, template_name):
+        return _TimedTemplate(super().get_template(template_name))
+
+
+# ============= AGGREGATION =============
+
+class MetricsRegistry:
+    """
+    Per-process aggregates: {"series": {label: {"count", "buckets", "sum", ...}},
+    "events": {event: {label: count}}}
+    """
+
+    def __init__(self, directory: str, flush_seconds: float):
+        self.directory = directory
+        self.flush_seconds = flush_seconds
+        self._series = {}
+        self._events = {}
+        self._lock = threading.Lock()
+        self._last_flush = 0.0
+        self._pid = None
+        self._path = None
+
+    def _check_pid(self):
+        # Ny process (gunicorn fork) -> egen fil och egna siffror
+        if self._pid != os.getpid():
+            with self._lock:
+                self._series = {}
+                self._events = {}
+            self._pid = os.getpid()
+            self._path = os.path.join(self.directory, f"{self._pid}-{int(time.time())}.json")
+
+    def observe(self, label: str, metrics: RequestMetrics, total_ms: float):
+        seconds = total_ms / 1000
+        self._check_pid()
+        with self._lock:
+            series = self._series.get(label)
+            if series is None:
+                series = self._series[label] = {
+                    "count": 0, "sum": 0.0, "buckets": [0] * len(LATENCY_BUCKETS),
+                    "db_queries": 0, "db_seconds": 0.0, "cache_hits": 0, "cache_misses": 0,
+                    "template_seconds": 0.0, "http_calls": 0, "http_seconds": 0.0,
+                }
+            series["count"] += 1
+            series["sum"] += seconds
+            for i, bound in enumerate(LATENCY_BUCKETS):
+                if seconds <= bound:
+                    series["buckets"][i] += 1
+            series["db_queries"] += metrics.db_count
+            series["db_seconds"] += metrics.db_ms / 1000
+            series["cache_hits"] += metrics.cache_hits
+            series["cache_misses"] += metrics.cache_misses
+            series["template_seconds"] += metrics.template_ms / 1000
+            series["http_calls"] += metrics.http_count
+            series["http_seconds"] += metrics.http_ms / 1000
+
+        if time.monotonic() - self._last_flush >= self.flush_seconds:
+            self.flush()
+
+    def count(self, event: str, label: str, amount: int = 1):
+        """
+        Bump an EVENTS counter, e.g. count("contact_dropped", "honeypot")
+        """
+        self._check_pid()
+        with self._lock:
+            counts = self._events.setdefault(event, {})
+            counts[label] = counts.get(label, 0) + amount
+
+        if time.monotonic() - self._last_flush >= self.flush_seconds:
+            self.flush()
+
+    def flush(self):
+        """
+        Write this process' aggregates to its own file (atomic replace)
+        """
+        self._check_pid()
+        self._last_flush = time.monotonic()
+        with self._lock:
+            data = json.dumps({"series": self._series, "events": self._events})
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            tmp_path = f"{self._path}.tmp"
+            with open(tmp_path, "w") as fh:
+                fh.write(data)
+            os.replace(tmp_path, self._path)
+        except OSError as exc:
+            logger.warning("Could not write metrics file %s: %s", self._path, exc)
+
+    def merged(self) -> dict:
+        """
+        Sum of the exited-workers aggregate and every live process file
+        """
+        self.flush()
+        aggregate = _read(os.path.join(self.directory, AGGREGATE_FILE)) or {}
+        merged = {"series": {}, "events": {}}
+        _add(merged, aggregate)
+        # Filer som redan ingår i aggregatet (raderas strax efter att det skrivits)
+        skip = {AGGREGATE_FILE, *aggregate.get("folded", [])}
+        for path in glob.glob(os.path.join(self.directory, "*.json")):
+            if os.path.basename(path) not in skip:
+                _add(merged, _read(path) or {})
+        return merged
+
+    def fold(self, pid: int) -> None:
+        """
+        Add an exited worker's file(s) to AGGREGATE_FILE and delete them. Called
+        from gunicorn's child_exit in the master – one caller at a time.
+        """
+        paths = glob.glob(os.path.join(self.directory, f"{pid}-*.json"))
+        if not paths:
+            return
+        aggregate_path = os.path.join(self.directory, AGGREGATE_FILE)
+        aggregate = _read(aggregate_path) or {}
+        totals = {"series": {}, "events": {}}
+        _add(totals, aggregate)
+        folded = [name for name in aggregate.get("folded", []) if os.path.exists(os.path.join(self.directory, name))]
+        for path in paths:
+            data = _read(path)
+            if data is not None:
+                _add(totals, data)
+                folded.append(os.path.basename(path))
+        try:
+            # Aggregatet (med "folded") ersätts atomiskt först – en samtidig scrape räknar aldrig dubbelt
+            tmp_path = f"{aggregate_path}.tmp"
+            with open(tmp_path, "w") as fh:
+                json.dump({**totals, "folded": folded}, fh)
+            os.replace(tmp_path, aggregate_path)
+            for path in paths:
+                os.remove(path)
+        except OSError as exc:
+            logger.warning("Could not fold metrics of worker %s: %s", pid, exc)
+
+
+def _read(path: str):
+    try:
+        with open(path) as fh:
+            return json.load(fh)
+    except (OSError, ValueError):
+        return None
+
+
+def _add(target: dict, data: dict) -> None:
+    for label, series in data.get("series", {}).items():
+        current_series = target["series"].get(label)
+        if current_series is None:
+            target["series"][label] = json.loads(json.dumps(series))
+            continue
+        for key, value in series.items():
+            if key == "buckets":
+                current_series[key] = [a + b for a, b in zip(current_series[key], value)]
+            else:
+                current_series[key] += value
+    for event, counts in data.get("events", {}).items():
+        current_counts = target["events"].setdefault(event, {})
+        for label, value in counts.items():
+            current_counts[label] = current_counts.get(label, 0) + value
+
+
+registry = MetricsRegistry(
+    getattr(settings, "METRICS_DIR", None) or os.path.join(tempfile.gettempdir(), "portfolio-metrics"),
+    getattr(settings, "METRICS_FLUSH_SECONDS", 5),
+)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def render_prometheus(merged: dict) -> str:
+    series_by_label = merged["series"]
+    lines = [
+        "# HELP portfolio_request_duration_seconds Request latency per view / page type",
+        "# TYPE portfolio_request_duration_seconds histogram",
+    ]
+    counters = (
+        ("db_queries", "portfolio_db_queries_total", "Database queries"),
+        ("db_seconds", "portfolio_db_seconds_total", "Time spent in database queries"),
+        ("cache_hits", "portfolio_cache_hits_total", "Cache hits"),
+        ("cache_misses", "portfolio_cache_misses_total", "Cache misses"),
+        ("template_seconds", "portfolio_template_seconds_total", "Time spent rendering templates"),
+        ("http_calls", "portfolio_outbound_http_requests_total", "Outbound HTTP calls (HTB, Discord)"),
+        ("http_seconds", "portfolio_outbound_http_seconds_total", "Time spent in outbound HTTP calls"),
+    )
+    labels = sorted(series_by_label)
+    for label in labels:
+        series = series_by_label[label]
+        view = _escape(label)
+        for bound, count in zip(LATENCY_BUCKETS, series["buckets"]):
+            lines.append(f'portfolio_request_duration_seconds_bucket{{view="{view}",le="{bound}"}} {count}')
+        lines.append(f'portfolio_request_duration_seconds_bucket{{view="{view}",le="+Inf"}} {series["count"]}')
+        lines.append(f'portfolio_request_duration_seconds_sum{{view="{view}"}} {series["sum"]:.6f}')
+        lines.append(f'portfolio_request_duration_seconds_count{{view="{view}"}} {series["count"]}')
+    for key, name, help_text in counters:
+        lines.append(f"# HELP {name} {help_text} per view / page type")
+        lines.append(f"# TYPE {name} counter")
+        for label in labels:
+            value = series_by_label[label][key]
+            lines.append(f'{name}{{view="{_escape(label)}"}} {value:.6f}' if isinstance(value, float)
+                         else f'{name}{{view="{_escape(label)}"}} {value}')
+    for event, (name, label_name, help_text) in EVENTS.items():
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} counter")
+        for label, value in sorted(merged["events"].get(event, {}).items()):
+            lines.append(f'{name}{{{label_name}="{_escape(label)}"}} {value}')
+    return "\n".join(lines) + "\n"
+
+
+# ============= MIDDLEWARE / VIEW =============
+
+def _label(request, response) -> str:
+    # Wagtail-sidor märks via before_serve_page-hooken (home/wagtail_hooks.py)
+    label = getattr(request, "metrics_label", None)
+    if label:
+        return label
+    match = getattr(request, "resolver_match", None)
+    if match is not None:
+        return match.view_name or match._func_path
+    return f"unresolved:{response.status_code // 100}xx"
+
+
+def _server_timing(metrics: RequestMetrics, total_ms: float) -> str:
+    return ", ".join([
+        f"total;dur={total_ms:.1f}",
+        f'db;dur={metrics.db_ms:.1f};desc="{metrics.db_count} queries"',
+        f'cache;desc="{metrics.cache_hits} hit / {metrics.cache_misses} miss"',
+        f"tpl;dur={metrics.template_ms:.1f}",
+        f'http;dur={metrics.http_ms:.1f};desc="{metrics.http_count} calls"',
+    ])
+
+
+# Sätts i WSGI-environ av home/warmup.py (kan inte komma från en klient – headers blir HTTP_*)
+WARMUP_ENVIRON_KEY = "portfolio.warmup"
+
+
+class PerformanceMiddleware:
+    """
+    Outermost middleware: times the whole request, Server-Timing for staff,
+    aggregates into the /metrics registry (worker warm-up requests are skipped)
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.enabled = getattr(settings, "METRICS_ENABLED", True)
+        self.sample_rate = getattr(settings, "SLOW_REQUEST_SAMPLE_RATE", 0)
+        self.slow_ms = getattr(settings, "SLOW_REQUEST_THRESHOLD_MS", 500)
+
+    def __call__(self, request):
+        if not self.enabled or request.META.get(WARMUP_ENVIRON_KEY):
+            return self.get_response(request)
+
+        metrics = RequestMetrics(sample_queries=self.sample_rate > 0 and random.random() < self.sample_rate)
+        previous = current()
+        _current.metrics = metrics
+        try:
+            with ExitStack() as stack:
+                for conn in connections.all(initialized_only=False):
+                    stack.enter_context(conn.execute_wrapper(_db_wrapper))
+                response = self.get_response(request)
+        finally:
+            _current.metrics = previous
+
+        total_ms = metrics.total_ms()
+        label = _label(request, response)
+        registry.observe(label, metrics, total_ms)
+        if metrics.queries is not None and total_ms >= self.slow_ms:
+            from .slowlog import record_slow_request
+            record_slow_request(request, response, label, metrics, total_ms)
+
+        # En rad per request (samplas via LOG_SAMPLE_RATES); långsamma som WARNING
+        request_logger.log(
+            logging.WARNING if total_ms >= self.slow_ms else logging.INFO,
+            "%s %s %s", request.method, request.path, response.status_code,
+            extra={
+                "view": label,
+                "status": response.status_code,
+                "duration_ms": round(total_ms, 1),
+                "db_queries": metrics.db_count,
+                "db_ms": round(metrics.db_ms, 1),
+                "cache_hits": metrics.cache_hits,
+                "cache_misses": metrics.cache_misses,
+                "template_ms": round(metrics.template_ms, 1),
+                "http_ms": round(metrics.http_ms, 1),
+            },
+        )
+
+        user = getattr(request, "user", None)
+        if user is not None and user.is_staff:
+            response["Server-Timing"] = _server_timing(metrics, total_ms)
+        return response
+
+
+def _token_ok(request) -> bool:
+    token = getattr(settings, "METRICS_TOKEN", "")
+    header = request.headers.get("Authorization", "")
+    return bool(token) and header.startswith("Bearer ") and secrets.compare_digest(header[7:], token)
+
+
+def _admin_ok(request) -> bool:
+    user = getattr(request, "user", None)
+    return user is not None and user.is_authenticated and user.has_perm("wagtailadmin.access_admin")
+
+
+def metrics_view(request):
+    """
+    Prometheus text exposition. Staff with admin access, or Bearer METRICS_TOKEN
+    for the scraper; 403 for everyone else (no login redirect for a scraper to follow)
+    """
+    if not (_token_ok(request) or _admin_ok(request)):
+        return HttpResponseForbidden("Forbidden", content_type="text/plain")
+    return HttpResponse(
+        render_prometheus(registry.merged()),
+        content_type="text/plain; version=0.0.4; charset=utf-8",
+    )
@@ -0,0 +1,218 @@
+import logging
+import re
+import threading
+import time
+from collections import Counter, OrderedDict
+
+from django.conf import settings
+from django.core.cache import caches
+from django.http import HttpResponseNotFound
+from django.urls import reverse
+
+from config.db_router import replica_reads
+
+logger = logging.getLogger(__name__)
+
+
+# ============= FAST 404 =============
+
+FAST_404_BODY = (
+    b"<!doctype html><html><head><title>404 Not Found</title></head>"
+    b"<body><h1>404 Not Found</h1></body></html>"
+)
+FAST_404_GENERATION_KEY = "fast404:generation"
+FAST_404_CACHE_ALIAS = "shared"  # generationen måste synas i alla workers, locmem räcker inte
+FAST_404_LOG_EVERY = 1000
+
+fast404_stats = Counter()
+_stats_lock = threading.Lock()
+
+
+def _count(name: str) -> None:
+    with _stats_lock:
+        fast404_stats[name] += 1
+        absorbed = fast404_stats["blocked"] + fast404_stats["negative_hit"]
+    if name != "negative_stored" and absorbed % FAST_404_LOG_EVERY == 0:
+        logger.info("Fast 404 absorbed %s requests (%s)", absorbed, dict(fast404_stats))
+
+
+class NegativePathCache:
+    """
+    Bounded LRU of (host, path) that recently returned 404.
+    Entries expire after `ttl` seconds or when the generation in the shared
+    cache is bumped (page published / redirect saved, see
+    invalidate_negative_cache). max_size 0 turns it off.
+    """
+
+    def __init__(self, max_size: int, ttl: int):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries: "OrderedDict[tuple, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def hit(self, key: tuple) -> bool:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return False
+            expires_at, generation = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                return False
+        # Generationen kollas bara vid träff – missar kostar ingen cache-lookup
+        if generation != _generation():
+            self.discard(key)
+            return False
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+        return True
+
+    def add(self, key: tuple) -> None:
+        if self.max_size <= 0:
+            return
+        generation = _generation()
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, generation)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def discard(self, key: tuple) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+def _generation() -> int:
+    return caches[FAST_404_CACHE_ALIAS].get(FAST_404_GENERATION_KEY, 0)
+
+
+negative_cache = NegativePathCache(
+    max_size=getattr(settings, "FAST_404_CACHE_SIZE", 2048),
+    ttl=getattr(settings, "FAST_404_CACHE_TTL_SECONDS", 300),
+)
+
+
+def invalidate_negative_cache() -> None:
+    """
+    Forget every cached 404 – locally right away, in other workers via the
+    generation counter in the shared cache
+    """
+    negative_cache.clear()
+    shared = caches[FAST_404_CACHE_ALIAS]
+    try:
+        shared.incr(FAST_404_GENERATION_KEY)
+    except ValueError:
+        shared.set(FAST_404_GENERATION_KEY, 1, None)
+
+
+class Fast404Middleware:
+    """
+    Early exit for scanner/bot traffic: blocklisted patterns and paths that
+    recently 404ed get a minimal static 404 without touching the database,
+    page routing, RedirectMiddleware or the 404.html template.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.enabled = getattr(settings, "FAST_404_ENABLED", True)
+        patterns = getattr(settings, "FAST_404_PATTERNS", [])
+        self.blocklist = re.compile("|".join(f"(?:{p})" for p in patterns), re.IGNORECASE) if patterns else None
+
+    def __call__(self, request):
+        if not self.enabled or request.method not in ("GET", "HEAD"):
+            return self.get_response(request)
+
+        path = request.path_info
+        if self.blocklist is not None and self.blocklist.search(path):
+            _count("blocked")
+            return self._not_found()
+
+        key = (request.META.get("HTTP_HOST", ""), path)
+        if negative_cache.hit(key):
+            _count("negative_hit")
+            return self._not_found()
+
+        response = self.get_response(request)
+        if response.status_code == 404:
+            negative_cache.add(key)
+            _count("negative_stored")
+        return response
+
+    @staticmethod
+    def _not_found():
+        return HttpResponseNotFound(FAST_404_BODY, content_type="text/html; charset=utf-8")
+
+
+# ============= READ REPLICAS =============
+
+DB_PRIMARY_UNTIL_KEY = "db:primary-until"
+DB_PRIMARY_CACHE_ALIAS = "shared"  # en publicering i en worker måste styra om alla workers
+DB_PIN_COOKIE = "db_primary"
+
+
+def pin_primary() -> None:
+    """
+    Read-your-writes for everyone: reads stay on the primary for
+    DB_REPLICA_STICKY_SECONDS after a publish (CACHES["shared"] -> all workers)
+    """
+    seconds = getattr(settings, "DB_REPLICA_STICKY_SECONDS", 10)
+    if seconds > 0:
+        caches[DB_PRIMARY_CACHE_ALIAS].set(DB_PRIMARY_UNTIL_KEY, time.time() + seconds, seconds)
+
+
+class ReplicaRoutingMiddleware:
+    """
+    Anonymous GET/HEAD outside the admins reads from a replica. Requests with a
+    session cookie (editors, previews), unsafe methods and clients that just
+    posted something (pin cookie) stay on the primary.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.enabled = bool(getattr(settings, "DATABASE_REPLICAS", None))
+        self.sticky_seconds = getattr(settings, "DB_REPLICA_STICKY_SECONDS", 10)
+        self._primary_prefixes = None
+
+    def __call__(self, request):
+        if not self.enabled:
+            return self.get_response(request)
+
+        if request.method not in ("GET", "HEAD"):
+            response = self.get_response(request)
+            # Samma klient ska se sin egen skrivning på nästa GET
+            if self.sticky_seconds > 0:
+                response.set_cookie(
+                    DB_PIN_COOKIE, "1", max_age=self.sticky_seconds,
+                    secure=settings.SESSION_COOKIE_SECURE, httponly=True, samesite="Lax",
+                )
+            return response
+
+        if not self._replica_allowed(request):
+            return self.get_response(request)
+
+        with replica_reads():
+            return self.get_response(request)
+
+    def _replica_allowed(self, request) -> bool:
+        if settings.SESSION_COOKIE_NAME in request.COOKIES or DB_PIN_COOKIE in request.COOKIES:
+            return False
+        if request.path_info.startswith(self.primary_prefixes):
+            return False
+        return caches[DB_PRIMARY_CACHE_ALIAS].get(DB_PRIMARY_UNTIL_KEY, 0) < time.time()
+
+    @property
+    def primary_prefixes(self) -> tuple:
+        if self._primary_prefixes is None:
+            # Admin-URL:erna är "hemliga" i urls.py – slå upp dem i stället för att hårdkoda
+            self._primary_prefixes = tuple(
+                reverse(name) for name in ("wagtailadmin_home", "admin:index")
+            )
+        return self._primary_prefixes
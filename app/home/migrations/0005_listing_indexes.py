@@ -0,0 +1,43 @@
+# Generated by Django 5.0.9 on 2026-10-19 10:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('home', '0004_sitecounter'),
+        ('taggit', '0006_rename_taggeditem_content_type_object_id_taggit_tagg_content_8fc721_idx'),
+        ('wagtailcore', '0095_groupsitepermission'),
+        ('wagtailimages', '0027_image_description'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='blogpagetag',
+            index=models.Index(fields=['tag', 'content_object'], name='home_blogtag_tag_post_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='projectpage',
+            index=models.Index(fields=['-date'], name='home_project_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='projectpage',
+            index=models.Index(fields=['status', '-date'], name='home_project_status_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='projectpage',
+            index=models.Index(fields=['category', '-date'], name='home_project_cat_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='projectpagetechstack',
+            index=models.Index(fields=['tech', 'page'], name='home_projtech_tech_page_idx'),
+        ),
+        # Blogglistningen sorterar på wagtailcore_page.first_published_at för live-sidor –
+        # partiellt index på Wagtails tabell (kan inte deklareras i våra modeller)
+        migrations.RunSQL(
+            'CREATE INDEX IF NOT EXISTS home_page_live_published_idx '
+            'ON wagtailcore_page (first_published_at DESC) WHERE live',
+            'DROP INDEX IF EXISTS home_page_live_published_idx',
+        ),
+    ]
@@ -0,0 +1,59 @@
+# Generated by Django 5.0.9 on 2026-10-19 10:44
+
+from collections import defaultdict
+
+import django.contrib.postgres.indexes
+import home.models
+from django.db import migrations, models
+
+TECH_SLUGS_INDEX = django.contrib.postgres.indexes.GinIndex(
+    fields=['tech_slugs'], name='home_project_tech_slugs_gin',
+)
+
+
+def backfill_tech_slugs(apps, schema_editor):
+    ProjectPage = apps.get_model('home', 'ProjectPage')
+    ProjectPageTechStack = apps.get_model('home', 'ProjectPageTechStack')
+
+    slugs = defaultdict(set)
+    for page_id, slug in ProjectPageTechStack.objects.values_list('page_id', 'tech__slug'):
+        slugs[page_id].add(slug)
+    for page_id, values in slugs.items():
+        ProjectPage.objects.filter(pk=page_id).update(tech_slugs=sorted(values))
+
+
+def add_gin_index(apps, schema_editor):
+    # GIN finns bara i PostgreSQL – SQLite (lokalt/tester) klarar sig utan
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.add_index(apps.get_model('home', 'ProjectPage'), TECH_SLUGS_INDEX)
+
+
+def remove_gin_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.remove_index(apps.get_model('home', 'ProjectPage'), TECH_SLUGS_INDEX)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('home', '0005_listing_indexes'),
+        ('wagtailcore', '0095_groupsitepermission'),
+        ('wagtailimages', '0027_image_description'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='projectpage',
+            name='tech_slugs',
+            field=home.models.SlugArrayField(base_field=models.CharField(max_length=100), blank=True, default=list, editable=False, size=None),
+        ),
+        migrations.RunPython(backfill_tech_slugs, migrations.RunPython.noop),
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.AddIndex(model_name='projectpage', index=TECH_SLUGS_INDEX),
+            ],
+            database_operations=[
+                migrations.RunPython(add_gin_index, remove_gin_index),
+            ],
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 5.0.9 on 2026-10-19 10:51
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('home', '0007_requestprofile'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SlowRequest',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True, db_index=True)),
+                ('method', models.CharField(max_length=10)),
+                ('path', models.CharField(max_length=500)),
+                ('view', models.CharField(help_text='View name or page:<PageType>', max_length=200)),
+                ('status_code', models.PositiveSmallIntegerField(blank=True, null=True)),
+                ('total_ms', models.FloatField(db_index=True)),
+                ('db_count', models.PositiveIntegerField(default=0)),
+                ('db_ms', models.FloatField(default=0)),
+                ('duplicate_queries', models.PositiveIntegerField(default=0, help_text='Queries repeating an earlier SQL statement (N+1)')),
+                ('cache_hits', models.PositiveIntegerField(default=0)),
+                ('cache_misses', models.PositiveIntegerField(default=0)),
+                ('http_calls', models.PositiveIntegerField(default=0)),
+                ('http_ms', models.FloatField(default=0)),
+                ('queries', models.JSONField(blank=True, default=list)),
+            ],
+            options={
+                'verbose_name': 'Slow Request',
+                'verbose_name_plural': 'Slow Requests',
+                'ordering': ['-total_ms'],
+            },
+        ),
+    ]
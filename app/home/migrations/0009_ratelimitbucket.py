@@ -0,0 +1,30 @@
+# Generated by Django 5.0.9 on 2026-10-19 11:19
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('home', '0008_slowrequest'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RateLimitBucket',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(max_length=200)),
+                ('window_start', models.BigIntegerField(help_text='Unix time the window started')),
+                ('count', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'verbose_name': 'Rate Limit Bucket',
+                'verbose_name_plural': 'Rate Limit Buckets',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='ratelimitbucket',
+            constraint=models.UniqueConstraint(fields=('key', 'window_start'), name='home_ratelimit_key_window_uniq'),
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 5.0.9 on 2026-10-19 11:27
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('home', '0009_ratelimitbucket'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='contactsubmission',
+            name='content_hash',
+            field=models.CharField(blank=True, editable=False, max_length=64, null=True),
+        ),
+        migrations.AddField(
+            model_name='contactsubmission',
+            name='dedupe_bucket',
+            field=models.BigIntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddConstraint(
+            model_name='contactsubmission',
+            constraint=models.UniqueConstraint(fields=('content_hash', 'dedupe_bucket'), name='home_contact_content_window_uniq'),
+        ),
+    ]
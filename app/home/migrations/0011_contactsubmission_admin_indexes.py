@@ -0,0 +1,51 @@
+# Generated by Django 5.0.9 on 2026-10-19 11:28
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.db import migrations, models
+
+CONTACT_SEARCH_INDEX = django.contrib.postgres.indexes.GinIndex(
+    django.contrib.postgres.search.SearchVector('name', 'email', 'subject', 'message', config='simple'),
+    name='home_contact_search_gin',
+)
+
+
+def add_search_index(apps, schema_editor):
+    # tsvector/GIN finns bara i PostgreSQL – på SQLite söker adminen med icontains som förut
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.add_index(apps.get_model('home', 'ContactSubmission'), CONTACT_SEARCH_INDEX)
+
+
+def remove_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.remove_index(apps.get_model('home', 'ContactSubmission'), CONTACT_SEARCH_INDEX)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('home', '0010_contactsubmission_dedupe'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='contactsubmission',
+            index=models.Index(fields=['-submitted_at', '-id'], name='home_contact_submitted_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='contactsubmission',
+            index=models.Index(fields=['read', '-submitted_at', '-id'], name='home_contact_read_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='contactsubmission',
+            index=models.Index(fields=['replied', '-submitted_at', '-id'], name='home_contact_replied_idx'),
+        ),
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.AddIndex(model_name='contactsubmission', index=CONTACT_SEARCH_INDEX),
+            ],
+            database_operations=[
+                migrations.RunPython(add_search_index, remove_search_index),
+            ],
+        ),
+    ]
@@ -1,13 +1,22 @@
-from django.db import models
+import json
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import connections, models
+from django.contrib.postgres.fields import ArrayField
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVector
 from django.core.paginator import Paginator, EmptyPage, PageNotAnInteger
 from django.utils import timezone
+from django.utils.cache import patch_cache_control
 from urllib.parse import urlencode
 from modelcluster.fields import ParentalManyToManyField
 from modelcluster.models import ClusterableModel
 from django import forms
 from wagtail.models import Orderable
 
-from wagtail.models import Page
+from wagtail.models import Page, PageManager
+from wagtail.query import PageQuerySet
 from wagtail.fields import RichTextField, StreamField
 from wagtail.admin.panels import FieldPanel, MultiFieldPanel, InlinePanel
 from wagtail.search import index
@@ -21,6 +30,25 @@ from modelcluster.fields import ParentalKey
 from modelcluster.contrib.taggit import ClusterTaggableManager
 from taggit.models import TaggedItemBase
 
+from config.prepared_statements import prepared_statements
+
+
+def _rendered(response):
+    if hasattr(response, "render"):
+        response.render()
+    return response
+
+
+def _cache_publicly(request, response, max_age: int) -> None:
+    # Bara anonyma GET/HEAD – inloggade (förhandsvisning, userbar) ska aldrig hamna i en delad cache.
+    # Anonym = ingen sessionscookie; request.user skulle läsa sessionen och ge Vary: Cookie
+    if (
+        max_age > 0
+        and request.method in ("GET", "HEAD")
+        and settings.SESSION_COOKIE_NAME not in request.COOKIES
+    ):
+        patch_cache_control(response, public=True, max_age=max_age)
+
 
 # ============= SITE SETTINGS =============
 
@@ -199,6 +227,12 @@ class BlogPageTag(TaggedItemBase):
         on_delete=models.CASCADE
     )
 
+    class Meta:
+        indexes = [
+            # ?tag=<slug>: tag -> inlägg utan att läsa tabellen
+            models.Index(fields=['tag', 'content_object'], name='home_blogtag_tag_post_idx'),
+        ]
+
 
 # ============= STREAMFIELD BLOCKS =============
 
@@ -252,6 +286,94 @@ class QuoteBlock(blocks.StructBlock):
         icon = 'openquote'
 
 
+# ============= FIELDS =============
+
+class SlugArrayField(ArrayField):
+    """
+    varchar[] on PostgreSQL. Other backends (SQLite for local dev/tests) store the
+    list as JSON text so migrations and saves still work – without && / @> lookups.
+    """
+
+    def __init__(self, **kwargs):
+        kwargs.setdefault('base_field', models.CharField(max_length=100))
+        super().__init__(**kwargs)
+
+    def db_type(self, connection):
+        if connection.vendor != 'postgresql':
+            return 'text'
+        return super().db_type(connection)
+
+    def cast_db_type(self, connection):
+        if connection.vendor != 'postgresql':
+            return 'text'
+        return super().cast_db_type(connection)
+
+    def get_placeholder(self, value, compiler, connection):
+        if connection.vendor != 'postgresql':
+            return '%s'
+        return super().get_placeholder(value, compiler, connection)
+
+    def get_db_prep_value(self, value, connection, prepared=False):
+        if connection.vendor != 'postgresql':
+            return None if value is None else json.dumps(list(value))
+        return super().get_db_prep_value(value, connection, prepared)
+
+    def from_db_value(self, value, expression, connection):
+        if isinstance(value, str):
+            return json.loads(value)
+        return value
+
+
+# ============= LISTING QUERYSETS =============
+
+class BlogPageQuerySet(PageQuerySet):
+    def listing(self):
+        """
+        Card projection: skip the StreamField body, join category, prefetch tags
+        """
+        return (
+            self.defer_streamfields()
+            .select_related('categories')
+            .prefetch_related('tags')
+        )
+
+
+class ProjectPageQuerySet(PageQuerySet):
+    def listing(self):
+        """
+        Card projection: skip body + problem/solution, join category/hero image,
+        prefetch tech badges
+        """
+        return (
+            self.defer_streamfields()
+            .defer('problem', 'solution')
+            .select_related('category', 'hero_image')
+            .prefetch_related('tech_stack_items__tech')
+        )
+
+    def with_techs(self, slugs, match_all=False):
+        """
+        Projects using any (OR) or all (AND, ?match=all) of the tech slugs.
+        PostgreSQL: && / @> on the GIN-indexed tech_slugs array – no join, no DISTINCT.
+        """
+        slugs = list(slugs)
+        if connections[self.db].vendor == 'postgresql':
+            lookup = 'tech_slugs__contains' if match_all else 'tech_slugs__overlap'
+            return self.filter(**{lookup: slugs})
+
+        # Övriga backends: join mot tech_stack_items
+        if match_all:
+            queryset = self
+            for slug in slugs:
+                queryset = queryset.filter(tech_stack_items__tech__slug=slug)
+            return queryset.distinct()
+        return self.filter(tech_stack_items__tech__slug__in=slugs).distinct()
+
+
+BlogPageManager = PageManager.from_queryset(BlogPageQuerySet)
+ProjectPageManager = PageManager.from_queryset(ProjectPageQuerySet)
+
+
 # ============= PAGES =============
 
 class HomePage(Page):
@@ -265,13 +387,18 @@ class HomePage(Page):
     ]
     
     def get_context(self, request, *args, **kwargs):
-        from .models import ProjectPage
-        from .htb import get_htb_profile
+        from .counters import get_counters
         context = super().get_context(request, *args, **kwargs)
-        context['total_projects'] = ProjectPage.objects.live().count()
-        context['htb_profile'] = get_htb_profile(request)
+        context['total_projects'] = get_counters().get('projects', 0)
+        # HTB-kortet laddas separat via htmx (/api/htb-card)
         return context
 
+    def serve(self, request, *args, **kwargs):
+        response = super().serve(request, *args, **kwargs)
+        # Sidan innehåller inget per-användare längre -> kan cachas av proxy/CDN
+        _cache_publicly(request, response, settings.HOME_PAGE_CACHE_SECONDS)
+        return response
+
     class Meta:
         verbose_name = "Home Page"
 
@@ -290,7 +417,7 @@ class BlogIndexPage(Page):
         context = super().get_context(request, *args, **kwargs)
         
         # Get all published blog posts
-        all_posts = BlogPage.objects.live().public().order_by('-first_published_at')
+        all_posts = BlogPage.objects.live().public().listing().order_by('-first_published_at')
         
         # Filter by category if provided
         category = request.GET.get('category')
@@ -313,13 +440,26 @@ class BlogIndexPage(Page):
         except EmptyPage:
             posts = paginator.page(paginator.num_pages)
         
+        from .counters import get_counters
+        counters = get_counters()
+        categories = list(BlogCategory.objects.all())
+        for cat in categories:
+            cat.post_count = counters.get(f"posts:category:{cat.slug}", 0)
+
         context['posts'] = posts
-        context['categories'] = BlogCategory.objects.all()
+        context['categories'] = categories
+        context['total_posts'] = counters.get('posts', 0)
         context['selected_category'] = category
         context['selected_tag'] = tag
         
         return context
 
+    def serve(self, request, *args, **kwargs):
+        # Listningsfrågorna körs om med samma SQL på varje sidvisning. Renderas i blocket –
+        # querysets i templaten utvärderas först där
+        with prepared_statements(BlogPage):
+            return _rendered(super().serve(request, *args, **kwargs))
+
     class Meta:
         verbose_name = "Blog Index Page"
 
@@ -357,6 +497,8 @@ class BlogPage(Page):
     # Reading time (auto-calculated)
     reading_time = models.IntegerField(default=5, help_text="Minutes to read")
 
+    objects = BlogPageManager()
+
     def save(self, *args, **kwargs):
         # Calculate reading time (average 200 words per minute)
         word_count = 0
@@ -469,6 +611,12 @@ class ProjectPageTechStack(Orderable):
     def __str__(self):
         return f"{self.tech.name}"
 
+    class Meta(Orderable.Meta):
+        indexes = [
+            # ?tech=<slug>: tech -> projekt (FK-indexet på page går åt andra hållet)
+            models.Index(fields=['tech', 'page'], name='home_projtech_tech_page_idx'),
+        ]
+
 
 class ProjectIndexPage(Page):
     """
@@ -484,7 +632,7 @@ class ProjectIndexPage(Page):
         context = super().get_context(request, *args, **kwargs)
     
         # Base queryset
-        all_projects = ProjectPage.objects.live().public().order_by('-date')
+        all_projects = ProjectPage.objects.live().public().listing().order_by('-date')
     
         def get_multi(key: str) -> list[str]:
             """
@@ -507,27 +655,27 @@ class ProjectIndexPage(Page):
         selected_status = (request.GET.get('status') or "").strip()
         selected_categories = get_multi('category')
         selected_techs = get_multi('tech')
+        match_all = request.GET.get('match') == 'all'
     
         # Apply filters (OR semantics for multi-tech / multi-category)
         if selected_categories:
             all_projects = all_projects.filter(category__slug__in=selected_categories)
     
         if selected_techs:
-            all_projects = all_projects.filter(
-                tech_stack_items__tech__slug__in=selected_techs
-            ).distinct()
+            all_projects = all_projects.with_techs(selected_techs, match_all=match_all)
     
         if selected_status:
             all_projects = all_projects.filter(status=selected_status)
     
         # Helpers to build querystrings (toggle + keep other params)
-        def build_qs(*, status=None, toggle_category=None, toggle_tech=None, clear_all=False) -> str:
+        def build_qs(*, status=None, toggle_category=None, toggle_tech=None, toggle_match=False, clear_all=False) -> str:
             cats = list(selected_categories)
             techs = list(selected_techs)
             stat = selected_status
+            match = (not match_all) if toggle_match else match_all
     
             if clear_all:
-                cats, techs, stat = [], [], ""
+                cats, techs, stat, match = [], [], "", False
     
             if status is not None:
                 stat = (status or "").strip()
@@ -551,9 +699,13 @@ class ProjectIndexPage(Page):
                 pairs.append(("category", c))
             for t in techs:
                 pairs.append(("tech", t))
+            if match and len(techs) > 1:
+                pairs.append(("match", "all"))
             return urlencode(pairs, doseq=True)
     
         # Build link models for template (så templaten slipper komplex URL-logik)
+        from .counters import get_counters
+        counters = get_counters()
         categories = ProjectCategory.objects.all()
         tech_stacks = TechStack.objects.all()
     
@@ -575,6 +727,7 @@ class ProjectIndexPage(Page):
                 "label": label,
                 "is_active": is_active,
                 "qs": qs,
+                "count": counters.get(f"projects:status:{value}", 0),
             })
     
         category_links = []
@@ -585,6 +738,7 @@ class ProjectIndexPage(Page):
                 "obj": cat,
                 "is_active": is_active,
                 "qs": qs,
+                "count": counters.get(f"projects:category:{cat.slug}", 0),
             })
     
         tech_links = []
@@ -595,8 +749,17 @@ class ProjectIndexPage(Page):
                 "obj": tech,
                 "is_active": is_active,
                 "qs": qs,
+                "count": counters.get(f"projects:tech:{tech.slug}", 0),
             })
     
+        # any/all-växel när fler än en tech är vald
+        tech_match_link = None
+        if len(selected_techs) > 1:
+            tech_match_link = {
+                "match_all": match_all,
+                "qs": build_qs(toggle_match=True),
+            }
+    
         # Active chips (med "x" för att ta bort) + status-färg som matchar UI
         status_chip_style = {
             "completed": "border-color: rgba(0,186,255,0.35); color: rgba(0,186,255,0.95);",
@@ -643,6 +806,7 @@ class ProjectIndexPage(Page):
         context['selected_status'] = selected_status
         context['selected_categories'] = selected_categories
         context['selected_techs'] = selected_techs
+        context['match_all'] = match_all
     
         # Backwards-compat (om någon annan template använder gamla)
         context['selected_category'] = selected_categories[0] if selected_categories else ""
@@ -652,11 +816,17 @@ class ProjectIndexPage(Page):
         context['status_links'] = status_links
         context['category_links'] = category_links
         context['tech_links'] = tech_links
+        context['tech_match_link'] = tech_match_link
         context['active_chips'] = active_chips
         context['active_count'] = active_count
         context['is_all_active'] = (active_count == 0)
+        context['total_projects'] = counters.get('projects', 0)
     
         return context
+
+    def serve(self, request, *args, **kwargs):
+        with prepared_statements(ProjectPage):
+            return _rendered(super().serve(request, *args, **kwargs))
         
     class Meta:
         verbose_name = "Project Index Page"
@@ -729,11 +899,43 @@ class ProjectPage(Page):
         blank=True,
         help_text="e.g. '2 weeks', '3 months'"
     )
+
+    # Denormaliserad kopia av tech_stack_items (slugs) för filtrering, se with_techs()
+    tech_slugs = SlugArrayField(default=list, blank=True, editable=False)
+
+    objects = ProjectPageManager()
     
     search_fields = Page.search_fields + [
         index.SearchField('intro'),
         index.SearchField('body'),
     ]
+
+    def save(self, *args, **kwargs):
+        # Publicering sparar hela sidan -> arrayen följer den publicerade tech-stacken
+        update_fields = kwargs.get('update_fields')
+        if update_fields is None or 'tech_slugs' in update_fields:
+            self.tech_slugs = sorted({
+                item.tech.slug for item in self.tech_stack_items.all() if item.tech_id
+            })
+        return super().save(*args, **kwargs)
+
+    @classmethod
+    def rebuild_tech_slugs(cls) -> int:
+        """
+        Resync every tech_slugs array from ProjectPageTechStack
+        (after a TechStack is renamed or deleted). Returns pages changed.
+        """
+        slugs = defaultdict(set)
+        for page_id, slug in ProjectPageTechStack.objects.values_list('page_id', 'tech__slug'):
+            slugs[page_id].add(slug)
+
+        changed = 0
+        for page_id, current in cls.objects.values_list('pk', 'tech_slugs'):
+            expected = sorted(slugs.get(page_id, ()))
+            if list(current or []) != expected:
+                cls.objects.filter(pk=page_id).update(tech_slugs=expected)
+                changed += 1
+        return changed
     
     content_panels = Page.content_panels + [
         MultiFieldPanel([
@@ -765,10 +967,126 @@ class ProjectPage(Page):
     class Meta:
         verbose_name = "Project"
         ordering = ['-date']
+        indexes = [
+            # Listningen sorterar på -date, filtren på status/kategori gör det också
+            models.Index(fields=['-date'], name='home_project_date_idx'),
+            models.Index(fields=['status', '-date'], name='home_project_status_date_idx'),
+            models.Index(fields=['category', '-date'], name='home_project_cat_date_idx'),
+            # && (någon av) och @> (alla) på tech-filtret – bara PostgreSQL, se migration 0006
+            GinIndex(fields=['tech_slugs'], name='home_project_tech_slugs_gin'),
+        ]
+
+
+# ============= SITE COUNTERS =============
+
+class SiteCounter(models.Model):
+    """
+    Denormalized content counts (maintained by publish signals, see home/counters.py)
+    """
+    key = models.CharField(max_length=150, unique=True)
+    value = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.key} = {self.value}"
+
+    class Meta:
+        verbose_name = "Site Counter"
+        verbose_name_plural = "Site Counters"
+        ordering = ['key']
+
+
+# ============= REQUEST PROFILES =============
+
+class RequestProfile(models.Model):
+    """
+    One profiled request (cProfile + query log), see home/profiler.py
+    """
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+    method = models.CharField(max_length=10)
+    path = models.CharField(max_length=500)
+    status_code = models.PositiveSmallIntegerField(null=True, blank=True)
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        null=True,
+        blank=True,
+        on_delete=models.SET_NULL,
+        related_name='+',
+    )
+    duration_ms = models.FloatField(default=0)
+    query_count = models.PositiveIntegerField(default=0)
+    query_ms = models.FloatField(default=0)
+    stats_text = models.TextField(blank=True, help_text="pstats, sorted by cumulative time")
+    queries = models.JSONField(default=list, blank=True)
+    profile_data = models.BinaryField(blank=True, help_text="Marshalled pstats data (.prof)")
+
+    def __str__(self):
+        return f"{self.method} {self.path} – {self.duration_ms:.0f}ms"
+
+    class Meta:
+        verbose_name = "Request Profile"
+        verbose_name_plural = "Request Profiles"
+        ordering = ['-created_at']
+
+
+# ============= SLOW REQUESTS =============
+
+class SlowRequest(models.Model):
+    """
+    Sampled slow request with its query breakdown (bounded, see home/slowlog.py)
+    """
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+    method = models.CharField(max_length=10)
+    path = models.CharField(max_length=500)
+    view = models.CharField(max_length=200, help_text="View name or page:<PageType>")
+    status_code = models.PositiveSmallIntegerField(null=True, blank=True)
+    total_ms = models.FloatField(db_index=True)
+    db_count = models.PositiveIntegerField(default=0)
+    db_ms = models.FloatField(default=0)
+    duplicate_queries = models.PositiveIntegerField(default=0, help_text="Queries repeating an earlier SQL statement (N+1)")
+    cache_hits = models.PositiveIntegerField(default=0)
+    cache_misses = models.PositiveIntegerField(default=0)
+    http_calls = models.PositiveIntegerField(default=0)
+    http_ms = models.FloatField(default=0)
+    queries = models.JSONField(default=list, blank=True)
+
+    def __str__(self):
+        return f"{self.method} {self.path} – {self.total_ms:.0f}ms"
+
+    class Meta:
+        verbose_name = "Slow Request"
+        verbose_name_plural = "Slow Requests"
+        ordering = ['-total_ms']
+
+
+# ============= RATE LIMITING =============
+
+class RateLimitBucket(models.Model):
+    """
+    Hits per (rule:client, fixed window) – shared by every worker and host,
+    incremented with an atomic upsert (see home/ratelimit.py)
+    """
+    key = models.CharField(max_length=200)
+    window_start = models.BigIntegerField(help_text="Unix time the window started")
+    count = models.PositiveIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.key} @ {self.window_start}: {self.count}"
+
+    class Meta:
+        verbose_name = "Rate Limit Bucket"
+        verbose_name_plural = "Rate Limit Buckets"
+        constraints = [
+            models.UniqueConstraint(fields=['key', 'window_start'], name='home_ratelimit_key_window_uniq'),
+        ]
 
 
 # ============= CONTACT FORM =============
 
+# Samma uttryck i GIN-indexet och i adminens sökning, annars används inte indexet
+CONTACT_SEARCH_VECTOR = SearchVector('name', 'email', 'subject', 'message', config='simple')
+
+
 class ContactSubmission(models.Model):
     """
     Store contact form submissions in database
@@ -784,6 +1102,10 @@ class ContactSubmission(models.Model):
     # Status tracking
     read = models.BooleanField(default=False)
     replied = models.BooleanField(default=False)
+
+    # Dubblettskydd (home/spam.py): avsändare + normaliserat ämne+meddelande per tidsfönster
+    content_hash = models.CharField(max_length=64, null=True, blank=True, editable=False)
+    dedupe_bucket = models.BigIntegerField(null=True, blank=True, editable=False)
     
     def __str__(self):
         return f"{self.name} - {self.submitted_at.strftime('%Y-%m-%d %H:%M')}"
@@ -792,6 +1114,20 @@ class ContactSubmission(models.Model):
         verbose_name = "Contact Submission"
         verbose_name_plural = "Contact Submissions"
         ordering = ['-submitted_at']
+        constraints = [
+            # Samma meddelande två gånger i samma fönster -> IntegrityError även om två workers tävlar
+            models.UniqueConstraint(
+                fields=['content_hash', 'dedupe_bucket'], name='home_contact_content_window_uniq',
+            ),
+        ]
+        indexes = [
+            # Adminens sortering/filter (admin lägger till -pk sist) och gallring på ålder
+            models.Index(fields=['-submitted_at', '-id'], name='home_contact_submitted_idx'),
+            models.Index(fields=['read', '-submitted_at', '-id'], name='home_contact_read_idx'),
+            models.Index(fields=['replied', '-submitted_at', '-id'], name='home_contact_replied_idx'),
+            # Fulltext för adminsökningen – bara PostgreSQL, se migration 0011
+            GinIndex(CONTACT_SEARCH_VECTOR, name='home_contact_search_gin'),
+        ]
 
 
 class ContactPage(Page):
@@ -813,6 +1149,12 @@ class ContactPage(Page):
         context = super().get_context(request, *args, **kwargs)
         context['form_submitted'] = request.GET.get('submitted') == 'true'
         return context
+
+    def serve(self, request, *args, **kwargs):
+        response = super().serve(request, *args, **kwargs)
+        # Ingen CSRF-token i HTML:en (hämtas via /api/csrf) -> samma sida för alla besökare
+        _cache_publicly(request, response, settings.CONTACT_PAGE_CACHE_SECONDS)
+        return response
     
     class Meta:
         verbose_name = "Contact Page"
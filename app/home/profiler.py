@@ -0,0 +1,162 @@
+"""
+On-demand request profiler.
+
+A request is profiled when PROFILER_ENABLED and either
+  - a staff user adds ?_profile=1, or
+  - it carries X-Profile-Token: <token from `manage.py profile_token <user>`>
+    (signed, expires after PROFILER_TOKEN_MAX_AGE_SECONDS – works without a session,
+    e.g. from curl).
+The request runs under cProfile with a query log; the result is stored as a
+RequestProfile (Wagtail admin -> Settings -> Request profiles) and the response
+gets an X-Profile-Id header. At most PROFILER_MAX_CONCURRENT requests per worker
+are profiled at once – extra requests are simply served unprofiled.
+"""
+import cProfile
+import io
+import logging
+import marshal
+import pstats
+import threading
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core import signing
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+PROFILE_QUERY_PARAM = "_profile"
+PROFILE_TOKEN_HEADER = "X-Profile-Token"
+PROFILE_TOKEN_SALT = "home.profiler"
+MAX_LOGGED_QUERIES = 500
+MAX_SQL_LENGTH = 2000
+STATS_LINES = 80
+
+_slots = threading.BoundedSemaphore(max(1, getattr(settings, "PROFILER_MAX_CONCURRENT", 1)))
+
+
+def make_token(user) -> str:
+    return signing.dumps({"user": user.pk}, salt=PROFILE_TOKEN_SALT)
+
+
+def _token_user(token: str):
+    max_age = getattr(settings, "PROFILER_TOKEN_MAX_AGE_SECONDS", 3600)
+    try:
+        payload = signing.loads(token, salt=PROFILE_TOKEN_SALT, max_age=max_age)
+    except signing.BadSignature:
+        return None
+    return get_user_model().objects.filter(pk=payload.get("user"), is_active=True, is_staff=True).first()
+
+
+class _QueryLog:
+    def __init__(self):
+        self.entries = []
+        self.count = 0
+        self.total_ms = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = (time.perf_counter() - start) * 1000
+            self.count += 1
+            self.total_ms += elapsed
+            if len(self.entries) < MAX_LOGGED_QUERIES:
+                # Bara SQL, inga parametrar (kan innehålla formulärdata)
+                self.entries.append({
+                    "alias": context["connection"].alias,
+                    "ms": round(elapsed, 3),
+                    "sql": sql[:MAX_SQL_LENGTH],
+                })
+
+
+class ProfilerMiddleware:
+    """
+    Runs after AuthenticationMiddleware so ?_profile=1 can check request.user
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.enabled = getattr(settings, "PROFILER_ENABLED", False)
+
+    def __call__(self, request):
+        if not self.enabled:
+            return self.get_response(request)
+
+        user = self._profiling_user(request)
+        if user is None:
+            return self.get_response(request)
+
+        if not _slots.acquire(blocking=False):
+            logger.info("Profiler busy, serving %s unprofiled", request.path)
+            return self.get_response(request)
+        try:
+            return self._profile(request, user)
+        finally:
+            _slots.release()
+
+    def _profiling_user(self, request):
+        token = request.headers.get(PROFILE_TOKEN_HEADER)
+        if token:
+            return _token_user(token)
+        if request.GET.get(PROFILE_QUERY_PARAM) == "1":
+            user = getattr(request, "user", None)
+            if user is not None and user.is_authenticated and user.is_staff:
+                return user
+        return None
+
+    def _profile(self, request, user):
+        query_log = _QueryLog()
+        profiler = cProfile.Profile()
+        with ExitStack() as stack:
+            for conn in connections.all(initialized_only=False):
+                stack.enter_context(conn.execute_wrapper(query_log))
+            try:
+                profiler.enable()
+            except ValueError:
+                # En annan profiler är redan aktiv i processen
+                return self.get_response(request)
+            start = time.perf_counter()
+            try:
+                response = self.get_response(request)
+            finally:
+                profiler.disable()
+                duration_ms = (time.perf_counter() - start) * 1000
+
+        try:
+            profile = self._store(request, user, response, profiler, query_log, duration_ms)
+        except Exception:
+            logger.exception("Could not store profile for %s", request.path)
+            return response
+        response["X-Profile-Id"] = str(profile.pk)
+        response["Cache-Control"] = "private, no-store"
+        return response
+
+    def _store(self, request, user, response, profiler, query_log, duration_ms):
+        from .models import RequestProfile
+
+        buffer = io.StringIO()
+        stats = pstats.Stats(profiler, stream=buffer)  # tar över profiler.stats
+        stats.sort_stats("cumulative").print_stats(STATS_LINES)
+
+        profile = RequestProfile.objects.create(
+            method=request.method,
+            path=request.get_full_path()[:500],
+            status_code=response.status_code,
+            user=user,
+            duration_ms=duration_ms,
+            query_count=query_log.count,
+            query_ms=query_log.total_ms,
+            stats_text=buffer.getvalue(),
+            queries=query_log.entries,
+            profile_data=marshal.dumps(stats.stats),
+        )
+
+        # Behåll bara de senaste PROFILER_KEEP
+        keep = getattr(settings, "PROFILER_KEEP", 100)
+        stale = RequestProfile.objects.order_by("-created_at").values_list("pk", flat=True)[keep:]
+        RequestProfile.objects.filter(pk__in=list(stale)).delete()
+        return profile
@@ -0,0 +1,287 @@
+"""
+Rate limiting shared by all workers and hosts.
+
+Counters live in the database (RateLimitBucket) – the one store every gunicorn
+worker and container already shares – as a sliding-window counter: hits in the
+current fixed window plus the previous window's hits weighted by how much of it
+still overlaps the sliding window. One atomic upsert + one read per check.
+
+Views opt in with @rate_limit(...); RateLimitMiddleware enforces it in
+process_view, before CsrfViewMiddleware parses the form and before anything
+touches the session. A client that is over the limit is also remembered in
+the worker until its window ends, so a burst is rejected from memory without
+any query.
+"""
+import ipaddress
+import logging
+import random
+import re
+import threading
+import time
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import NamedTuple, Optional
+
+from django.conf import settings
+from django.db import connections, router
+from django.http import JsonResponse
+
+from .models import RateLimitBucket
+
+logger = logging.getLogger(__name__)
+
+PERIODS = {"s": 1, "m": 60, "h": 3600, "d": 86400}
+RATE_RE = re.compile(r"^\s*(\d+)\s*/\s*(\d*)\s*([smhd])\s*$")
+CLEANUP_PROBABILITY = 0.01
+MAX_LOCAL_BLOCKS = 10000
+
+
+@dataclass(frozen=True)
+class Rate:
+    """
+    "3/h", "1/5m", "100/d" – `name` namespaces the counters, `message` is shown when
+    limited ({minutes}/{seconds} are filled in with the time left)
+    """
+    name: str
+    limit: int
+    period: int
+    message: str = "Too many requests. Please try again later."
+
+    @classmethod
+    def parse(cls, name: str, value: str, message: Optional[str] = None) -> "Rate":
+        match = RATE_RE.match(value or "")
+        if not match:
+            raise ValueError(f"Bad rate '{value}' (expected e.g. 3/h or 1/5m)")
+        count, multiplier, unit = match.groups()
+        period = int(multiplier or 1) * PERIODS[unit]
+        return cls(name, int(count), period, message or cls.message)
+
+
+class Decision(NamedTuple):
+    allowed: bool
+    count: float  # uppskattat antal i glidande fönstret
+    retry_after: int  # sekunder
+
+
+# ============= CLIENT IP =============
+
+@lru_cache(maxsize=None)
+def _trusted_proxies(value: str):
+    if value.strip() == "*":
+        return None  # alla betrodda
+    networks = []
+    for part in filter(None, (p.strip() for p in value.split(","))):
+        try:
+            networks.append(ipaddress.ip_network(part, strict=False))
+        except ValueError:
+            logger.warning("Ignoring invalid trusted proxy %r", part)
+    return tuple(networks)
+
+
+def _is_trusted(address, proxies) -> bool:
+    return proxies is None or any(address in network for network in proxies)
+
+
+def client_ip(request) -> str:
+    """
+    REMOTE_ADDR, unless it is one of our proxies (TRUSTED_PROXIES, same list as
+    gunicorn's FORWARDED_ALLOW_IPS): then walk X-Forwarded-For from the right
+    and take the first address that isn't a proxy. Client-supplied entries to
+    the left of that can't be used to dodge the limit.
+    """
+    proxies = _trusted_proxies(",".join(getattr(settings, "TRUSTED_PROXIES", ["127.0.0.1"])))
+    remote = request.META.get("REMOTE_ADDR", "")
+    chain = [part.strip() for part in request.META.get("HTTP_X_FORWARDED_FOR", "").split(",") if part.strip()]
+    chain.append(remote)
+
+    client = remote
+    for candidate in reversed(chain):
+        try:
+            address = ipaddress.ip_address(candidate)
+        except ValueError:
+            break
+        client = candidate
+        if not _is_trusted(address, proxies):
+            break
+    return client
+
+
+def client_key(ip: str) -> str:
+    # IPv6-klienter har oftast ett helt /64 – räkna dem som en
+    try:
+        address = ipaddress.ip_address(ip)
+    except ValueError:
+        return ip or "unknown"
+    if address.version == 6:
+        return str(ipaddress.ip_network(f"{address}/64", strict=False))
+    return str(address)
+
+
+# ============= SLIDING WINDOW =============
+
+_blocked: dict = {}
+_blocked_lock = threading.Lock()
+
+
+def _blocked_for(key: str) -> int:
+    with _blocked_lock:
+        until = _blocked.get(key)
+        if until is None:
+            return 0
+        remaining = until - time.time()
+        if remaining <= 0:
+            del _blocked[key]
+            return 0
+        return int(remaining) + 1
+
+
+def _remember_block(key: str, seconds: int) -> None:
+    with _blocked_lock:
+        if len(_blocked) >= MAX_LOCAL_BLOCKS:
+            now = time.time()
+            for stale in [k for k, until in _blocked.items() if until <= now]:
+                del _blocked[stale]
+            if len(_blocked) >= MAX_LOCAL_BLOCKS:
+                _blocked.clear()
+        _blocked[key] = time.time() + seconds
+
+
+def _windows(rate: Rate, now: float):
+    current = int(now // rate.period) * rate.period
+    return current, current - rate.period, (now - current) / rate.period
+
+
+def _decide(rate: Rate, now: float, current_count: int, previous_count: int, counted: bool) -> Decision:
+    """
+    Allowed when one more request fits in the sliding window (`counted`: this
+    request is already in current_count). Retry-After is solved from the same
+    estimate: first the previous window's weight decays, then the current one's
+    once it has become the previous window.
+    """
+    _current, _previous, elapsed = _windows(rate, now)
+    base = previous_count * (1 - elapsed) + current_count - (1 if counted else 0)
+    room = rate.limit - 1
+    if base <= room:
+        return Decision(True, base + 1, 0)
+
+    if current_count <= room:
+        wait = (1 - (room - current_count) / previous_count - elapsed) * rate.period
+    else:
+        wait = (1 - elapsed) * rate.period + max(0.0, 1 - room / current_count) * rate.period
+    return Decision(False, base + 1, int(wait) + 1)
+
+
+def _table_sql(connection):
+    quote = connection.ops.quote_name
+    return (
+        quote(RateLimitBucket._meta.db_table),
+        quote("key"), quote("window_start"), quote("count"),
+    )
+
+
+def hit(rate: Rate, ident: str, now: Optional[float] = None) -> Decision:
+    """
+    Count one hit for `ident` and decide. Atomic across processes:
+    INSERT .. ON CONFLICT DO UPDATE SET count = count + 1 (PostgreSQL, SQLite >= 3.35).
+    """
+    now = time.time() if now is None else now
+    key = f"{rate.name}:{ident}"
+    current, previous, _elapsed = _windows(rate, now)
+
+    connection = connections[router.db_for_write(RateLimitBucket)]
+    table, key_col, window_col, count_col = _table_sql(connection)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"INSERT INTO {table} ({key_col}, {window_col}, {count_col}) VALUES (%s, %s, 1) "
+            f"ON CONFLICT ({key_col}, {window_col}) DO UPDATE SET {count_col} = {table}.{count_col} + 1 "
+            f"RETURNING {count_col}",
+            [key, current],
+        )
+        current_count = cursor.fetchone()[0]
+        cursor.execute(
+            f"SELECT {count_col} FROM {table} WHERE {key_col} = %s AND {window_col} = %s",
+            [key, previous],
+        )
+        row = cursor.fetchone()
+
+    if random.random() < CLEANUP_PROBABILITY:
+        RateLimitBucket.objects.filter(key__startswith=f"{rate.name}:", window_start__lt=previous).delete()
+    return _decide(rate, now, current_count, row[0] if row else 0, counted=True)
+
+
+def peek(rate: Rate, ident: str, now: Optional[float] = None) -> Decision:
+    """
+    Decide without counting (e.g. a cooldown that only successful submissions add to)
+    """
+    now = time.time() if now is None else now
+    key = f"{rate.name}:{ident}"
+    current, previous, _elapsed = _windows(rate, now)
+    counts = dict(
+        RateLimitBucket.objects.filter(key=key, window_start__in=[current, previous])
+        .values_list("window_start", "count")
+    )
+    return _decide(rate, now, counts.get(current, 0), counts.get(previous, 0), counted=False)
+
+
+# ============= VIEW DECORATOR + MIDDLEWARE =============
+
+def rate_limit(*rates: Rate, peek_rates=(), methods=("POST",)):
+    """
+    Mark a view for RateLimitMiddleware: every request with one of `methods`
+    counts against `rates`; `peek_rates` are only checked (the view adds to
+    them itself with hit())
+    """
+    def decorator(view):
+        view.rate_limits = (tuple(rates), tuple(peek_rates), tuple(m.upper() for m in methods))
+        return view
+    return decorator
+
+
+def limited_response(rate: Rate, decision: Decision) -> JsonResponse:
+    # message kan innehålla {minutes}/{seconds} – tid kvar tills nästa försök släpps igenom
+    message = rate.message.format(minutes=max(1, -(-decision.retry_after // 60)), seconds=decision.retry_after)
+    response = JsonResponse({"success": False, "errors": {"__all__": [message]}}, status=429)
+    response["Retry-After"] = str(max(1, decision.retry_after))
+    return response
+
+
+class RateLimitMiddleware:
+    """
+    Must sit before CsrfViewMiddleware: its process_view reads request.POST
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        return self.get_response(request)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        limits = getattr(view_func, "rate_limits", None)
+        if limits is None or not getattr(settings, "RATELIMIT_ENABLE", True):
+            return None
+        rates, peek_rates, methods = limits
+        if request.method not in methods:
+            return None
+
+        ident = client_key(client_ip(request))
+        for rate in (*peek_rates, *rates):
+            seconds = _blocked_for(f"{rate.name}:{ident}")
+            if seconds:
+                return limited_response(rate, Decision(False, rate.limit, seconds))
+
+        for rate in peek_rates:
+            decision = peek(rate, ident)
+            if not decision.allowed:
+                return self._reject(rate, ident, decision)
+        for rate in rates:
+            decision = hit(rate, ident)
+            if not decision.allowed:
+                return self._reject(rate, ident, decision)
+        return None
+
+    @staticmethod
+    def _reject(rate, ident, decision):
+        _remember_block(f"{rate.name}:{ident}", decision.retry_after)
+        logger.info("Rate limited", extra={"rate": rate.name, "client": ident, "retry_after": decision.retry_after})
+        return limited_response(rate, decision)
@@ -0,0 +1,57 @@
+from django.conf import settings
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from wagtail.contrib.redirects.models import Redirect
+from wagtail.signals import page_published, page_unpublished, post_page_move
+
+from .counters import schedule_rebuild
+from .middleware import invalidate_negative_cache, pin_primary
+from .models import BlogCategory, BlogPage, ProjectCategory, ProjectPage, TechStack
+
+COUNTED_PAGES = (BlogPage, ProjectPage)
+COUNTED_SNIPPETS = (BlogCategory, ProjectCategory, TechStack)
+
+
+def _rebuild_counters(sender, **kwargs):
+    schedule_rebuild()
+
+
+def _rebuild_tech_slugs(sender, **kwargs):
+    ProjectPage.rebuild_tech_slugs()
+
+
+def _invalidate_fast404(sender, **kwargs):
+    # Efter commit – annars hinner en samtidig request cacha om 404:an under den nya generationen
+    transaction.on_commit(invalidate_negative_cache)
+
+
+def _pin_primary(sender, **kwargs):
+    # Fönstret ska börja när ändringen syns, inte medan transaktionen pågår
+    transaction.on_commit(pin_primary)
+
+
+def connect():
+    for model in COUNTED_PAGES:
+        page_published.connect(_rebuild_counters, sender=model, dispatch_uid=f"counters_published_{model.__name__}")
+        page_unpublished.connect(_rebuild_counters, sender=model, dispatch_uid=f"counters_unpublished_{model.__name__}")
+        post_delete.connect(_rebuild_counters, sender=model, dispatch_uid=f"counters_deleted_{model.__name__}")
+
+    # Slug-byte på en kategori/tech flyttar nycklarna
+    for model in COUNTED_SNIPPETS:
+        post_save.connect(_rebuild_counters, sender=model, dispatch_uid=f"counters_saved_{model.__name__}")
+        post_delete.connect(_rebuild_counters, sender=model, dispatch_uid=f"counters_deleted_{model.__name__}")
+
+    # ProjectPage.tech_slugs kopierar tech-slugs – byt namn/ta bort en tech -> synka om
+    post_save.connect(_rebuild_tech_slugs, sender=TechStack, dispatch_uid="tech_slugs_saved")
+    post_delete.connect(_rebuild_tech_slugs, sender=TechStack, dispatch_uid="tech_slugs_deleted")
+
+    # Nya sidor/redirects kan göra en tidigare 404 giltig
+    page_published.connect(_invalidate_fast404, dispatch_uid="fast404_page_published")
+    post_page_move.connect(_invalidate_fast404, dispatch_uid="fast404_page_moved")
+    post_save.connect(_invalidate_fast404, sender=Redirect, dispatch_uid="fast404_redirect_saved")
+
+    # Read-your-writes: nypublicerat innehåll läses från primären tills replikerna hunnit ikapp
+    if settings.DATABASE_REPLICAS:
+        page_published.connect(_pin_primary, dispatch_uid="replica_page_published")
+        page_unpublished.connect(_pin_primary, dispatch_uid="replica_page_unpublished")
+        post_page_move.connect(_pin_primary, dispatch_uid="replica_page_moved")
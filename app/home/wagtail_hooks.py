@@ -0,0 +1,172 @@
+from django.http import HttpResponse
+from django.shortcuts import get_object_or_404
+from django.urls import path, reverse
+from django.utils.html import format_html, format_html_join
+from wagtail import hooks
+from wagtail.admin.auth import permission_denied
+from wagtail.admin.ui.tables import Column
+from wagtail.admin.views.generic import InspectView
+from wagtail.admin.viewsets.model import ModelViewSet
+from wagtail.admin.widgets.button import Button
+from wagtail.permission_policies import ModelPermissionPolicy
+
+from .models import RequestProfile, SlowRequest
+
+
+@hooks.register("before_serve_page")
+def label_page_metrics(page, request, serve_args, serve_kwargs):
+    # /metrics grupperar Wagtail-sidor per sidtyp i stället för "wagtail_serve"
+    request.metrics_label = f"page:{type(page).__name__}"
+
+
+# ============= REQUEST PROFILES =============
+
+class DiagnosticsPermissionPolicy(ModelPermissionPolicy):
+    """
+    Rows written by the profiler / slow-request log only: view/delete for superusers
+    """
+
+    def user_has_permission(self, user, action):
+        if action in ("add", "change"):
+            return False
+        return user.is_active and user.is_superuser
+
+
+class RequestProfileInspectView(InspectView):
+    def get_stats_text_display_value(self):
+        return format_html(
+            '<pre style="white-space: pre; overflow-x: auto; font-size: 0.75rem;">{}</pre>',
+            self.object.stats_text,
+        )
+
+    def get_queries_display_value(self):
+        queries = self.object.queries or []
+        rows = format_html_join(
+            "\n", "<tr><td>{}</td><td>{}</td><td><code>{}</code></td></tr>",
+            ((f"{q['ms']:.1f}ms", q.get("alias", ""), q["sql"]) for q in queries),
+        )
+        return format_html(
+            "<table class='listing'><thead><tr><th>Time</th><th>DB</th><th>SQL</th></tr></thead>"
+            "<tbody>{}</tbody></table>",
+            rows,
+        )
+
+    def get_profile_data_display_value(self):
+        return format_html(
+            '<a class="button button-small" href="{}">Download .prof</a> '
+            "(<code>python -m pstats</code>, snakeviz)",
+            self.download_url,
+        )
+
+    @property
+    def download_url(self):
+        return reverse("request_profiles:download", args=(self.object.pk,))
+
+    @property
+    def header_more_buttons(self):
+        buttons = super().header_more_buttons
+        return [Button("Download .prof", url=self.download_url, icon_name="download", priority=5)] + buttons
+
+
+class RequestProfileViewSet(ModelViewSet):
+    model = RequestProfile
+    icon = "time"
+    menu_label = "Request profiles"
+    add_to_settings_menu = True
+    copy_view_enabled = False
+    inspect_view_enabled = True
+    inspect_view_class = RequestProfileInspectView
+    inspect_view_fields = [
+        "created_at", "method", "path", "status_code", "user",
+        "duration_ms", "query_count", "query_ms", "profile_data", "stats_text", "queries",
+    ]
+    list_display = [
+        "__str__",
+        Column("status_code", label="Status"),
+        Column("query_count", label="Queries"),
+        "user",
+        "created_at",
+    ]
+    list_filter = ["method", "status_code"]
+    form_fields = []
+    permission_policy = DiagnosticsPermissionPolicy(RequestProfile)
+
+    def download_view(self, request, pk):
+        if not self.permission_policy.user_has_permission(request.user, "view"):
+            return permission_denied(request)
+        profile = get_object_or_404(RequestProfile, pk=pk)
+        response = HttpResponse(bytes(profile.profile_data), content_type="application/octet-stream")
+        response["Content-Disposition"] = f'attachment; filename="profile-{profile.pk}.prof"'
+        return response
+
+    def get_urlpatterns(self):
+        return super().get_urlpatterns() + [
+            path("download/<int:pk>/", self.download_view, name="download"),
+        ]
+
+
+request_profile_viewset = RequestProfileViewSet("request_profiles")
+
+
+@hooks.register("register_admin_viewset")
+def register_request_profile_viewset():
+    return request_profile_viewset
+
+
+# ============= SLOW REQUESTS =============
+
+class SlowRequestInspectView(InspectView):
+    def get_queries_display_value(self):
+        rows = format_html_join(
+            "\n",
+            "<tr><td>{}</td><td>{}</td><td>{}</td><td><code>{}</code></td></tr>",
+            (
+                (
+                    f"{q['ms']:.1f}ms",
+                    q["count"],
+                    format_html("<strong>duplicate ×{}</strong>", q["count"]) if q["count"] > 1 else "",
+                    q["sql"],
+                )
+                for q in self.object.queries or []
+            ),
+        )
+        return format_html(
+            "<table class='listing'><thead><tr><th>Total</th><th>Count</th><th></th><th>SQL</th></tr></thead>"
+            "<tbody>{}</tbody></table>",
+            rows,
+        )
+
+
+class SlowRequestViewSet(ModelViewSet):
+    model = SlowRequest
+    icon = "warning"
+    menu_label = "Slow requests"
+    menu_hook = "register_reports_menu_item"
+    copy_view_enabled = False
+    inspect_view_enabled = True
+    inspect_view_class = SlowRequestInspectView
+    inspect_view_fields = [
+        "created_at", "method", "path", "view", "status_code", "total_ms",
+        "db_count", "db_ms", "duplicate_queries", "cache_hits", "cache_misses",
+        "http_calls", "http_ms", "queries",
+    ]
+    list_display = [
+        "__str__",
+        "view",
+        Column("db_count", label="Queries"),
+        Column("duplicate_queries", label="Duplicates"),
+        Column("cache_misses", label="Cache misses"),
+        "created_at",
+    ]
+    list_filter = ["view"]
+    ordering = ["-total_ms"]
+    form_fields = []
+    permission_policy = DiagnosticsPermissionPolicy(SlowRequest)
+
+
+slow_request_viewset = SlowRequestViewSet("slow_requests")
+
+
+@hooks.register("register_admin_viewset")
+def register_slow_request_viewset():
+    return slow_request_viewset
@@ -0,0 +1,89 @@
+import logging
+import time
+from typing import List, Tuple
+
+from django.conf import settings
+from django.test import RequestFactory
+from wagtail.models import Site
+
+from .metrics import WARMUP_ENVIRON_KEY
+from .models import BlogIndexPage, BlogPage, ContactPage, HomePage, ProjectIndexPage, ProjectPage
+
+logger = logging.getLogger(__name__)
+
+WARMUP_PAGE_TYPES = (HomePage, BlogIndexPage, BlogPage, ProjectIndexPage, ProjectPage, ContactPage)
+
+
+def _warmup_host(site) -> str:
+    allowed = [h for h in settings.ALLOWED_HOSTS if h and not h.startswith(".") and h != "*"]
+    if site and (site.hostname in allowed or "*" in settings.ALLOWED_HOSTS):
+        return site.hostname
+    return allowed[0] if allowed else "localhost"
+
+
+def warmup_paths() -> List[Tuple[str, str]]:
+    """
+    (label, path) – one live page per page type. Not the HTB card: that would be a
+    live API call per worker boot, and the card fetches itself on first view anyway.
+    """
+    paths = []
+    for model in WARMUP_PAGE_TYPES:
+        page = model.objects.live().public().defer_streamfields().order_by("path").first()
+        if page is None:
+            continue
+        url_parts = page.get_url_parts()
+        if url_parts is None:
+            continue
+        paths.append((model.__name__, url_parts[2]))
+    return paths
+
+
+def warm_up(application) -> List[Tuple[str, int, float]]:
+    """
+    Push one GET per page type through the full WSGI application (middleware,
+    URL resolver, templates, settings/navigation lookups, counter caches). The
+    requests are marked with WARMUP_ENVIRON_KEY so /metrics and the slow-request
+    log leave them out. Returns (label, status, ms); failures are logged, never raised.
+    """
+    results = []
+    try:
+        site = Site.objects.filter(is_default_site=True).first()
+        paths = warmup_paths()
+    except Exception:
+        logger.exception("Warm-up skipped: could not resolve pages")
+        return results
+
+    host = _warmup_host(site)
+    factory = RequestFactory()
+    for label, path in paths:
+        # https + forwarded proto så SECURE_SSL_REDIRECT inte svarar 301
+        environ = factory.get(
+            path,
+            HTTP_HOST=host,
+            HTTP_X_FORWARDED_PROTO="https",
+            HTTP_USER_AGENT="warmup",
+            secure=True,
+        ).environ
+        environ[WARMUP_ENVIRON_KEY] = True
+        status_holder = []
+
+        def start_response(status, headers, exc_info=None):
+            status_holder.append(int(status.split(" ", 1)[0]))
+
+        start = time.perf_counter()
+        try:
+            body = application(environ, start_response)
+            try:
+                for _ in body:
+                    pass
+            finally:
+                if hasattr(body, "close"):
+                    body.close()
+        except Exception:
+            logger.exception("Warm-up request failed: %s %s", label, path)
+            continue
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        status = status_holder[0] if status_holder else 0
+        results.append((label, status, elapsed_ms))
+        logger.info("Warm-up %s %s -> %s in %.1fms", label, path, status, elapsed_ms)
+    return results